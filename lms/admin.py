@@ -1,8 +1,30 @@
 from django.contrib import admin
+from .admin_performance import AutocompleteListFilter, LargeTableAdminMixin, related_search
 from .models import Usuario, Course, Lesson, Inscripcion
+from .search import full_text_search, uses_full_text
+
+class FullTextSearchAdminMixin:
+    """Búsqueda del changelist y del autocompletado con lms.search en PostgreSQL."""
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term or not uses_full_text(queryset):
+            return super().get_search_results(request, queryset, search_term)
+        return full_text_search(queryset, search_term), False
+
+class RolListFilter(admin.SimpleListFilter):
+    """Los roles conocidos, sin el SELECT DISTINCT rol sobre todas las inscripciones."""
+    title = "rol"
+    parameter_name = "rol"
+
+    def lookups(self, request, model_admin):
+        return [(rol, rol) for rol in (Inscripcion.ROL_ESTUDIANTE, Inscripcion.ROL_INSTRUCTOR)]
+
+    def queryset(self, request, queryset):
+        return queryset.filter(rol=self.value()) if self.value() else queryset
 
 @admin.register(Usuario)
-class UsuarioAdmin(admin.ModelAdmin):
+class UsuarioAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ("id", "correo", "nombre", "created_at")
     search_fields = ("correo", "nombre")
     list_filter = ("created_at",)
@@ -11,30 +33,37 @@ class UsuarioAdmin(admin.ModelAdmin):
     list_per_page = 25
 
 @admin.register(Course)
-class CourseAdmin(admin.ModelAdmin):
-    list_display = ("id", "title", "instructor", "created_at")
+class CourseAdmin(LargeTableAdminMixin, FullTextSearchAdminMixin, admin.ModelAdmin):
+    list_display = ("id", "title", "instructor", "lesson_count", "enrollment_count", "created_at")
     search_fields = ("title", "description")
     list_filter = ("created_at",)
     autocomplete_fields = ("instructor",)
     ordering = ("-created_at",)
-    readonly_fields = ("created_at", "updated_at")
+    readonly_fields = (
+        "lesson_count", "enrollment_count", "student_count", "instructor_count",
+        "created_at", "updated_at",
+    )
     list_per_page = 25
 
 @admin.register(Lesson)
-class LessonAdmin(admin.ModelAdmin):
+class LessonAdmin(LargeTableAdminMixin, FullTextSearchAdminMixin, admin.ModelAdmin):
     list_display = ("id", "nombre_leccion", "curso", "created_at")
     search_fields = ("nombre_leccion",)
-    list_filter = ("curso", "created_at")
+    list_filter = (("curso", AutocompleteListFilter), "created_at")
     autocomplete_fields = ("curso",)
     ordering = ("curso", "id")
     readonly_fields = ("created_at", "updated_at")
     list_per_page = 25
 
 @admin.register(Inscripcion)
-class InscripcionAdmin(admin.ModelAdmin):
+class InscripcionAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ("id", "usuario", "curso", "rol", "fecha_inscripcion")
     search_fields = ("usuario__nombre", "usuario__correo", "curso__title")
-    list_filter = ("rol", "fecha_inscripcion")
+    list_filter = (RolListFilter, "fecha_inscripcion")
     autocomplete_fields = ("usuario", "curso")
     ordering = ("-fecha_inscripcion",)
     list_per_page = 25
+
+    def get_search_results(self, request, queryset, search_term):
+        # Usuarios y cursos se buscan en su tabla (índices de trigramas) y se cruzan por id.
+        return related_search(queryset, self.get_search_fields(request), search_term), False
@@ -0,0 +1,145 @@
+"""
+Changelists del admin que aguantan tablas grandes.
+
+- ``EstimatedCountPaginator``: si el planificador de PostgreSQL espera más
+  de ``LMS_ADMIN_EXACT_COUNT_LIMIT`` filas, la paginación usa esa
+  estimación (``EXPLAIN``) en lugar de ``COUNT(*)``.
+- ``LargeTableAdminMixin``: ese paginador (también en el autocompletado) y,
+  en tablas por encima del límite según ``pg_class.reltuples``, sin el
+  segundo ``COUNT(*)`` del total sin filtrar.
+- ``related_search``: los ``search_fields`` de otras tablas se buscan en una
+  subconsulta por tabla, que usa sus índices de trigramas, en lugar de un
+  JOIN con ``OR`` que recorre la tabla entera.
+- ``AutocompleteListFilter``: filtro por FK que no carga todas las opciones;
+  se eligen con el autocompletado del admin del modelo relacionado.
+"""
+import json
+from functools import reduce
+from operator import or_
+
+from django import forms
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.utils import get_fields_from_path
+from django.contrib.admin.views.main import ERROR_FLAG, PAGE_VAR
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import connections, router
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from django.utils.text import smart_split, unescape_string_literal
+
+
+def exact_count_limit():
+    return getattr(settings, "LMS_ADMIN_EXACT_COUNT_LIMIT", None)
+
+
+def estimated_rows(queryset):
+    """Filas que PostgreSQL espera para ``queryset`` según sus estadísticas; ``None`` en otras bases."""
+    if connections[queryset.db].vendor != "postgresql":
+        return None
+    plan = json.loads(queryset.order_by().explain(format="json"))[0]["Plan"]
+    return plan["Plan Rows"]
+
+
+def table_rows(model):
+    """``reltuples`` de la tabla de ``model`` (``None`` fuera de PostgreSQL o sin ANALYZE)."""
+    connection = connections[router.db_for_read(model)]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+        row = cursor.fetchone()
+    return row[0] if row and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """``Paginator`` que no cuenta exactamente resultados de más de ``LMS_ADMIN_EXACT_COUNT_LIMIT`` filas."""
+
+    estimated = False
+
+    @cached_property
+    def count(self):
+        limit = exact_count_limit()
+        if limit is not None and isinstance(self.object_list, QuerySet):
+            rows = estimated_rows(self.object_list)
+            if rows is not None and rows > limit:
+                self.estimated = True
+                return int(rows)
+        return super().count
+
+
+class LargeTableAdminMixin:
+    paginator = EstimatedCountPaginator
+
+    @property
+    def show_full_result_count(self):
+        # Con la tabla por encima del límite el admin enseña «Mostrar todo» en vez del total.
+        limit, rows = exact_count_limit(), table_rows(self.model)
+        return limit is None or rows is None or rows <= limit
+
+    @property
+    def media(self):
+        media = super().media
+        for list_filter in self.list_filter:
+            if isinstance(list_filter, (list, tuple)) and issubclass(list_filter[1], AutocompleteListFilter):
+                field = get_fields_from_path(self.model, list_filter[0])[-1]
+                media += AutocompleteSelect(field, self.admin_site).media
+        return media
+
+
+def related_search(queryset, search_fields, search_term):
+    """
+    Lo mismo que la búsqueda del admin con ``search_fields`` sin prefijo
+    (cada palabra en algún campo, con ``icontains``), pero los campos de una
+    FK (``relacion__campo``) se buscan en su tabla y se cruzan por id: una
+    subconsulta por tabla unida con ``UNION``.
+    """
+    model = queryset.model
+    groups = {}
+    for path in search_fields:
+        relation, _, name = path.rpartition("__")
+        groups.setdefault(relation, []).append(name)
+    for bit in smart_split(search_term):
+        if bit.startswith(('"', "'")) and bit[0] == bit[-1]:
+            bit = unescape_string_literal(bit)
+        matches = []
+        for relation, names in groups.items():
+            condition = reduce(or_, (Q(**{f"{name}__icontains": bit}) for name in names))
+            if relation:
+                related = model._meta.get_field(relation).related_model
+                condition = Q(**{f"{relation}__in": related._default_manager.filter(condition).values("pk")})
+            matches.append(model._default_manager.filter(condition).values("pk"))
+        queryset = queryset.filter(pk__in=matches[0].union(*matches[1:]) if len(matches) > 1 else matches[0])
+    return queryset
+
+
+class AutocompleteListFilter(admin.RelatedFieldListFilter):
+    """
+    ``RelatedFieldListFilter`` sin la lista de opciones: un select con el
+    autocompletado del admin del modelo relacionado (necesita sus
+    ``search_fields``) y sólo se lee la opción elegida.
+    """
+
+    template = "admin/lms/autocomplete_filter.html"
+
+    def field_choices(self, field, request, model_admin):
+        self.widget = forms.ModelChoiceField(
+            queryset=field.remote_field.model._default_manager.all(), required=False,
+            widget=AutocompleteSelect(field, model_admin.admin_site),
+        ).widget
+        return []
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        self.hidden_params = [
+            (name, value) for name, values in changelist.filter_params.items()
+            if name not in (PAGE_VAR, ERROR_FLAG) and not name.startswith(self.field_path + "__")
+            for value in values
+        ]
+        yield from super().choices(changelist)
+
+    def render_widget(self):
+        return self.widget.render(self.lookup_kwarg, self.lookup_val[-1] if self.lookup_val else None)
@@ -0,0 +1,5 @@
+"""Rutas del API con lecturas asíncronas (``LMS_ASYNC_READS``, ver ``lms.async_views``)."""
+from .async_views import async_read_urls
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = async_read_urls(sync_urlpatterns)
@@ -0,0 +1,143 @@
+"""
+``list`` y ``retrieve`` asíncronos para servir el API con ASGI (``project/asgi.py``).
+
+Una vista síncrona de DRF bajo ASGI ocupa un hilo durante toda la petición,
+esperas a la base de datos incluidas. ``AsyncReadMixin`` sirve las lecturas
+desde el bucle de eventos: autenticación por sesión con ``auser()``,
+consultas con ``aget`` / ``acount`` / ``aaggregate`` / ``aiterator`` y la
+serialización y el renderizado en un hilo aparte, para no bloquear el bucle
+con trabajo de CPU. El resto de acciones (escrituras, ``export``, ``bulk``)
+y las peticiones con cabecera ``Authorization`` pasan por la vista síncrona
+de siempre.
+
+Cada mixin que participa en la lectura (``ConditionalMixin``,
+``CachedResponseMixin``) define ``alist`` / ``aretrieve`` con el mismo
+comportamiento que su ``list`` / ``retrieve``.
+
+``async_read_urls`` sustituye las rutas de un router por estas vistas; se
+activa con ``LMS_ASYNC_READS`` (lo pone ``project/asgi.py``).
+"""
+from functools import update_wrapper
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import Http404, HttpResponse
+from django.template.response import SimpleTemplateResponse
+from django.urls import URLPattern
+from rest_framework.response import Response
+
+READ_ACTIONS = ("list", "retrieve")
+
+
+class AsyncReadMixin:
+    """Lecturas asíncronas para un ``ModelViewSet``; ver el docstring del módulo."""
+
+    async def adispatch(self, request, *args, **kwargs):
+        """``dispatch`` de DRF para ``list`` / ``retrieve`` sin bloquear el bucle de eventos."""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await self.ainitial(request, *args, **kwargs)
+            handler = getattr(self, "a" + self.action)
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        return await sync_to_async(self.afinalize)(request, response, *args, **kwargs)
+
+    async def ainitial(self, request, *args, **kwargs):
+        django_request = request._request
+        if "HTTP_AUTHORIZATION" in request.META or not hasattr(django_request, "auser"):
+            # Token y otros esquemas consultan la base de datos de forma síncrona.
+            return await sync_to_async(self.initial)(request, *args, **kwargs)
+        # SessionAuthentication lee request._request.user: se resuelve antes.
+        django_request.user = await django_request.auser()
+        self.initial(request, *args, **kwargs)
+
+    def afinalize(self, request, response, *args, **kwargs):
+        """``finalize_response`` y renderizado, ya en un hilo."""
+        response = self.finalize_response(request, response, *args, **kwargs)
+        self.response = response
+        if not isinstance(response, SimpleTemplateResponse):
+            return response
+        # Django volvería a saltar a un hilo para llamar a render(): se entrega ya renderizada.
+        response.render()
+        rendered = HttpResponse(response.content, status=response.status_code, headers=response.headers)
+        rendered.cookies = response.cookies
+        return rendered
+
+    async def aget_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except queryset.model.DoesNotExist:
+            raise Http404(f"No {queryset.model._meta.object_name} matches the given query.")
+        except (TypeError, ValueError, DjangoValidationError):
+            raise Http404  # como get_object_or_404 de DRF con un id mal formado
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        if hasattr(self.paginator, "apaginate_queryset"):
+            return await self.paginator.apaginate_queryset(queryset, self.request, view=self)
+        return await sync_to_async(self.paginator.paginate_queryset)(queryset, self.request, view=self)
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            return await sync_to_async(self._paginated_response)(page)
+        objects = [obj async for obj in queryset.aiterator(chunk_size=2000)]
+        return await sync_to_async(self._response)(objects, many=True)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await sync_to_async(self._response)(await self.aget_object())
+
+    def _paginated_response(self, page):
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    def _response(self, instance, many=False):
+        return Response(self.get_serializer(instance, many=many).data)
+
+
+def async_read_view(view):
+    """Vista asíncrona equivalente a ``view`` (la de un router) para GET/HEAD de lectura."""
+    cls, initkwargs, actions = view.cls, view.initkwargs, view.actions
+    sync_view = sync_to_async(view)
+
+    async def async_view(request, *args, **kwargs):
+        method = request.method.lower()
+        action = actions.get("get" if method == "head" else method)
+        if action not in READ_ACTIONS:
+            return await sync_view(request, *args, **kwargs)
+        # Lo mismo que hace ViewSetMixin.as_view() antes de dispatch().
+        self = cls(**initkwargs)
+        self.action_map = {**actions, "head": actions["get"]}
+        for name, handler in self.action_map.items():
+            setattr(self, name, getattr(self, handler))
+        self.request = request
+        return await self.adispatch(request, *args, **kwargs)
+
+    # cls, actions, csrf_exempt... como la original (drf-yasg y el router los leen).
+    return update_wrapper(async_view, view)
+
+
+def async_read_urls(urlpatterns):
+    """Copia de ``urlpatterns`` con vistas asíncronas donde el ViewSet lleva ``AsyncReadMixin``."""
+    result = []
+    for pattern in urlpatterns:
+        view = pattern.callback
+        actions = getattr(view, "actions", None) or {}
+        if (
+            isinstance(pattern, URLPattern)
+            and issubclass(getattr(view, "cls", object), AsyncReadMixin)
+            and set(actions.values()) & set(READ_ACTIONS)
+        ):
+            pattern = URLPattern(pattern.pattern, async_read_view(view), pattern.default_args, pattern.name)
+        result.append(pattern)
+    return result
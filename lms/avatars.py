@@ -0,0 +1,220 @@
+"""
+Derivados de ``Course.avatar`` para ``srcset``.
+
+Cada avatar subido se reduce a los anchos de ``LMS_AVATAR_WIDTHS`` (sin
+ampliar) en WebP y JPEG. Los ficheros se llaman por el hash del original
+(``course_avatars/derived/<hash>-<ancho>.webp``): el contenido de una URL no
+cambia nunca y se puede cachear para siempre, y volver a procesar el mismo
+original no escribe nada. Los JPEG se decodifican con ``Image.draft``, que
+pide al decodificador la imagen ya reducida (1/2, 1/4 o 1/8) en lugar de
+descomprimirla entera.
+
+El trabajo no se hace en la petición: al confirmarse la transacción que
+guarda un avatar nuevo se encola en un pool de ``LMS_AVATAR_WORKERS`` hilos
+(Pillow libera el GIL al decodificar, redimensionar y codificar), que deja
+``{"hash": ..., "widths": [...]}`` en ``Course.avatar_derivatives``. Mientras
+tanto ``avatar_sources`` devuelve ``None`` y se sigue usando el original.
+``manage.py backfill_course_avatars`` genera los de los avatares que ya
+existían.
+"""
+import atexit
+import hashlib
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.signals import setting_changed
+from django.db import close_old_connections
+from django.db.models import Q
+from django.dispatch import receiver
+from django.utils import timezone
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+DERIVED_DIR = "course_avatars/derived"
+HASH_LENGTH = 20
+FORMATS = {
+    # extensión: (formato de Pillow, opciones de save)
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+def avatar_widths():
+    return tuple(sorted(getattr(settings, "LMS_AVATAR_WIDTHS", (128, 256, 512))))
+
+
+def derived_name(digest, width, extension):
+    return f"{DERIVED_DIR}/{digest}-{width}.{extension}"
+
+
+def avatar_sources(derivatives, url):
+    """
+    ``{"src", "webp", "jpeg"}`` para ``<picture>`` / ``<img srcset>`` a partir
+    de ``Course.avatar_derivatives``; ``url`` pasa un nombre del storage a URL.
+    ``None`` si todavía no hay derivados.
+    """
+    if not derivatives:
+        return None
+    digest, widths = derivatives["hash"], derivatives["widths"]
+
+    def srcset(extension):
+        return ", ".join(f"{url(derived_name(digest, width, extension))} {width}w" for width in widths)
+
+    return {
+        "src": url(derived_name(digest, widths[0], "jpg")),
+        "webp": srcset("webp"),
+        "jpeg": srcset("jpg"),
+    }
+
+
+def _flatten(image):
+    # JPEG no admite transparencia: se compone sobre blanco.
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        return image, background
+    image = image.convert("RGB")
+    return image, image
+
+
+def generate_derivatives(storage, name, widths=None):
+    """
+    Escribe en ``storage`` los derivados del fichero ``name`` que falten y
+    devuelve lo que se guarda en ``Course.avatar_derivatives``.
+    """
+    widths = widths or avatar_widths()
+    with storage.open(name, "rb") as original:
+        data = original.read()
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    with Image.open(io.BytesIO(data)) as image:
+        # Sólo JPEG: decodifica a la menor escala que sigue cubriendo el ancho mayor.
+        image.draft("RGB", (widths[-1], widths[-1]))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    sizes = sorted({min(width, image.width) for width in widths})
+    pending = [
+        (width, extension) for width in sizes for extension in FORMATS
+        if not storage.exists(derived_name(digest, width, extension))
+    ]
+    if pending:
+        transparent, opaque = _flatten(image)
+        for width, extension in pending:
+            pillow_format, options = FORMATS[extension]
+            source = opaque if pillow_format == "JPEG" else transparent
+            height = max(1, round(source.height * width / source.width))
+            resized = source if width == source.width else source.resize((width, height), Image.Resampling.LANCZOS)
+            output = io.BytesIO()
+            resized.save(output, pillow_format, **options)
+            storage.save(derived_name(digest, width, extension), ContentFile(output.getvalue()))
+    return {"hash": digest, "widths": sizes}
+
+
+def build_course_avatar(course_pk):
+    """Genera los derivados del avatar actual del curso y los guarda si no ha cambiado entretanto."""
+    from .models import Course
+    from .response_cache import bump_namespace
+
+    name = Course.objects.filter(pk=course_pk).values_list("avatar", flat=True).first()
+    if name:
+        derivatives = generate_derivatives(Course._meta.get_field("avatar").storage, name)
+        current = Q(avatar=name)
+    else:
+        derivatives, current = {}, Q(avatar="") | Q(avatar__isnull=True)
+    # update() no envía señales: la caché de respuestas y los ETag se invalidan a mano.
+    updated = Course.objects.filter(current, pk=course_pk).exclude(avatar_derivatives=derivatives).update(
+        avatar_derivatives=derivatives, updated_at=timezone.now(),
+    )
+    if updated:
+        bump_namespace(Course)
+    return derivatives
+
+
+def _run(course_pk):
+    try:
+        build_course_avatar(course_pk)
+    except Exception:
+        logger.exception("No se pudieron generar los derivados del avatar del curso %s", course_pk)
+    finally:
+        # Los hilos del pool abren su propia conexión.
+        close_old_connections()
+
+
+class AvatarWorkerPool:
+    """Pool de hilos para ``build_course_avatar``; ``workers=0`` lo ejecuta en el hilo que lo encola."""
+
+    def __init__(self, workers=2):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self, course_pk):
+        if self.workers == 0:
+            return build_course_avatar(course_pk)
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="avatars")
+            return self._executor.submit(_run, course_pk)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_avatar_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = AvatarWorkerPool(workers=getattr(settings, "LMS_AVATAR_WORKERS", 2))
+        return _pool
+
+
+@receiver(setting_changed)
+def reset_avatar_pool(setting, **kwargs):
+    global _pool
+    if setting == "LMS_AVATAR_WORKERS":
+        with _pool_lock:
+            old, _pool = _pool, None
+        if old is not None:
+            old.shutdown()
+
+
+@atexit.register
+def _shutdown_on_exit():
+    if _pool is not None:
+        _pool.shutdown()
+
+
+class AvatarSourcesField(serializers.Field):
+    """``avatar_sources`` de ``Course.avatar_derivatives`` con URLs absolutas, como ``avatar``."""
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        kwargs.setdefault("source", "avatar_derivatives")
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return self.bind_request(self.context.get("request"))(value)
+
+    def bind_request(self, request):
+        """``valor -> representación`` para una petición (lo usa también lms.values_serializer)."""
+        from .models import Course
+
+        storage = Course._meta.get_field("avatar").storage
+
+        def url(name):
+            url = storage.url(name)
+            return request.build_absolute_uri(url) if request is not None else url
+        return lambda derivatives: avatar_sources(derivatives, url)
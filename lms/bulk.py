@@ -0,0 +1,237 @@
+"""
+Altas y modificaciones en lote (``POST``/``PATCH`` a ``<ruta>/bulk/``).
+
+``BulkListSerializer`` valida una lista entera con una consulta ``IN`` por
+modelo relacionado (en lugar de una por campo y elemento) y resuelve las
+restricciones ``unique_together`` con otra única consulta. Los errores se
+devuelven por elemento, en el mismo orden que la petición. La escritura va
+en una transacción con ``bulk_create`` / ``bulk_update``; como no hay
+señales, los contadores de ``Course`` y la caché de respuestas se
+actualizan aquí.
+"""
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.validators import UniqueTogetherValidator
+
+from .counters import apply_deltas, inscripcion_deltas
+from .dashboard import bump_dashboards
+from .models import Lesson, Inscripcion
+from .response_cache import bump_namespace
+
+
+def max_items():
+    return getattr(settings, "LMS_BULK_MAX_ITEMS", 5000)
+
+
+def _pk(value):
+    return getattr(value, "pk", value)
+
+
+def _to_python(model_field, value):
+    try:
+        return model_field.to_python(value)
+    except (DjangoValidationError, TypeError, ValueError):
+        return None
+
+
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """``PrimaryKeyRelatedField`` que, en un lote, busca en los objetos ya precargados."""
+
+    preloaded = None
+
+    def to_internal_value(self, data):
+        if self.preloaded is None or isinstance(data, bool):
+            return super().to_internal_value(data)
+        key = _to_python(self.get_queryset().model._meta.pk, data)
+        if key is None:
+            return super().to_internal_value(data)  # error de tipo habitual
+        if key not in self.preloaded:
+            self.fail("does_not_exist", pk_value=data)
+        return self.preloaded[key]
+
+
+class PreloadedUniqueTogetherValidator:
+    """Sustituye a ``UniqueTogetherValidator`` con las filas existentes ya leídas."""
+
+    requires_context = True
+
+    def __init__(self, validator, sources, taken):
+        self.fields = validator.fields
+        self.sources = sources
+        self.message = validator.message
+        self.taken = taken
+        self.seen = set()
+
+    def __call__(self, attrs, serializer):
+        instance = serializer.instance
+        model = serializer.Meta.model
+        key = tuple(
+            _pk(attrs[name]) if name in attrs else getattr(instance, model._meta.get_field(name).attname, None)
+            for name in self.sources
+        )
+        if None in key:
+            return
+        if key in self.taken or key in self.seen:
+            raise serializers.ValidationError(
+                self.message.format(field_names=", ".join(self.fields)), code="unique"
+            )
+        self.seen.add(key)
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """``ListSerializer`` con validación y escritura por lotes."""
+
+    def id_field_name(self):
+        return next(name for name, field in self.child.fields.items() if field.source == "id")
+
+    def _raw_values(self, data, name):
+        """Valores de la petición (y de las instancias) para el campo de modelo ``name``."""
+        model_field = self.child.Meta.model._meta.get_field(name)
+        target = model_field.target_field if model_field.is_relation else model_field
+        names = [key for key, field in self.child.fields.items() if field.source == name and not field.read_only]
+        values = set()
+        for item in data:
+            if isinstance(item, dict):
+                for key in names:
+                    if key in item and not isinstance(item[key], bool):
+                        values.add(_to_python(target, item[key]))
+        for instance in (self.instance or {}).values():
+            values.add(getattr(instance, model_field.attname))
+        values.discard(None)
+        return values
+
+    def preload(self, data):
+        plan = self.child.query_plan()
+        for field in self.child.fields.values():
+            if isinstance(field, PreloadedPrimaryKeyRelatedField) and not field.read_only:
+                prefix = field.source + "__"
+                related = [path[len(prefix):] for path in plan.select_related if path.startswith(prefix)]
+                queryset = field.get_queryset().select_related(*related)
+                field.preloaded = queryset.in_bulk(self._raw_values(data, field.source))
+
+        validators = []
+        for validator in self.child.validators:
+            if isinstance(validator, UniqueTogetherValidator):
+                sources = [self.child.fields[name].source for name in validator.fields]
+                candidates = {f"{name}__in": self._raw_values(data, name) for name in sources}
+                existing = validator.queryset.filter(**candidates)
+                if self.instance:
+                    existing = existing.exclude(pk__in=list(self.instance))
+                validator = PreloadedUniqueTogetherValidator(
+                    validator, sources, set(existing.values_list(*sources))
+                )
+            validators.append(validator)
+        self.child.validators = validators
+
+    def run_child_validation(self, data):
+        if self.instance is not None:
+            name = self.id_field_name()
+            pk = _to_python(self.child.Meta.model._meta.pk, data.get(name)) if isinstance(data, dict) else None
+            if pk not in self.instance:
+                raise serializers.ValidationError({name: ["No existe ningún elemento con este id en el lote."]})
+            # bulk_update se quedaría con un solo valor, pero los contadores se moverían una vez por entrada.
+            if pk in self._seen_pks:
+                raise serializers.ValidationError({name: ["Este id aparece más de una vez en el lote."]})
+            self._seen_pks.add(pk)
+            self.child.instance = self.instance[pk]
+        return super().run_child_validation(data)
+
+    def to_internal_value(self, data):
+        self._seen_pks = set()
+        if isinstance(data, list):
+            self.preload(data)
+        return super().to_internal_value(data)
+
+    @transaction.atomic
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        objects = model._default_manager.bulk_create([model(**attrs) for attrs in validated_data])
+        deltas = defaultdict(Counter)
+        for obj in objects:
+            deltas[obj.curso_id].update(counter_deltas(obj, 1))
+        finish_bulk_write(model, deltas, {getattr(obj, "usuario_id", None) for obj in objects})
+        return objects
+
+    @transaction.atomic
+    def update(self, instances, validated_data):
+        model = self.child.Meta.model
+        name = self.id_field_name()
+        deltas = defaultdict(Counter)
+        changed, objects, usuarios = set(), [], set()
+        now = timezone.now()
+        for raw, attrs in zip(self.initial_data, validated_data):
+            obj = instances[_to_python(model._meta.pk, raw[name])]
+            deltas[obj.curso_id].update(counter_deltas(obj, -1))
+            usuarios.add(getattr(obj, "usuario_id", None))
+            for attr, value in attrs.items():
+                setattr(obj, attr, value)
+                changed.add(model._meta.get_field(attr).name)
+            obj.updated_at = now
+            deltas[obj.curso_id].update(counter_deltas(obj, 1))
+            usuarios.add(getattr(obj, "usuario_id", None))
+            objects.append(obj)
+        if changed:
+            model._default_manager.bulk_update(objects, sorted(changed | {"updated_at"}))
+        finish_bulk_write(model, deltas, usuarios)
+        return objects
+
+
+def counter_deltas(obj, sign):
+    if isinstance(obj, Lesson):
+        return Counter(lesson_count=sign)
+    if isinstance(obj, Inscripcion):
+        return inscripcion_deltas(obj.rol, sign)
+    return Counter()
+
+
+def finish_bulk_write(model, deltas, usuarios=()):
+    # Un UPDATE por curso afectado, en orden fijo para no bloquearse con otro lote.
+    for curso_id in sorted(deltas):
+        apply_deltas(curso_id, deltas[curso_id])
+    bump_namespace(model)
+    if model is Inscripcion:
+        bump_dashboards(usuarios)
+
+
+class BulkMixin:
+    """
+    Acción ``bulk``: ``POST`` crea una lista de elementos y ``PATCH`` modifica varios por id.
+
+    Responde ``{"count", "ids"}``; con ``Prefer: return=representation``
+    (RFC 7240) devuelve los elementos serializados, que en lotes grandes
+    cuesta más que la propia escritura.
+    """
+
+    @action(detail=False, methods=["post", "patch"])
+    def bulk(self, request, *args, **kwargs):
+        if request.method == "POST":
+            serializer = self.get_serializer(data=request.data, many=True, max_length=max_items())
+            code = status.HTTP_201_CREATED
+        else:
+            serializer = self.get_serializer(
+                self.bulk_instances(request.data), data=request.data, many=True, partial=True,
+                max_length=max_items(),
+            )
+            code = status.HTTP_200_OK
+        serializer.is_valid(raise_exception=True)
+        objects = serializer.save()
+        if "return=representation" in request.headers.get("Prefer", ""):
+            return Response(serializer.data, status=code)
+        return Response({"count": len(objects), "ids": [obj.pk for obj in objects]}, status=code)
+
+    def bulk_instances(self, data):
+        if not isinstance(data, list):
+            return {}
+        fields = self.get_serializer().fields
+        name = next(key for key, field in fields.items() if field.source == "id")
+        pk_field = self.get_queryset().model._meta.pk
+        pks = {_to_python(pk_field, item.get(name)) for item in data[:max_items() + 1] if isinstance(item, dict)}
+        pks.discard(None)
+        return self.get_queryset().in_bulk(pks)
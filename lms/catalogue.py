@@ -0,0 +1,81 @@
+"""
+Portada del catálogo (``index.html``) renderizada en el servidor.
+
+Una sola consulta: los últimos ``LMS_CATALOGUE_COURSES`` cursos con su
+instructor (``select_related``) y los contadores desnormalizados de
+``Course``, sin agregados. Dos niveles de caché, ambos en la de
+``LMS_API_CACHE_ALIAS`` y con ``LMS_CATALOGUE_CACHE_TIMEOUT`` (0 = sin caché):
+
+- Cada tarjeta (``partials/course_card.html``) es un fragmento ``{% cache %}``
+  con clave ``Course.updated_at`` y el ``updated_at`` del instructor: un
+  cambio en un curso sólo vuelve a renderizar su tarjeta.
+- Para visitantes anónimos, la página entera, con la versión de los
+  espacios de nombres de ``Course`` y ``Usuario`` en la clave
+  (``lms.response_cache``): cualquier cambio en un curso o instructor la
+  invalida. El formulario de login de la página lleva un token CSRF por
+  visitante, así que se guarda con un marcador que se sustituye en cada
+  respuesta.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.shortcuts import render
+from django.template.loader import render_to_string
+
+from .models import Course, Usuario
+from .response_cache import get_cache, namespace_versions
+
+PAGE_KEY = "lms:catalogue:{digest}"
+# No cambia al escapar HTML y no puede aparecer en el texto de PostgreSQL.
+CSRF_PLACEHOLDER = "\x00csrf-token\x00"
+CARD_FIELDS = (
+    "id", "title", "description", "avatar", "avatar_derivatives", "lesson_count", "student_count", "updated_at",
+    "instructor__nombre", "instructor__updated_at",
+)
+
+
+def catalogue_cache_timeout():
+    return getattr(settings, "LMS_CATALOGUE_CACHE_TIMEOUT", 300)
+
+
+def catalogue_courses():
+    """Los cursos de la portada, con lo que usa la tarjeta, en una consulta."""
+    limit = getattr(settings, "LMS_CATALOGUE_COURSES", 48)
+    queryset = Course.objects.select_related("instructor").only(*CARD_FIELDS).order_by("-created_at", "-id")
+    return list(queryset[:limit])
+
+
+def catalogue_context(timeout):
+    return {
+        "courses": catalogue_courses(),
+        "card_timeout": timeout,
+        "cache_alias": getattr(settings, "LMS_API_CACHE_ALIAS", "default"),
+    }
+
+
+def page_cache_key(request):
+    parts = [request.get_host(), request.path, namespace_versions([Course, Usuario])]
+    return PAGE_KEY.format(digest=hashlib.sha256(repr(parts).encode()).hexdigest())
+
+
+def catalogue(request):
+    timeout = catalogue_cache_timeout()
+    if not timeout or request.user.is_authenticated or get_messages(request):
+        return render(request, "index.html", catalogue_context(timeout))
+    # Las versiones se leen antes que los cursos: si cambian entretanto, esta
+    # página queda guardada con una clave que ya no se pide.
+    key = page_cache_key(request)
+    cache = get_cache()
+    content = cache.get(key)
+    outcome = "HIT"
+    if content is None:
+        outcome = "MISS"
+        context = {**catalogue_context(timeout), "csrf_token": CSRF_PLACEHOLDER}
+        content = render_to_string("index.html", context, request)
+        cache.set(key, content, timeout)
+    response = HttpResponse(content.replace(CSRF_PLACEHOLDER, get_token(request)))
+    response["X-Cache"] = outcome
+    return response
@@ -0,0 +1,251 @@
+"""
+Peticiones condicionales (ETag / Last-Modified) para el API del LMS.
+
+Los validadores salen de los agregados de las filas que sirve la vista:
+``MAX(updated_at)`` de la tabla principal y de cada relación embebida, más
+``COUNT`` y ``SUM`` de ids (así borrar una fila o que otra entre en la
+página también cambia la ETag). En un listado paginado se agrega sólo la
+página (el corte ``OFFSET``/``LIMIT`` o la ventana keyset) y, si la
+respuesta lleva ``count``, el total entra en la ETag.
+
+Con ``If-None-Match`` / ``If-Modified-Since`` los agregados se consultan
+antes de serializar nada y se responde 304 si coinciden. Sin esas
+cabeceras se calculan después de servir: el detalle con la fila ya leída
+(sin más consultas salvo que ``?fields=`` haya dejado fuera algún
+``updated_at``) y el listado con el total que ya contó el paginador más un
+agregado sobre la página. En ``PUT``/``PATCH``/``DELETE`` se respetan
+``If-Match`` / ``If-Unmodified-Since`` y se responde 412 si el recurso ha
+cambiado.
+
+Los listados sólo llevan ETag: el ``Last-Modified`` de una página no
+reflejaría las filas borradas.
+"""
+import hashlib
+from calendar import timegm
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+READ_HEADERS = ("HTTP_IF_NONE_MATCH", "HTTP_IF_MODIFIED_SINCE")
+WRITE_HEADERS = ("HTTP_IF_MATCH", "HTTP_IF_UNMODIFIED_SINCE")
+
+
+def _has_any(request, headers):
+    return any(header in request.META for header in headers)
+
+
+class ConditionalMixin:
+    """Añade ETag/Last-Modified a ``list``/``retrieve`` y precondiciones a las escrituras."""
+
+    def validator_paths(self):
+        """Rutas ``select_related`` (y la raíz) cuyos modelos tienen ``updated_at``."""
+        plan = self.query_plan()
+        paths = [""]
+        for path in sorted(plan.select_related):
+            model = plan.model
+            for name in path.split("__"):
+                model = model._meta.get_field(name).related_model
+            if any(field.name == "updated_at" for field in model._meta.concrete_fields):
+                paths.append(path + "__")
+        return paths
+
+    def validator_aggregates(self, queryset):
+        aggregates = {
+            f"last_{index}": Max(f"{path}updated_at")
+            for index, path in enumerate(self.validator_paths())
+        }
+        if not queryset.query.is_sliced:
+            queryset = queryset.order_by()
+        return queryset, dict(row_count=Count("pk"), id_sum=Sum("pk"), **aggregates)
+
+    def get_validators(self, request, queryset, detail, count=None):
+        """Devuelve ``(etag, last_modified)`` o ``None`` si un detalle no existe."""
+        queryset, aggregates = self.validator_aggregates(queryset)
+        return self.make_validators(request, queryset.aggregate(**aggregates), detail, count)
+
+    async def aget_validators(self, request, queryset, detail, count=None):
+        queryset, aggregates = self.validator_aggregates(queryset)
+        return self.make_validators(request, await queryset.aaggregate(**aggregates), detail, count)
+
+    def make_validators(self, request, values, detail, count=None):
+        rows, ids = values.pop("row_count"), values.pop("id_sum")
+        if detail and not rows:
+            return None
+        stamps = [values[key] for key in sorted(values) if values[key] is not None]
+        parts = [
+            request.path,
+            sorted(request.query_params.lists()),
+            request.accepted_renderer.media_type,
+            [stamp.isoformat() for stamp in stamps],
+            rows,
+            # SUM de un bigint es numeric en PostgreSQL: Decimal, no int.
+            None if ids is None else int(ids),
+            count,
+        ]
+        etag = '"%s"' % hashlib.sha1(repr(parts).encode()).hexdigest()
+        last_modified = timegm(max(stamps).utctimetuple()) if detail and stamps else None
+        return etag, last_modified
+
+    def row_validator_values(self, obj):
+        """Los agregados de ``get_validators`` sacados de una fila ya leída, o ``None`` si le faltan columnas."""
+        values = {"row_count": 1, "id_sum": obj.pk}
+        for index, path in enumerate(self.validator_paths()):
+            target = obj
+            for name in filter(None, path.split("__")):
+                field = target._meta.get_field(name)
+                if not field.is_cached(target):
+                    return None
+                target = field.get_cached_value(target)
+                if target is None:
+                    break
+            if target is not None and "updated_at" in target.get_deferred_fields():
+                return None
+            values[f"last_{index}"] = None if target is None else target.updated_at
+        return values
+
+    def counts_rows(self, request):
+        return hasattr(self.paginator, "counts_rows") and self.paginator.counts_rows(request)
+
+    def list_validator_queryset(self, request, count=None):
+        queryset = self.filter_queryset(self.get_queryset())
+        if hasattr(self.paginator, "validator_queryset"):
+            queryset = self.paginator.validator_queryset(queryset, request, self, count)
+        return queryset
+
+    def served_validators(self, request, detail):
+        """Validadores de la respuesta que se acaba de servir, con lo que ya se ha leído para ella."""
+        if detail:
+            obj = getattr(self, "_served_object", None)
+            values = self.row_validator_values(obj) if obj is not None else None
+            if values is not None:
+                return self.make_validators(request, values, True)
+            return self.get_validators(request, self.detail_queryset(), True)
+        count = self.paginator.served_count() if self.counts_rows(request) else None
+        return self.get_validators(request, self.list_validator_queryset(request, count), False, count)
+
+    def request_validators(self, request, detail):
+        """Validadores antes de servir nada, para responder 304 sin leer la fila o la página."""
+        if detail:
+            return self.get_validators(request, self.detail_queryset(), True)
+        count = self.filter_queryset(self.get_queryset()).count() if self.counts_rows(request) else None
+        return self.get_validators(request, self.list_validator_queryset(request, count), False, count)
+
+    async def aserved_validators(self, request, detail):
+        if detail:
+            obj = getattr(self, "_served_object", None)
+            values = self.row_validator_values(obj) if obj is not None else None
+            if values is not None:
+                return self.make_validators(request, values, True)
+            return await self.aget_validators(request, self.detail_queryset(), True)
+        count = self.paginator.served_count() if self.counts_rows(request) else None
+        return await self.aget_validators(request, self.list_validator_queryset(request, count), False, count)
+
+    async def arequest_validators(self, request, detail):
+        if detail:
+            return await self.aget_validators(request, self.detail_queryset(), True)
+        count = await self.filter_queryset(self.get_queryset()).acount() if self.counts_rows(request) else None
+        return await self.aget_validators(request, self.list_validator_queryset(request, count), False, count)
+
+    def get_object(self):
+        self._served_object = super().get_object()
+        return self._served_object
+
+    async def aget_object(self):
+        self._served_object = await super().aget_object()
+        return self._served_object
+
+    def detail_queryset(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset())
+        try:
+            return queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (TypeError, ValueError, DjangoValidationError):
+            raise Http404  # como get_object_or_404 de DRF con un id mal formado
+
+    def _set_validators(self, response, validators):
+        etag, last_modified = validators
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+
+    def _precondition(self, request, validators):
+        etag, last_modified = validators
+        response = get_conditional_response(request._request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            self._set_validators(response, validators)
+        return response
+
+    def conditional_get(self, handler, request, detail, *args, **kwargs):
+        validators = None
+        if _has_any(request, READ_HEADERS):
+            validators = self.request_validators(request, detail)
+            if validators is not None:
+                not_modified = self._precondition(request, validators)
+                if not_modified is not None:
+                    return not_modified
+        response = handler(request, *args, **kwargs)
+        # Una respuesta servida desde la caché ya trae sus validadores.
+        if response.status_code == 200 and not response.has_header("ETag"):
+            validators = validators or self.served_validators(request, detail)
+            if validators is not None:
+                self._set_validators(response, validators)
+        return response
+
+    async def aconditional_get(self, handler, request, detail, *args, **kwargs):
+        validators = None
+        if _has_any(request, READ_HEADERS):
+            validators = await self.arequest_validators(request, detail)
+            if validators is not None:
+                not_modified = self._precondition(request, validators)
+                if not_modified is not None:
+                    return not_modified
+        response = await handler(request, *args, **kwargs)
+        if response.status_code == 200 and not response.has_header("ETag"):
+            validators = validators or await self.aserved_validators(request, detail)
+            if validators is not None:
+                self._set_validators(response, validators)
+        return response
+
+    def conditional_write(self, handler, request, *args, **kwargs):
+        if not _has_any(request, WRITE_HEADERS):
+            return handler(request, *args, **kwargs)
+        with transaction.atomic():
+            queryset = self.detail_queryset()
+            # Bloquea la fila entre la comprobación y la escritura.
+            list(queryset.select_for_update(of=("self",)).values_list("pk"))
+            validators = self.get_validators(request, queryset, detail=True)
+            if validators is not None:
+                failed = self._precondition(request, validators)
+                if failed is not None:
+                    return failed
+            response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            validators = self.get_validators(request, queryset, detail=True)
+            if validators is not None:
+                self._set_validators(response, validators)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_get(super().list, request, False, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_get(super().retrieve, request, True, *args, **kwargs)
+
+    # Versiones asíncronas (lms.async_views).
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.aconditional_get(super().alist, request, False, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.aconditional_get(super().aretrieve, request, True, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        # ``partial_update`` también pasa por aquí.
+        return self.conditional_write(super().update, request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        return self.conditional_write(super().destroy, request, *args, **kwargs)
@@ -0,0 +1,94 @@
+"""
+Contadores desnormalizados de ``Course``.
+
+Los receivers de ``lms.signals`` aplican incrementos atómicos con
+expresiones ``F()``; ``rebuild_counters`` los recalcula desde ``Lesson`` e
+``Inscripcion`` por lotes (comando ``rebuild_course_counters``). Los dos
+caminos mueven ``Course.updated_at``.
+"""
+from collections import Counter
+
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Course, Lesson, Inscripcion
+from .response_cache import bump_namespace
+
+COUNTER_FIELDS = Course.COUNTER_FIELDS
+
+ROL_COUNTERS = {
+    Inscripcion.ROL_ESTUDIANTE: "student_count",
+    Inscripcion.ROL_INSTRUCTOR: "instructor_count",
+}
+
+
+def inscripcion_deltas(rol, sign):
+    deltas = Counter(enrollment_count=sign)
+    if rol in ROL_COUNTERS:
+        deltas[ROL_COUNTERS[rol]] += sign
+    return deltas
+
+
+def apply_deltas(curso_id, deltas):
+    """Suma ``deltas`` a los contadores del curso en un único ``UPDATE``."""
+    changes = {name: F(name) + delta for name, delta in deltas.items() if delta}
+    if curso_id is None or not changes:
+        return 0
+    # UPDATE sin señales: la caché de respuestas se invalida a mano, y
+    # updated_at avanza porque los contadores se sirven con el curso (ver
+    # Course.updated_at).
+    bump_namespace(Course)
+    return Course.objects.filter(pk=curso_id).update(updated_at=timezone.now(), **changes)
+
+
+def _count(model, **filters):
+    subquery = (
+        model.objects.filter(curso=OuterRef("pk"), **filters)
+        .order_by().values("curso").annotate(n=Count("pk")).values("n")
+    )
+    return Coalesce(Subquery(subquery, output_field=IntegerField()), Value(0))
+
+
+def expected_counters():
+    """Expresiones con el valor correcto de cada contador para un ``Course``."""
+    return {
+        "lesson_count": _count(Lesson),
+        "enrollment_count": _count(Inscripcion),
+        "student_count": _count(Inscripcion, rol=Inscripcion.ROL_ESTUDIANTE),
+        "instructor_count": _count(Inscripcion, rol=Inscripcion.ROL_INSTRUCTOR),
+    }
+
+
+def rebuild_counters(queryset=None, batch_size=1000, dry_run=False):
+    """
+    Recalcula los contadores por lotes de ``batch_size`` cursos.
+
+    Genera ``(cursos_procesados, cursos_corregidos)`` tras cada lote; sólo
+    se escriben los cursos cuyos contadores no cuadran.
+    """
+    queryset = (queryset if queryset is not None else Course.objects.all()).order_by("pk")
+    expected = expected_counters()
+    drift = Q()
+    for name in COUNTER_FIELDS:
+        drift |= ~Q(**{name: F(f"expected_{name}")})
+
+    processed = fixed = 0
+    last_pk = None
+    while True:
+        batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        pks = list(batch.values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            break
+        last_pk = pks[-1]
+        stale = list(
+            Course.objects.filter(pk__in=pks)
+            .annotate(**{f"expected_{name}": expr for name, expr in expected.items()})
+            .filter(drift).values_list("pk", flat=True)
+        )
+        if stale and not dry_run:
+            Course.objects.filter(pk__in=stale).update(updated_at=timezone.now(), **expected)
+            bump_namespace(Course)
+        processed += len(pks)
+        fixed += len(stale)
+        yield processed, fixed
@@ -0,0 +1,127 @@
+"""
+Panel «Mi aprendizaje» de un usuario: ``GET /usuarios/{id}/dashboard/``.
+
+Sustituye a ``/inscripciones/?usuario=`` más un ``/lecciones/?curso=`` por
+curso. Una sola consulta lee el usuario con sus inscripciones, el resumen de
+cada curso y su instructor (``LEFT JOIN``): los totales de lecciones y
+estudiantes son los contadores desnormalizados de ``Course`` y el resumen
+por rol se suma sobre esas filas.
+
+La respuesta se guarda por usuario durante ``LMS_DASHBOARD_CACHE_TIMEOUT``
+segundos (0 = sin caché). La clave lleva una versión por usuario que
+cambia con cada alta, cambio o baja de sus inscripciones (``lms.signals``,
+``lms.bulk``) y otra global para las cargas masivas (``import_lms``). Los
+títulos y contadores de los cursos pueden ir por detrás hasta que caduca.
+"""
+from django.conf import settings
+from django.http import Http404
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from project.db.router import replica_cache_timeout
+
+from .avatars import AvatarSourcesField
+from .models import Course, Inscripcion, Usuario
+from .response_cache import bump_keys, get_cache, key_versions
+
+DASHBOARD_KEY = "lms:dashboard:{host}:{pk}:{versions}"
+VERSION_KEY = "lms:dashboard:version:{scope}"
+ALL = "all"
+COLUMNS = (
+    "id", "nombre",
+    "inscripciones__id", "inscripciones__rol", "inscripciones__fecha_inscripcion", "inscripciones__curso_id",
+    "inscripciones__curso__title", "inscripciones__curso__avatar", "inscripciones__curso__avatar_derivatives",
+    "inscripciones__curso__lesson_count", "inscripciones__curso__student_count",
+    "inscripciones__curso__instructor__nombre",
+)
+
+
+def cache_timeout():
+    return getattr(settings, "LMS_DASHBOARD_CACHE_TIMEOUT", 300)
+
+
+def bump_dashboards(usuario_ids=None):
+    """Invalida el panel de ``usuario_ids``; sin ids, el de todos."""
+    scopes = {ALL} if usuario_ids is None else {pk for pk in usuario_ids if pk is not None}
+    bump_keys(VERSION_KEY.format(scope=scope) for scope in sorted(scopes, key=str))
+
+
+def dashboard_rows(usuario_pk):
+    """Filas del usuario con sus inscripciones (más recientes primero); una consulta."""
+    return list(
+        Usuario.objects.filter(pk=usuario_pk)
+        .order_by("-inscripciones__fecha_inscripcion", "-inscripciones__id")
+        .values_list(*COLUMNS)
+    )
+
+
+def build_dashboard(rows, request=None):
+    if not rows:
+        return None
+    storage = Course._meta.get_field("avatar").storage
+    sources = AvatarSourcesField().bind_request(request)
+
+    def url(name):
+        if not name:
+            return None
+        url = storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+
+    summary = {"cursos": 0, "como_estudiante": 0, "como_instructor": 0, "lecciones": 0}
+    inscripciones = []
+    for (_, _, pk, rol, fecha, curso_id, title, avatar, derivatives, lessons, students, instructor) in rows:
+        if pk is None:  # sin inscripciones: el LEFT JOIN devuelve una fila vacía
+            continue
+        summary["cursos"] += 1
+        summary["lecciones"] += lessons
+        if rol == Inscripcion.ROL_ESTUDIANTE:
+            summary["como_estudiante"] += 1
+        elif rol == Inscripcion.ROL_INSTRUCTOR:
+            summary["como_instructor"] += 1
+        inscripciones.append({
+            "id_inscripcion": pk,
+            "rol": rol,
+            "fecha_inscripcion": fecha,
+            "curso": {
+                "id_curso": curso_id,
+                "title": title,
+                "instructor": instructor,
+                "avatar": url(avatar),
+                "avatar_sources": sources(derivatives),
+                "lesson_count": lessons,
+                "student_count": students,
+            },
+        })
+    return {"id_usuario": rows[0][0], "nombre": rows[0][1], "resumen": summary, "inscripciones": inscripciones}
+
+
+class DashboardMixin:
+    """Acción ``dashboard`` en el detalle de usuarios, con caché por usuario."""
+
+    @action(detail=True, methods=["get"], permission_classes=[IsAuthenticated])
+    def dashboard(self, request, pk=None):
+        try:
+            pk = int(pk)
+        except ValueError:
+            raise Http404
+        timeout = cache_timeout()
+        if not timeout:
+            return Response(self.load_dashboard(pk, request))
+        cache = get_cache()
+        versions = key_versions([VERSION_KEY.format(scope=ALL), VERSION_KEY.format(scope=pk)])
+        key = DASHBOARD_KEY.format(host=request.get_host(), pk=pk, versions=":".join(map(str, versions)))
+        data = cache.get(key)
+        outcome = "HIT"
+        if data is None:
+            outcome = "MISS"
+            data = self.load_dashboard(pk, request)
+            # Como la caché de respuestas: leído de una réplica, dura como mucho REPLICA_MAX_LAG.
+            cache.set(key, data, replica_cache_timeout(timeout))
+        return Response(data, headers={"X-Cache": outcome})
+
+    def load_dashboard(self, pk, request):
+        data = build_dashboard(dashboard_rows(pk), request)
+        if data is None:
+            raise Http404
+        return data
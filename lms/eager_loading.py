@@ -0,0 +1,137 @@
+"""
+Plan de carga anticipada derivado del árbol de serializers.
+
+Recorre los campos legibles de un serializer y calcula qué relaciones hay
+que traer con ``select_related`` / ``prefetch_related`` y qué columnas con
+``only()``, de modo que añadir un campo anidado nunca vuelva a producir
+consultas por fila.
+"""
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+class QueryPlan:
+    """Relaciones y columnas que necesita un serializer para un modelo dado."""
+
+    def __init__(self, model):
+        self.model = model
+        self.select_related = set()
+        self.only = {model._meta.pk.name}
+        self.prefetch = {}  # ruta -> QueryPlan del modelo relacionado
+
+    def apply(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+        for path, child in sorted(self.prefetch.items()):
+            queryset = queryset.prefetch_related(
+                Prefetch(path, queryset=child.apply(child.model._default_manager.all()))
+            )
+        return queryset.only(*sorted(self.only))
+
+    def models(self):
+        """Modelos cuyos datos acaban en la respuesta (raíz, relaciones y prefetch)."""
+        found = {self.model}
+        for path in self.select_related:
+            model = self.model
+            for name in path.split("__"):
+                model = model._meta.get_field(name).related_model
+                found.add(model)
+        for child in self.prefetch.values():
+            found |= child.models()
+        return found
+
+    def __repr__(self):
+        return (
+            f"<QueryPlan {self.model.__name__} select_related={sorted(self.select_related)} "
+            f"prefetch={sorted(self.prefetch)} only={sorted(self.only)}>"
+        )
+
+
+def _all_columns(model, plan, prefix):
+    for field in model._meta.concrete_fields:
+        plan.only.add(prefix + field.name)
+
+
+def _get_model_field(model, name):
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+
+
+def _walk(serializer, model, plan, prefix):
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*':
+            # SerializerMethodField y similares: no sabemos qué leen.
+            _all_columns(model, plan, prefix)
+            if isinstance(field, serializers.BaseSerializer):
+                _walk(field, model, plan, prefix)
+            continue
+        _walk_source(field, list(field.source_attrs), model, plan, prefix)
+
+
+def _walk_source(field, attrs, model, plan, prefix):
+    name = attrs[0]
+    model_field = _get_model_field(model, name)
+    if model_field is None:
+        # Propiedad o método del modelo: cargar todas sus columnas.
+        _all_columns(model, plan, prefix)
+        return
+
+    rest = attrs[1:]
+    is_relation = model_field.is_relation
+    many = is_relation and (model_field.many_to_many or model_field.one_to_many)
+
+    if not is_relation:
+        plan.only.add(prefix + name)
+        return
+
+    related_model = model_field.related_model
+    if many:
+        child = plan.prefetch.get(prefix + name)
+        if child is None:
+            child = plan.prefetch[prefix + name] = QueryPlan(related_model)
+            if model_field.one_to_many:
+                # El prefetch necesita la FK de vuelta al padre.
+                child.only.add(model_field.field.name)
+        if rest:
+            _walk_source(field, rest, related_model, child, '')
+        elif isinstance(field, serializers.ListSerializer):
+            _walk(field.child, related_model, child, '')
+        return
+
+    if model_field.concrete:
+        plan.only.add(prefix + name)
+    if not rest and not isinstance(field, serializers.BaseSerializer):
+        # PrimaryKeyRelatedField y similares sólo necesitan la columna FK.
+        if not model_field.concrete:
+            plan.select_related.add(prefix + name)
+            plan.only.add(prefix + name + '__' + related_model._meta.pk.name)
+        return
+
+    path = prefix + name
+    plan.select_related.add(path)
+    plan.only.add(path + '__' + related_model._meta.pk.name)
+    if rest:
+        _walk_source(field, rest, related_model, plan, path + '__')
+    else:
+        _walk(field, related_model, plan, path + '__')
+
+
+@lru_cache(maxsize=1024)
+def build_query_plan(serializer_class, fields=(), expand=()):
+    """
+    Calcula (y memoriza) el ``QueryPlan`` de un ``ModelSerializer``; con
+    ``fields`` / ``expand`` (``lms.sparse_fields``), el de esa forma de la
+    respuesta.
+    """
+    model = serializer_class.Meta.model
+    plan = QueryPlan(model)
+    serializer = serializer_class(fields=fields, expand=expand) if fields or expand else serializer_class()
+    _walk(serializer, model, plan, '')
+    return plan
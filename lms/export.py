@@ -0,0 +1,120 @@
+"""
+Exportación completa en streaming (``GET <ruta>/export/``).
+
+Las filas salen de ``values_list(...).iterator(chunk_size=...)`` sobre el
+mismo queryset filtrado que el listado (en PostgreSQL es un cursor del lado
+del servidor) y se codifican como NDJSON o CSV planos, sin serializers de
+DRF, en bloques de ``LMS_EXPORT_CHUNK_SIZE`` filas. La memoria no depende
+del número de filas exportadas.
+
+El formato se negocia como cualquier otro: ``Accept: text/csv`` o
+``?format=csv``; por defecto NDJSON.
+
+Bajo ASGI el cuerpo es un iterador asíncrono que lee cada bloque en el hilo
+de la base de datos: Django consume un iterador síncrono con ``list()``
+antes de enviar el primer byte, y la exportación entera acabaría en memoria.
+"""
+import csv
+import datetime
+import decimal
+import io
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.decorators import action
+from rest_framework.renderers import BaseRenderer
+
+
+def chunk_size():
+    return getattr(settings, "LMS_EXPORT_CHUNK_SIZE", 2000)
+
+
+def _encode(value):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+class NDJSONRenderer(BaseRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Sólo para respuestas de error: las exportaciones no pasan por aquí.
+        return (json.dumps(data, default=str) + "\n").encode()
+
+    def stream(self, header, rows):
+        for chunk in rows:
+            yield "".join(
+                json.dumps(dict(zip(header, map(_encode, row))), ensure_ascii=False) + "\n" for row in chunk
+            ).encode()
+
+
+class CSVRenderer(NDJSONRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+    def stream(self, header, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(header)
+        for chunk in rows:
+            writer.writerows([_encode(value) for value in row] for row in chunk)
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+
+
+def _chunks(iterator, size):
+    chunk = []
+    for row in iterator:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def _aiterate(iterator):
+    """``iterator`` como iterador asíncrono: un salto al hilo de la base de datos por bloque."""
+    iterator = iter(iterator)
+    while True:
+        chunk = await sync_to_async(next)(iterator, StopIteration)
+        if chunk is StopIteration:
+            return
+        yield chunk
+
+
+class ExportMixin:
+    """
+    Añade ``export`` al listado. La vista declara ``export_fields``: rutas
+    de ``values_list`` (``curso__title``...); la cabecera usa ``_`` en lugar
+    de ``__``.
+    """
+
+    export_fields = ()
+
+    @action(detail=False, methods=["get"], renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        size = chunk_size()
+        rows = queryset.values_list(*self.export_fields).iterator(chunk_size=size)
+        header = [name.replace("__", "_") for name in self.export_fields]
+        renderer = request.accepted_renderer
+        content = renderer.stream(header, _chunks(rows, size))
+        if isinstance(request._request, ASGIRequest):
+            content = _aiterate(content)
+        response = StreamingHttpResponse(content, content_type=f"{renderer.media_type}; charset=utf-8")
+        filename = f"{self.basename}-{timezone.now():%Y%m%d}.{renderer.format}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
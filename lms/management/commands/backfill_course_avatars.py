@@ -0,0 +1,69 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models import Q
+
+from lms.avatars import build_course_avatar
+from lms.models import Course
+
+
+def build(course_pk):
+    try:
+        build_course_avatar(course_pk)
+    except Exception as exc:
+        return exc
+    return None
+
+
+def build_in_thread(course_pk):
+    try:
+        return build(course_pk)
+    finally:
+        # Cada hilo del pool abre su propia conexión.
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera los derivados WebP/JPEG (lms/avatars.py) de los cursos con avatar que aún no los tienen, "
+        "o de todos con --all. Los ficheros que ya existen (mismo hash) no se vuelven a escribir."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all", action="store_true", dest="rebuild", help="Revisa también los cursos que ya tienen derivados.",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=None,
+            help="Hilos que generan imágenes a la vez (por defecto LMS_AVATAR_WORKERS; 0 = en este hilo).",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("ids", nargs="*", type=int, help="Limita a estos cursos.")
+
+    def handle(self, *args, rebuild, workers, batch_size, ids, **options):
+        queryset = Course.objects.exclude(Q(avatar="") | Q(avatar__isnull=True))
+        if ids:
+            queryset = queryset.filter(pk__in=ids)
+        if not rebuild:
+            queryset = queryset.filter(avatar_derivatives={})
+        pks = list(queryset.order_by("pk").values_list("pk", flat=True))
+        if workers is None:
+            workers = getattr(settings, "LMS_AVATAR_WORKERS", 2)
+        executor = ThreadPoolExecutor(max_workers=workers) if workers else None
+        processed = failed = 0
+        try:
+            for start in range(0, len(pks), batch_size):
+                batch = pks[start:start + batch_size]
+                results = executor.map(build_in_thread, batch) if executor else map(build, batch)
+                for pk, error in zip(batch, results):
+                    if error is not None:
+                        failed += 1
+                        self.stderr.write(f"Curso {pk}: {error!r}")
+                processed += len(batch)
+                self.stdout.write(f"{processed}/{len(pks)} cursos procesados, {failed} con error")
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        self.stdout.write(self.style.SUCCESS(f"Listo: {processed} cursos, {failed} con error."))
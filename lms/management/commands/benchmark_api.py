@@ -0,0 +1,114 @@
+import asyncio
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.test import AsyncClient, Client, override_settings
+
+from lms.models import Course, Lesson, Usuario
+
+# modo -> URLconf; los clientes de test llaman directamente a WSGIHandler / ASGIHandler.
+MODES = {
+    "wsgi": "lms.urls",  # DRF síncrono, un hilo por cliente
+    "asgi-sync": "lms.urls",  # DRF síncrono bajo ASGI (cada petición pasa a un hilo)
+    "asgi": "lms.async_urls",  # lms.async_views
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara latencia y peticiones por segundo de las lecturas del API (cursos, lecciones, "
+        "usuarios) servidas con WSGI y vistas síncronas frente a ASGI y vistas asíncronas, "
+        "con muchos clientes concurrentes. Sólo lee de la base de datos configurada."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=64)
+        parser.add_argument("--duration", type=float, default=10.0, help="Segundos de carga por modo.")
+        parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+        parser.add_argument(
+            "--cache", action="store_true",
+            help="Deja activa la caché de respuestas (por defecto se mide la base de datos).",
+        )
+
+    def handle(self, *args, clients, duration, modes, cache, **options):
+        urls = self.urls()
+        timeout = {} if cache else {"LMS_API_CACHE_TIMEOUT": 0}
+        for mode in modes:
+            with override_settings(ROOT_URLCONF=MODES[mode], ALLOWED_HOSTS=["testserver"], **timeout):
+                if mode == "wsgi":
+                    latencies, errors, elapsed = self.run_threads(urls, clients, duration)
+                else:
+                    latencies, errors, elapsed = asyncio.run(self.run_tasks(urls, clients, duration))
+            self.report(mode, clients, latencies, errors, elapsed)
+
+    def urls(self):
+        curso = Course.objects.order_by("id").values_list("id", flat=True).first()
+        lesson = Lesson.objects.order_by("id").values_list("id", flat=True).first()
+        usuario = Usuario.objects.order_by("id").values_list("id", flat=True).first()
+        connection.close()
+        urls = ["/cursos/?cursor=", "/lecciones/?cursor=", "/usuarios/?cursor="]
+        details = {"cursos": curso, "lecciones": lesson, "usuarios": usuario}
+        return urls + [f"/{route}/{pk}/" for route, pk in details.items() if pk is not None]
+
+    def run_threads(self, urls, clients, duration):
+        latencies, errors = [], [0]
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def client(index):
+            http = Client()
+            sent = index
+            try:
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    response = http.get(urls[sent % len(urls)])
+                    # Como el servidor WSGI al terminar cada petición (CONN_MAX_AGE).
+                    close_old_connections()
+                    with lock:
+                        latencies.append(time.perf_counter() - started)
+                        errors[0] += response.status_code != 200
+                    sent += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, errors[0], time.perf_counter() - started
+
+    async def run_tasks(self, urls, clients, duration):
+        latencies, errors = [], [0]
+        deadline = time.perf_counter() + duration
+
+        async def client(index):
+            http = AsyncClient()
+            sent = index
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await http.get(urls[sent % len(urls)])
+                latencies.append(time.perf_counter() - started)
+                errors[0] += response.status_code != 200
+                sent += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client(i) for i in range(clients)))
+        return latencies, errors[0], time.perf_counter() - started
+
+    def report(self, mode, clients, latencies, errors, elapsed):
+        latencies.sort()
+
+        def pct(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+        self.stdout.write(
+            f"{mode}: {clients} clientes, {len(latencies)} peticiones en {elapsed:.1f}s "
+            f"-> {len(latencies) / elapsed:,.0f} pet/s; latencia p50 {pct(0.5):.0f} ms, "
+            f"p95 {pct(0.95):.0f} ms, p99 {pct(0.99):.0f} ms, media {statistics.mean(latencies) * 1000:.0f} ms; "
+            f"{errors} errores"
+        )
@@ -0,0 +1,78 @@
+import copy
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from lms.models import Course
+
+from .benchmark_search import seed_catalogue
+
+
+def uncached_loader_templates():
+    """``TEMPLATES`` con los loaders de dentro del cached loader: cada petición vuelve a leer y compilar."""
+    templates = copy.deepcopy(settings.TEMPLATES)
+    for engine in templates:
+        loaders = engine.get("OPTIONS", {}).get("loaders")
+        if loaders:
+            engine["OPTIONS"]["loaders"] = [
+                inner for loader in loaders
+                for inner in (loader[1] if isinstance(loader, (list, tuple)) else [loader])
+            ]
+    return templates
+
+
+class Command(BaseCommand):
+    help = (
+        "Páginas por segundo de la portada /catalogo/ (lms/catalogue.py) en un proceso, a través de "
+        "todos los middlewares: sin caché y sin cached loader, sin caché, con las tarjetas en caché "
+        "(usuario autenticado) y con la página entera en caché (anónimo). Con --seed N crea antes N cursos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0, help="Cursos sintéticos que crear antes de medir.")
+        parser.add_argument("--requests", type=int, default=200, help="Peticiones por modo.")
+
+    def handle(self, *args, seed, requests, **options):
+        if seed:
+            seed_catalogue(seed)
+        if not Course.objects.exists():
+            raise CommandError("No hay cursos: usa --seed.")
+        user, _ = User.objects.get_or_create(username="benchmark-catalogue")
+        anonymous, authenticated = Client(), Client()
+        authenticated.force_login(user)
+        modes = [
+            ("sin caché, sin cached loader", anonymous, {
+                "LMS_CATALOGUE_CACHE_TIMEOUT": 0, "TEMPLATES": uncached_loader_templates(),
+            }),
+            ("sin caché", anonymous, {"LMS_CATALOGUE_CACHE_TIMEOUT": 0}),
+            ("tarjetas en caché (autenticado)", authenticated, {}),
+            ("página en caché (anónimo)", anonymous, {}),
+        ]
+        self.stdout.write(f"{'modo':<32} {'páginas/s':>10} {'mediana ms':>11} {'p95 ms':>8} {'consultas':>10}")
+        for name, client, overrides in modes:
+            with override_settings(ALLOWED_HOSTS=["testserver"], **overrides):
+                self.measure(name, client, requests)
+
+    def measure(self, name, client, requests):
+        if client.get("/catalogo/").status_code != 200:  # calienta cachés y plantillas
+            raise CommandError(f"{name}: /catalogo/ no responde 200.")
+        latencies = []
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for _ in range(requests):
+                begin = time.perf_counter()
+                client.get("/catalogo/")
+                latencies.append((time.perf_counter() - begin) * 1000)
+            elapsed = time.perf_counter() - started
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        self.stdout.write(
+            f"{name:<32} {requests / elapsed:>10.0f} {statistics.median(latencies):>11.2f} {p95:>8.2f} "
+            f"{len(queries) / requests:>10.1f}"
+        )
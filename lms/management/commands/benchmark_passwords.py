@@ -0,0 +1,70 @@
+import statistics
+import threading
+import time
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from lms.passwords import PasswordHasherPool
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide cuántas contraseñas por segundo (altas de Usuario) hashea un nodo para cada "
+        "combinación de iteraciones PBKDF2 y procesos del pool. No toca la base de datos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--iterations", type=int, nargs="+", default=[PBKDF2PasswordHasher.iterations],
+            help="Valores de LMS_PBKDF2_ITERATIONS a probar.",
+        )
+        parser.add_argument(
+            "--workers", type=int, nargs="+", default=[1, 2, 4],
+            help="Valores de LMS_PASSWORD_WORKERS a probar (0 = en el hilo de la petición).",
+        )
+        parser.add_argument("--count", type=int, default=32, help="Contraseñas por combinación.")
+        parser.add_argument("--clients", type=int, default=16, help="Hilos que piden hashes a la vez.")
+
+    def handle(self, *args, iterations, workers, count, clients, **options):
+        for cost in iterations:
+            for size in workers:
+                with override_settings(LMS_PBKDF2_ITERATIONS=cost):
+                    self.run(cost, size, count, clients)
+
+    def run(self, cost, size, count, clients):
+        pool = PasswordHasherPool(workers=size, max_pending=clients, wait=None)
+        pool.make_password("calentamiento")  # arranca los procesos fuera de la medida
+        latencies = []
+        pending = iter(range(count))
+        lock = threading.Lock()
+
+        def client():
+            while True:
+                with lock:
+                    if next(pending, None) is None:
+                        return
+                started = time.perf_counter()
+                pool.make_password("benchmark-password")
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+
+        threads = [threading.Thread(target=client) for _ in range(clients)]
+        started = time.perf_counter()
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            pool.shutdown()
+
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        self.stdout.write(
+            f"iteraciones={cost} workers={size}: {count} hashes en {elapsed:.1f}s "
+            f"-> {count / elapsed:,.1f} altas/s; latencia media {statistics.mean(latencies) * 1000:.0f} ms, "
+            f"p95 {p95 * 1000:.0f} ms"
+        )
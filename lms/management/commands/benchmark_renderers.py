@@ -0,0 +1,85 @@
+import io
+import tracemalloc
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from lms.models import Inscripcion
+from lms.serializers import InscripcionSerializer
+from lms.values_serializer import compile_values_serializer
+from project.renderers import MessagePackParser, MessagePackRenderer, ORJSONParser, ORJSONRenderer, msgpack
+
+from .benchmark_serializers import best_of, build_objects, row_of
+
+
+def inscripciones_page(count):
+    """Página de ``/inscripciones/?expand=curso.instructor,usuario`` con ``count`` filas."""
+    values = compile_values_serializer(InscripcionSerializer, (), ("curso.instructor", "usuario"))
+    rows = [row_of(instance, values.paths) for instance in build_objects(Inscripcion, count)]
+    return {"count": count, "next": None, "previous": None, "results": values.serialize(rows)}
+
+
+def native_types(count):
+    """Filas con tipos que el renderer tiene que convertir (datetime, Decimal, UUID...)."""
+    now = timezone.now()
+    return [
+        {"id": i, "uuid": uuid.UUID(int=i), "importe": Decimal(i) / 100, "fecha": now, "dia": now.date()}
+        for i in range(count)
+    ]
+
+
+def peak_memory(function):
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el JSONRenderer/JSONParser de DRF con los de orjson y MessagePack (project/renderers.py): "
+        "MB/s al codificar y decodificar y pico de memoria asignada durante la codificación. "
+        "Falla si la salida JSON de orjson no es idéntica a la de DRF."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--objects", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=5, help="Se toma la mejor de N vueltas.")
+
+    def handle(self, *args, objects, repeat, **options):
+        codecs = [
+            ("json (DRF)", JSONRenderer(), JSONParser()),
+            ("orjson", ORJSONRenderer(), ORJSONParser()),
+        ]
+        if msgpack is not None:
+            codecs.append(("msgpack", MessagePackRenderer(), MessagePackParser()))
+        payloads = {
+            f"inscripciones expandidas ({objects} filas)": inscripciones_page(objects),
+            f"datetime/Decimal/UUID ({objects} filas)": native_types(objects),
+        }
+        self.stdout.write(
+            f"{'codec':<12} {'bytes':>11} {'codificar MB/s':>15} {'pico KiB':>10} {'decodificar MB/s':>17}"
+        )
+        for title, data in payloads.items():
+            self.stdout.write(title)
+            expected = None
+            for name, renderer, parser in codecs:
+                seconds, content = best_of(repeat, lambda: renderer.render(data, renderer.media_type))
+                if isinstance(renderer, JSONRenderer):
+                    if expected is None:
+                        expected = content
+                    elif content != expected:
+                        raise CommandError(f"{name}: el JSON no coincide con el de DRF.")
+                peak = peak_memory(lambda: renderer.render(data, renderer.media_type))
+                parse_seconds, _ = best_of(repeat, lambda: parser.parse(io.BytesIO(content), parser.media_type))
+                mb = len(content) / 1e6
+                self.stdout.write(
+                    f"{name:<12} {len(content):>11} {mb / seconds:>15.1f} {peak / 1024:>10.0f} "
+                    f"{mb / parse_seconds:>17.1f}"
+                )
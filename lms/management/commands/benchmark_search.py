@@ -0,0 +1,111 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.filters import SearchFilter
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.test import APIRequestFactory
+
+from lms.models import Course, Lesson, Usuario
+from lms.search import FullTextSearchFilter
+from lms.views import CourseViewSet, LessonViewSet
+
+TOPICS = [
+    "python", "django", "javascript", "react", "postgresql", "docker", "kubernetes", "estadística",
+    "álgebra", "cálculo", "marketing", "contabilidad", "fotografía", "guitarra", "cocina", "inglés",
+    "alemán", "redes", "seguridad", "diseño", "finanzas", "historia", "biología", "química",
+]
+WORDS = (
+    "curso práctico introducción avanzado fundamentos proyecto ejercicios aprender desarrollo "
+    "aplicaciones datos análisis herramientas técnicas profesional módulo lección ejemplos "
+    "conceptos básicos completo guía paso trabajo equipo empresa clase vídeo examen certificado "
+    "nivel principiantes expertos semana horas contenido material práctica teoría casos reales"
+).split()
+
+DEFAULT_TERMS = ["python", "kubernetes avanzado", "\"guía completa\"", "certificado -examen", "pyhton"]
+
+
+def syllable_word(rng):
+    # Vocabulario grande de palabras inventadas: hace selectivos los términos raros.
+    return "".join(rng.choice("bcdfglmnprstv") + rng.choice("aeiou") for _ in range(rng.randint(2, 4)))
+
+
+def seed_catalogue(courses, lessons_per_course=5, batch_size=5000):
+    """``courses`` cursos con ``lessons_per_course`` lecciones cada uno y texto sintético."""
+    rng = random.Random(courses)
+    instructor, _ = Usuario.objects.get_or_create(
+        correo="benchmark-search@lms.test", defaults={"nombre": "Benchmark", "contrasena": "!"},
+    )
+    for start in range(0, courses, batch_size):
+        with transaction.atomic():
+            batch = []
+            for _ in range(min(batch_size, courses - start)):
+                topic = rng.choice(TOPICS)
+                words = [rng.choice(WORDS) if rng.random() < 0.7 else syllable_word(rng) for _ in range(60)]
+                words[rng.randrange(len(words))] = topic
+                batch.append(Course(
+                    title=f"{rng.choice(WORDS).capitalize()} de {topic} {syllable_word(rng)}",
+                    description=" ".join(words), instructor=instructor, lesson_count=lessons_per_course,
+                ))
+            cursos = Course.objects.bulk_create(batch)
+            Lesson.objects.bulk_create(
+                Lesson(nombre_leccion=f"{rng.choice(WORDS).capitalize()} {syllable_word(rng)} {n}", curso=curso)
+                for curso in cursos for n in range(1, lessons_per_course + 1)
+            )
+
+
+class Command(BaseCommand):
+    help = (
+        "Latencia de ?search= en /cursos/ y /lecciones/: SearchFilter (ILIKE '%término%') frente a "
+        "lms.search.FullTextSearchFilter (tsvector + GIN). Mide lo que hace el API en cada petición: "
+        "COUNT(*) y la primera página. Con --seed N crea antes N cursos con 5 lecciones cada uno. "
+        "Necesita PostgreSQL con la migración 0007 aplicada."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0, help="Cursos sintéticos que crear antes de medir.")
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--terms", nargs="+", default=DEFAULT_TERMS)
+
+    def handle(self, *args, seed, repeat, terms, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("La búsqueda de texto completo necesita PostgreSQL.")
+        if seed:
+            seed_catalogue(seed)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE lms_course, lms_lesson")
+        self.stdout.write(
+            f"{Course.objects.count()} cursos, {Lesson.objects.count()} lecciones; "
+            f"mediana / p95 en ms de {repeat} vueltas"
+        )
+        self.stdout.write(f"{'vista':<16} {'término':<22} {'icontains':>18} {'texto completo':>18} {'×':>6}")
+        for viewset in (CourseViewSet, LessonViewSet):
+            for term in terms:
+                (slow, slow_n), (fast, fast_n) = (
+                    self.measure(viewset, backend, term, repeat) for backend in (SearchFilter, FullTextSearchFilter)
+                )
+                self.stdout.write(
+                    f"{viewset.__name__:<16} {term:<22} "
+                    f"{self.timing(slow, slow_n):>18} {self.timing(fast, fast_n):>18} "
+                    f"{statistics.median(slow) / statistics.median(fast):>6.1f}"
+                )
+
+    def measure(self, viewset, backend, term, repeat):
+        request = Request(APIRequestFactory().get("/", {"search": term}))
+        view = viewset(request=request, format_kwarg=None, action="list", kwargs={})
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            queryset = backend().filter_queryset(request, viewset.queryset.all(), view)
+            count = queryset.count()
+            list(queryset[:api_settings.PAGE_SIZE])
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings, count
+
+    def timing(self, timings, count):
+        timings = sorted(timings)
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        return f"{statistics.median(timings):.1f}/{p95:.1f} ({count})"
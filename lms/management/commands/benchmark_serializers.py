@@ -0,0 +1,126 @@
+import gc
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from lms.models import Course, Inscripcion, Lesson, Usuario
+from lms.serializers import CourseSerializer, InscripcionSerializer, LessonSerializer, UsuarioSerializer
+from lms.values_serializer import compile_values_serializer
+
+# nombre -> (serializer, fields, expand), como los pediría un listado.
+CASES = {
+    "usuarios": (UsuarioSerializer, (), ()),
+    "cursos?expand=instructor": (CourseSerializer, (), ("instructor",)),
+    "lecciones?expand=curso.instructor": (LessonSerializer, (), ("curso.instructor",)),
+    "inscripciones": (InscripcionSerializer, (), ()),
+    "inscripciones?expand=curso.instructor,usuario": (InscripcionSerializer, (), ("curso.instructor", "usuario")),
+}
+
+
+def build_objects(model, count):
+    """``count`` instancias en memoria (sin base de datos) con sus relaciones ya cargadas."""
+    now = timezone.now()
+    usuarios = [
+        Usuario(id=i, correo=f"u{i}@lms.test", nombre=f"Usuario {i}", created_at=now, updated_at=now)
+        for i in range(1, 101)
+    ]
+    cursos = [
+        Course(
+            id=i, title=f"Curso {i}", description="Descripción " * 10, instructor=usuarios[i % 100],
+            avatar=f"course_avatars/{i}.png" if i % 2 else "", lesson_count=i, enrollment_count=2 * i,
+            student_count=i, instructor_count=1, created_at=now, updated_at=now + timedelta(seconds=i),
+        )
+        for i in range(1, 51)
+    ]
+    if model is Usuario:
+        return [
+            Usuario(id=i, correo=f"u{i}@lms.test", nombre=f"Usuario {i}", created_at=now, updated_at=now)
+            for i in range(1, count + 1)
+        ]
+    if model is Course:
+        return [
+            Course(
+                id=i, title=f"Curso {i}", description="", instructor=usuarios[i % 100], avatar="",
+                created_at=now, updated_at=now,
+            )
+            for i in range(1, count + 1)
+        ]
+    if model is Lesson:
+        return [
+            Lesson(id=i, nombre_leccion=f"Lección {i}", curso=cursos[i % 50], created_at=now, updated_at=now)
+            for i in range(1, count + 1)
+        ]
+    return [
+        Inscripcion(
+            id=i, usuario=usuarios[i % 100], curso=cursos[i % 50], fecha_inscripcion=now.date(),
+            rol="instructor" if i % 10 == 0 else "estudiante", updated_at=now,
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def row_of(instance, paths):
+    """La tupla que devolvería ``values_list(*paths)`` para ``instance``."""
+    row = []
+    for path in paths:
+        value = instance
+        for name in path.split("__"):
+            value = getattr(value, name)
+        row.append(value.name if hasattr(value, "storage") else value)
+    return tuple(row)
+
+
+def best_of(repeat, function):
+    # Como timeit: sin el recolector de basura durante la medida.
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            result = function()
+            timings.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return min(timings), result
+
+
+class Command(BaseCommand):
+    help = (
+        "Microbenchmark de la serialización de listados: serializa N objetos en memoria con el "
+        "ModelSerializer de DRF y con lms.values_serializer, comprueba que la salida es idéntica y "
+        "falla si el camino rápido no llega a --min-speedup veces más rápido. Los objetos comparten "
+        "100 usuarios y 50 cursos, como las páginas reales. No usa la base de datos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--objects", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=3, help="Se toma la mejor de N vueltas.")
+        parser.add_argument("--min-speedup", type=float, default=3.0)
+        parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+
+    def handle(self, *args, objects, repeat, min_speedup, cases, **options):
+        self.stdout.write(f"{'caso':<48} {'DRF ms':>9} {'values ms':>10} {'×':>6}")
+        slow = []
+        for name in cases:
+            serializer_class, fields, expand = CASES[name]
+            values = compile_values_serializer(serializer_class, fields, expand)
+            if values is None:
+                raise CommandError(f"{name}: el serializer no admite el camino rápido.")
+            instances = build_objects(serializer_class.Meta.model, objects)
+            rows = [row_of(instance, values.paths) for instance in instances]
+
+            drf_time, expected = best_of(repeat, lambda: serializer_class(
+                instances, many=True, fields=fields, expand=expand,
+            ).data)
+            values_time, result = best_of(repeat, lambda: values.serialize(rows))
+            if result != expected:
+                raise CommandError(f"{name}: la salida no coincide con la del serializer de DRF.")
+            speedup = drf_time / values_time
+            self.stdout.write(f"{name:<48} {drf_time * 1000:>9.1f} {values_time * 1000:>10.1f} {speedup:>6.1f}")
+            if speedup < min_speedup:
+                slow.append(f"{name} ({speedup:.1f}×)")
+        if slow:
+            raise CommandError(f"Por debajo de {min_speedup}×: {', '.join(slow)}")
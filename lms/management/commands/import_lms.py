@@ -0,0 +1,229 @@
+import csv
+import io
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from lms.counters import rebuild_counters
+from lms.dashboard import bump_dashboards
+from lms.models import Usuario, Course, Lesson, Inscripcion
+from lms.passwords import hash_many, password_pool
+from lms.response_cache import bump_namespace
+
+# Clave natural de un curso: título + correo del instructor.
+COURSES = """
+    courses AS (
+        SELECT DISTINCT ON (c.title, u.correo) c.id, c.title, u.correo
+        FROM lms_course c JOIN lms_usuario u ON u.id = c.instructor_id
+        WHERE (c.title, u.correo) IN (SELECT curso_title, instructor_correo FROM {table})
+        ORDER BY c.title, u.correo, c.id
+    )
+"""
+
+# Cada sentencia devuelve (filas nuevas, filas que ya existían). Ante
+# duplicados en el fichero gana la última aparición (columna n).
+UPSERTS = {
+    "usuarios": """
+        WITH src AS (
+            SELECT DISTINCT ON (correo) correo, coalesce(nombre, '') AS nombre, contrasena
+            FROM import_usuario WHERE correo IS NOT NULL
+            ORDER BY correo, n DESC
+        ), ups AS (
+            INSERT INTO lms_usuario (correo, nombre, contrasena, created_at, updated_at)
+            SELECT correo, nombre, coalesce(contrasena, '!'), now(), now() FROM src
+            ON CONFLICT (correo) DO UPDATE SET
+                nombre = EXCLUDED.nombre,
+                -- '!' = sin contraseña en el fichero (un '!' literal llega ya hasheado)
+                contrasena = CASE WHEN EXCLUDED.contrasena = '!' THEN lms_usuario.contrasena
+                                  ELSE EXCLUDED.contrasena END,
+                updated_at = EXCLUDED.updated_at
+            RETURNING (xmax = 0) AS inserted
+        )
+        SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM ups
+    """,
+    "cursos": """
+        WITH src AS (
+            SELECT DISTINCT ON (s.title, u.id) s.title, coalesce(s.description, '') AS description,
+                   u.id AS instructor_id
+            FROM import_course s JOIN lms_usuario u ON u.correo = s.instructor_correo
+            WHERE s.title IS NOT NULL
+            ORDER BY s.title, u.id, s.n DESC
+        ), upd AS (
+            UPDATE lms_course c SET description = src.description, updated_at = now()
+            FROM src WHERE c.title = src.title AND c.instructor_id = src.instructor_id
+            RETURNING c.id
+        ), ins AS (
+            INSERT INTO lms_course (title, description, instructor_id, avatar_derivatives, lesson_count,
+                                    enrollment_count, student_count, instructor_count, created_at, updated_at)
+            SELECT title, description, instructor_id, '{}', 0, 0, 0, 0, now(), now() FROM src
+            WHERE NOT EXISTS (
+                SELECT 1 FROM lms_course c WHERE c.title = src.title AND c.instructor_id = src.instructor_id
+            )
+            RETURNING id
+        )
+        SELECT (SELECT count(*) FROM ins), (SELECT count(*) FROM upd)
+    """,
+    "lecciones": """
+        WITH """ + COURSES.format(table="import_lesson") + """, src AS (
+            SELECT DISTINCT ON (c.id, s.nombre_leccion) s.nombre_leccion, c.id AS curso_id
+            FROM import_lesson s JOIN courses c ON c.title = s.curso_title AND c.correo = s.instructor_correo
+            WHERE s.nombre_leccion IS NOT NULL
+            ORDER BY c.id, s.nombre_leccion, s.n DESC
+        ), ins AS (
+            INSERT INTO lms_lesson (nombre_leccion, curso_id, created_at, updated_at)
+            SELECT nombre_leccion, curso_id, now(), now() FROM src
+            WHERE NOT EXISTS (
+                SELECT 1 FROM lms_lesson l WHERE l.curso_id = src.curso_id AND l.nombre_leccion = src.nombre_leccion
+            )
+            RETURNING id
+        )
+        SELECT (SELECT count(*) FROM ins), (SELECT count(*) FROM src) - (SELECT count(*) FROM ins)
+    """,
+    "inscripciones": """
+        WITH """ + COURSES.format(table="import_inscripcion") + """, src AS (
+            SELECT DISTINCT ON (u.id, c.id) u.id AS usuario_id, c.id AS curso_id,
+                   coalesce(s.rol, %(rol)s) AS rol,
+                   coalesce(s.fecha_inscripcion::date, current_date) AS fecha_inscripcion
+            FROM import_inscripcion s
+            JOIN lms_usuario u ON u.correo = s.usuario_correo
+            JOIN courses c ON c.title = s.curso_title AND c.correo = s.instructor_correo
+            ORDER BY u.id, c.id, s.n DESC
+        ), ups AS (
+            INSERT INTO lms_inscripcion (usuario_id, curso_id, rol, fecha_inscripcion, updated_at)
+            SELECT usuario_id, curso_id, rol, fecha_inscripcion, now() FROM src
+            ON CONFLICT (usuario_id, curso_id) DO UPDATE SET rol = EXCLUDED.rol, updated_at = EXCLUDED.updated_at
+            RETURNING (xmax = 0) AS inserted
+        )
+        SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM ups
+    """,
+}
+
+# tipo -> (tabla temporal, columnas, columnas obligatorias, modelo)
+KINDS = {
+    "usuarios": ("import_usuario", ("correo", "nombre", "contrasena"), ("correo",), Usuario),
+    "cursos": ("import_course", ("title", "description", "instructor_correo"),
+               ("title", "instructor_correo"), Course),
+    "lecciones": ("import_lesson", ("nombre_leccion", "curso_title", "instructor_correo"),
+                  ("nombre_leccion", "curso_title", "instructor_correo"), Lesson),
+    "inscripciones": ("import_inscripcion",
+                      ("usuario_correo", "curso_title", "instructor_correo", "rol", "fecha_inscripcion"),
+                      ("usuario_correo", "curso_title", "instructor_correo"), Inscripcion),
+}
+
+
+def read_rows(path, fmt):
+    with open(path, newline="", encoding="utf-8") as handle:
+        if fmt == "csv":
+            yield from csv.DictReader(handle)
+        else:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa usuarios, cursos, lecciones e inscripciones desde CSV o NDJSON con COPY a tablas "
+        "temporales y upsert por clave natural (correo; título del curso + correo del instructor)."
+    )
+
+    def add_arguments(self, parser):
+        for kind in KINDS:
+            parser.add_argument(f"--{kind}", metavar="FICHERO", help=f"Fichero de {kind}.")
+        parser.add_argument("--format", choices=["csv", "ndjson"],
+                            help="Por defecto se deduce de la extensión (.ndjson/.jsonl o CSV).")
+        parser.add_argument("--batch-size", type=int, default=10000, help="Filas por COPY.")
+        parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                            help="Procesos para hashear contraseñas (1 = en este proceso).")
+
+    def handle(self, *args, batch_size, workers, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("La importación usa COPY: necesita PostgreSQL.")
+        files = {kind: options[kind] for kind in KINDS if options[kind]}
+        if not files:
+            raise CommandError("Indica al menos un fichero (--usuarios, --cursos, --lecciones, --inscripciones).")
+
+        pool = password_pool(workers) if "usuarios" in files and workers > 1 else None
+        started = time.monotonic()
+        total = 0
+        try:
+            with transaction.atomic():
+                for kind, path in files.items():
+                    fmt = options["format"] or ("ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv")
+                    total += self.import_kind(kind, read_rows(path, fmt), batch_size, pool)
+                if files.keys() - {"usuarios"}:
+                    processed = fixed = 0
+                    for processed, fixed in rebuild_counters():
+                        pass
+                    self.stdout.write(f"Contadores: {processed} cursos revisados, {fixed} corregidos")
+                for kind in files:
+                    bump_namespace(KINDS[kind][3])
+                if "inscripciones" in files:
+                    bump_dashboards()
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Listo: {total} filas en {elapsed:.1f}s ({total / max(elapsed, 1e-6):.0f} filas/s)."
+        ))
+
+    def import_kind(self, kind, rows, batch_size, pool):
+        table, columns, required, _ = KINDS[kind]
+        started = time.monotonic()
+        staged = 0
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            cursor.execute(
+                f"CREATE TEMP TABLE {table} (n bigint, {', '.join(f'{name} text' for name in columns)}) "
+                "ON COMMIT DROP"
+            )
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                for row in batch:
+                    missing = [name for name in required if not row.get(name)]
+                    if missing:
+                        raise CommandError(f"{kind}, fila {staged + 1}: faltan {', '.join(missing)}")
+                    staged += 1
+                    row["n"] = staged
+                if kind == "usuarios":
+                    self.hash_passwords(batch, pool)
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for row in batch:
+                    writer.writerow([row["n"], *(_text(row.get(name)) for name in columns)])
+                with cursor.copy(f"COPY {table} (n, {', '.join(columns)}) FROM STDIN WITH (FORMAT csv)") as copy:
+                    copy.write(buffer.getvalue())
+                elapsed = time.monotonic() - started
+                self.stdout.write(f"{kind}: {staged} filas cargadas ({staged / max(elapsed, 1e-6):.0f} filas/s)")
+
+            cursor.execute(UPSERTS[kind], {"rol": Inscripcion.ROL_ESTUDIANTE})
+            inserted, existing = cursor.fetchone()
+            cursor.execute(f"DROP TABLE {table}")
+
+        elapsed = time.monotonic() - started
+        skipped = staged - inserted - existing
+        self.stdout.write(
+            f"{kind}: {inserted} nuevos, {existing} existentes, {skipped} descartados "
+            f"(duplicados o sin referencia) en {elapsed:.1f}s"
+        )
+        return staged
+
+    def hash_passwords(self, batch, pool):
+        # Sin contraseña en el fichero se conserva la actual (o queda inutilizable si es nuevo).
+        pending = [row for row in batch if row.get("contrasena")]
+        for row, hashed in zip(pending, hash_many([row["contrasena"] for row in pending], pool)):
+            row["contrasena"] = hashed
+
+
+def _text(value):
+    if value is None or value == "":
+        return None
+    return str(value)
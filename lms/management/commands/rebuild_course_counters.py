@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from lms.counters import rebuild_counters
+from lms.models import Course
+
+
+class Command(BaseCommand):
+    help = "Recalcula (o comprueba con --dry-run) los contadores desnormalizados de Course por lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true", help="Sólo informa de los cursos descuadrados.")
+        parser.add_argument("ids", nargs="*", type=int, help="Limita a estos cursos.")
+
+    def handle(self, *args, batch_size, dry_run, ids, **options):
+        queryset = Course.objects.filter(pk__in=ids) if ids else Course.objects.all()
+        processed = fixed = 0
+        for processed, fixed in rebuild_counters(queryset, batch_size=batch_size, dry_run=dry_run):
+            self.stdout.write(f"{processed} cursos revisados, {fixed} descuadrados")
+        verb = "descuadrados" if dry_run else "corregidos"
+        self.stdout.write(self.style.SUCCESS(f"Listo: {processed} cursos, {fixed} {verb}."))
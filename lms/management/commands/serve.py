@@ -0,0 +1,90 @@
+import os
+import sys
+from importlib.util import find_spec
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from lms.catalogue import catalogue_cache_timeout
+from lms.dashboard import cache_timeout as dashboard_cache_timeout
+from lms.response_cache import cache_timeout
+from project import gunicorn_conf
+
+
+def per_process_cache():
+    """Alias de la caché del LMS si es LocMemCache (una por proceso) y alguna caché está activada."""
+    alias = getattr(settings, "LMS_API_CACHE_ALIAS", "default")
+    if not isinstance(caches[alias], LocMemCache):
+        return None
+    if not (cache_timeout() or catalogue_cache_timeout() or dashboard_cache_timeout()):
+        return None
+    return alias
+
+
+class Command(BaseCommand):
+    help = (
+        "Servidor de producción: gunicorn con workers pre-forked y la aplicación precargada, "
+        "para project.wsgi o project.asgi (--asgi). Workers e hilos según las CPUs disponibles, "
+        "reciclado por número de peticiones y estáticos servidos sin pasar por Django. "
+        "kill -HUP recarga los workers sin cortar conexiones; con código nuevo, "
+        "kill -USR2 arranca un maestro nuevo y kill -QUIT al anterior lo retira."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--asgi", action="store_true", help="Sirve project.asgi con workers de uvicorn.")
+        parser.add_argument("--bind", default=gunicorn_conf.bind)
+        parser.add_argument("--workers", type=int,
+                            help="Por defecto WEB_CONCURRENCY o, sin ella, 2×CPU+1 (WSGI) o CPU+1 (ASGI).")
+        parser.add_argument("--threads", type=int, default=gunicorn_conf.DEFAULT_THREADS,
+                            help="Hilos por worker WSGI.")
+        parser.add_argument("--max-requests", type=int, default=gunicorn_conf.max_requests,
+                            help="Peticiones antes de reciclar un worker (0 = nunca).")
+        parser.add_argument("--timeout", type=int, default=gunicorn_conf.timeout)
+        parser.add_argument("--no-collectstatic", action="store_false", dest="collectstatic",
+                            help="No ejecuta collectstatic antes de arrancar.")
+        parser.add_argument("--check", action="store_true",
+                            help="Muestra la orden de gunicorn sin ejecutarla.")
+
+    def handle(self, *args, asgi, bind, workers, threads, max_requests, timeout, collectstatic, check, **options):
+        if workers is None:
+            workers = gunicorn_conf.configured_workers(asgi)
+        argv = [
+            sys.executable, "-m", "gunicorn", "project.asgi:application" if asgi else "project.wsgi:application",
+            "--config", "python:project.gunicorn_conf",
+            "--bind", bind,
+            "--workers", str(workers),
+            "--max-requests", str(max_requests),
+            "--timeout", str(timeout),
+        ]
+        if asgi:
+            argv += ["--worker-class", "uvicorn_worker.UvicornWorker"]
+        else:
+            argv += ["--worker-class", "gthread", "--threads", str(threads)]
+        alias = per_process_cache()
+        if alias is not None and workers > 1:
+            self.stderr.write(self.style.WARNING(
+                f"La caché «{alias}» es LocMemCache: cada uno de los {workers} workers tendría la suya y "
+                "una escritura no invalidaría la de los demás. Usa CACHE_DIR o REDIS_URL (ver README), "
+                "--workers 1 o desactiva las cachés del LMS (*_CACHE_TIMEOUT = 0)."
+            ))
+
+        if check:
+            self.stdout.write(" ".join(argv))
+            return
+        for module in ("gunicorn", "uvicorn_worker") if asgi else ("gunicorn",):
+            if find_spec(module) is None:
+                raise CommandError(f"Falta {module} (pip install -r requirements.txt).")
+        if collectstatic:
+            call_command("collectstatic", interactive=False, verbosity=0)
+        self.stdout.write(
+            f"{'ASGI' if asgi else 'WSGI'} en {bind}: {workers} workers"
+            + ("" if asgi else f" × {threads} hilos")
+            + f" ({gunicorn_conf.available_cpus()} CPUs)"
+        )
+        sys.stdout.flush()
+        # gunicorn sustituye a este proceso: recibe directamente las señales (PID 1 en Docker).
+        os.execv(sys.executable, argv)
+
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:48
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Course = apps.get_model('lms', 'Course')
+    Lesson = apps.get_model('lms', 'Lesson')
+    Inscripcion = apps.get_model('lms', 'Inscripcion')
+
+    def count(model, **filters):
+        subquery = (
+            model.objects.filter(curso=OuterRef('pk'), **filters)
+            .order_by().values('curso').annotate(n=Count('pk')).values('n')
+        )
+        return Coalesce(Subquery(subquery, output_field=IntegerField()), Value(0))
+
+    Course.objects.update(
+        lesson_count=count(Lesson),
+        enrollment_count=count(Inscripcion),
+        student_count=count(Inscripcion, rol='estudiante'),
+        instructor_count=count(Inscripcion, rol='instructor'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0003_remove_course_id_curso_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='enrollment_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='instructor_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='lesson_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='student_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,118 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:51
+
+from collections import Counter, defaultdict
+
+import django.db.models.deletion
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+from django.db.models import Count, Exists, F, OuterRef
+
+UNIQUE_INSCRIPCION = models.UniqueConstraint(fields=('usuario', 'curso'), name='inscripcion_usuario_curso_uniq')
+
+ROL_COUNTERS = {'estudiante': 'student_count', 'instructor': 'instructor_count'}
+
+
+def remove_duplicate_inscripciones(apps, schema_editor):
+    """Deja la inscripción más antigua de cada (usuario, curso) y descuenta las demás de los contadores."""
+    Course = apps.get_model('lms', 'Course')
+    Inscripcion = apps.get_model('lms', 'Inscripcion')
+    older = Inscripcion.objects.filter(usuario=OuterRef('usuario'), curso=OuterRef('curso'), pk__lt=OuterRef('pk'))
+    duplicates = Inscripcion.objects.filter(Exists(older))
+    deltas = defaultdict(Counter)
+    for row in duplicates.values('curso', 'rol').annotate(n=Count('pk')).order_by():
+        deltas[row['curso']]['enrollment_count'] += row['n']
+        if row['rol'] in ROL_COUNTERS:
+            deltas[row['curso']][ROL_COUNTERS[row['rol']]] += row['n']
+    if not deltas:
+        return
+    Inscripcion.objects.filter(pk__in=list(duplicates.values_list('pk', flat=True))).delete()
+    for curso_id in sorted(deltas):
+        Course.objects.filter(pk=curso_id).update(
+            **{name: F(name) - n for name, n in deltas[curso_id].items()}
+        )
+
+
+def add_unique_inscripcion(apps, schema_editor):
+    """
+    El índice único se crea con CONCURRENTLY y se convierte en la restricción
+    con ADD CONSTRAINT ... USING INDEX: el ACCESS EXCLUSIVE de ese ALTER TABLE
+    dura un instante porque no vuelve a recorrer la tabla.
+    """
+    Inscripcion = apps.get_model('lms', 'Inscripcion')
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.execute(UNIQUE_INSCRIPCION.create_sql(Inscripcion, schema_editor))
+        return
+    name = UNIQUE_INSCRIPCION.name
+    concurrently = '' if schema_editor.connection.in_atomic_block else 'CONCURRENTLY '
+    # Un CREATE INDEX CONCURRENTLY que falló a medias deja un índice inválido con el mismo nombre.
+    schema_editor.execute(f"DROP INDEX {concurrently}IF EXISTS {name}")
+    schema_editor.execute(f"CREATE UNIQUE INDEX {concurrently}{name} ON lms_inscripcion (usuario_id, curso_id)")
+    schema_editor.execute(f"ALTER TABLE lms_inscripcion ADD CONSTRAINT {name} UNIQUE USING INDEX {name}")
+
+
+def remove_unique_inscripcion(apps, schema_editor):
+    Inscripcion = apps.get_model('lms', 'Inscripcion')
+    schema_editor.execute(UNIQUE_INSCRIPCION.remove_sql(Inscripcion, schema_editor))
+
+
+class Migration(migrations.Migration):
+    # Índices creados con CONCURRENTLY para no bloquear escrituras en tablas
+    # grandes; los índices simples de FK se quitan después de crear los
+    # compuestos que los sustituyen. Antes de la restricción única se borran
+    # las inscripciones repetidas, que hasta ahora nada impedía.
+    atomic = False
+
+    dependencies = [
+        ('lms', '0004_course_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_inscripciones, migrations.RunPython.noop, atomic=True),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunPython(add_unique_inscripcion, remove_unique_inscripcion)],
+            state_operations=[migrations.AddConstraint(model_name='inscripcion', constraint=UNIQUE_INSCRIPCION)],
+        ),
+        AddIndexConcurrently(
+            model_name='course',
+            index=models.Index(fields=['created_at', 'id'], name='course_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='inscripcion',
+            index=models.Index(fields=['curso', 'rol'], name='inscripcion_curso_rol_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='inscripcion',
+            index=models.Index(fields=['fecha_inscripcion', 'id'], name='inscripcion_fecha_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='inscripcion',
+            index=models.Index(condition=models.Q(('rol', 'instructor')), fields=['fecha_inscripcion', 'id'], name='inscripcion_instructor_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='lesson',
+            index=models.Index(fields=['curso', 'id'], name='lesson_curso_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='lesson',
+            index=models.Index(fields=['created_at', 'id'], name='lesson_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='usuario',
+            index=models.Index(fields=['created_at', 'id'], name='usuario_created_idx'),
+        ),
+        migrations.AlterField(
+            model_name='inscripcion',
+            name='curso',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='inscripciones', to='lms.course'),
+        ),
+        migrations.AlterField(
+            model_name='inscripcion',
+            name='usuario',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='inscripciones', to='lms.usuario'),
+        ),
+        migrations.AlterField(
+            model_name='lesson',
+            name='curso',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='lessons', to='lms.course'),
+        ),
+    ]
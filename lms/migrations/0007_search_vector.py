@@ -0,0 +1,81 @@
+# Generated by Django 5.2.6 on 2026-10-18 22:05
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# tsvector de cada tabla (configuración 'spanish', la de lms.search.SEARCH_CONFIG).
+# {row} es «NEW.» en el trigger y nada en el relleno inicial.
+SEARCH_VECTORS = {
+    'lms_course': (
+        "setweight(to_tsvector('spanish', coalesce({row}title, '')), 'A') || "
+        "setweight(to_tsvector('spanish', coalesce({row}description, '')), 'B')"
+    ),
+    'lms_lesson': "setweight(to_tsvector('spanish', coalesce({row}nombre_leccion, '')), 'A')",
+}
+SOURCE_COLUMNS = {'lms_course': 'title, description', 'lms_lesson': 'nombre_leccion'}
+# Búsqueda por trigramas (erratas) si el servidor tiene pg_trgm.
+TRIGRAM_COLUMNS = {'lms_course': 'title', 'lms_lesson': 'nombre_leccion'}
+
+
+def install_search(apps, schema_editor):
+    """
+    Triggers que mantienen search_vector (también en COPY, bulk_create y
+    update()), relleno de las filas existentes e índices GIN. Se puede
+    repetir sin error.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, vector in SEARCH_VECTORS.items():
+        schema_editor.execute(
+            f"CREATE OR REPLACE FUNCTION {table}_search_vector() RETURNS trigger LANGUAGE plpgsql AS $$ "
+            f"BEGIN NEW.search_vector := {vector.format(row='NEW.')}; RETURN NEW; END $$"
+        )
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_search_vector ON {table}")
+        schema_editor.execute(
+            f"CREATE TRIGGER {table}_search_vector BEFORE INSERT OR UPDATE OF {SOURCE_COLUMNS[table]} "
+            f"ON {table} FOR EACH ROW EXECUTE FUNCTION {table}_search_vector()"
+        )
+        schema_editor.execute(f"UPDATE {table} SET search_vector = {vector.format(row='')}")
+        schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {table}_search_idx ON {table} USING gin (search_vector)")
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table, column in TRIGRAM_COLUMNS.items():
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {table}_{column}_trgm_idx ON {table} USING gin ({column} gin_trgm_ops)"
+        )
+
+
+def remove_search(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in TRIGRAM_COLUMNS.items():
+        schema_editor.execute(f"DROP INDEX IF EXISTS {table}_{column}_trgm_idx")
+    for table in SEARCH_VECTORS:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {table}_search_idx")
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_search_vector ON {table}")
+        schema_editor.execute(f"DROP FUNCTION IF EXISTS {table}_search_vector()")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0006_inscripcion_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(install_search, remove_search),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+# search_fields del admin que se buscan con icontains: UsuarioAdmin, el
+# autocompletado de usuarios y la búsqueda de InscripcionAdmin. En PostgreSQL
+# Django compila icontains como UPPER(columna::text) LIKE UPPER('%término%'),
+# así que el índice es sobre esa expresión.
+TRIGRAM_COLUMNS = [('lms_usuario', 'nombre'), ('lms_usuario', 'correo'), ('lms_course', 'title')]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """Índices GIN de trigramas para icontains si el servidor tiene pg_trgm."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    concurrently = '' if schema_editor.connection.in_atomic_block else 'CONCURRENTLY '
+    for table, column in TRIGRAM_COLUMNS:
+        schema_editor.execute(
+            f"CREATE INDEX {concurrently}IF NOT EXISTS {table}_{column}_upper_trgm_idx "
+            f"ON {table} USING gin ((UPPER({column}::text)) gin_trgm_ops)"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in TRIGRAM_COLUMNS:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {table}_{column}_upper_trgm_idx")
+
+
+class Migration(migrations.Migration):
+    # CONCURRENTLY, como en la 0005: no bloquea las escrituras en tablas grandes.
+    atomic = False
+
+    dependencies = [
+        ('lms', '0007_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -1,5 +1,15 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
+from .avatars import avatar_sources
+
+
+class SearchableManager(models.Manager):
+    """Las instancias no cargan ``search_vector``: sólo lo leen los filtros de lms.search."""
+
+    def get_queryset(self):
+        return super().get_queryset().defer("search_vector")
+
 
 class Usuario(models.Model):
     # id (AutoField por defecto)
@@ -9,6 +19,12 @@ class Usuario(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Paginación keyset (created_at, id)
+            models.Index(fields=["created_at", "id"], name="usuario_created_idx"),
+        ]
+
     def __str__(self):
         return f"{self.nombre} ({self.correo})"
 
@@ -23,12 +39,58 @@ class Course(models.Model):
         related_name="courses_taught"
     )
     avatar = models.ImageField(upload_to="course_avatars/", null=True, blank=True)
+    # {"hash": ..., "widths": [...]} de los derivados WebP/JPEG del avatar;
+    # lo escribe el pool de lms.avatars después de cada subida.
+    avatar_derivatives = models.JSONField(default=dict, blank=True, editable=False)
+    # Contadores desnormalizados, mantenidos por lms.signals. Sin CHECK >= 0:
+    # un contador descuadrado no debe impedir borrar; se repara con
+    # manage.py rebuild_course_counters.
+    lesson_count = models.IntegerField(default=0, editable=False)
+    enrollment_count = models.IntegerField(default=0, editable=False)
+    student_count = models.IntegerField(default=0, editable=False)
+    instructor_count = models.IntegerField(default=0, editable=False)
+    # tsvector de title (peso A) y description (B) para lms.search. Lo
+    # mantiene un trigger de PostgreSQL; el índice GIN está en la migración
+    # 0007 (no se declara aquí para que el modelo siga valiendo en SQLite).
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Cambia con cualquier cambio en lo que se sirve del curso, también cuando
+    # sólo se mueven los contadores (una inscripción o una lección nueva): es
+    # la versión de los ETag del API y de las tarjetas del catálogo, que
+    # muestran esos contadores. No es la fecha de la última edición.
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = SearchableManager()
+
+    COUNTER_FIELDS = ("lesson_count", "enrollment_count", "student_count", "instructor_count")
+
+    class Meta:
+        indexes = [
+            # Paginación keyset y CourseAdmin.ordering (-created_at, -pk)
+            models.Index(fields=["created_at", "id"], name="course_created_idx"),
+        ]
+
     def __str__(self):
         return f"{self.title} (ID: {self.id})"
 
+    @property
+    def avatar_sources(self):
+        """``src`` y ``srcset`` WebP/JPEG de los derivados del avatar (``None`` si aún no hay)."""
+        storage = self._meta.get_field("avatar").storage
+        return avatar_sources(self.avatar_derivatives, storage.url)
+
+    def save(self, *args, **kwargs):
+        # Los contadores sólo se escriben con UPDATE ... F(): un save() normal
+        # pisaría los incrementos concurrentes con el valor leído. search_vector
+        # lo calcula el trigger y avatar_derivatives el pool de lms.avatars.
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.COUNTER_FIELDS
+                and f.name not in ("search_vector", "avatar_derivatives") and f.attname in self.__dict__
+            ]
+        super().save(*args, **kwargs)
+
 
 class Lesson(models.Model):
     # id (AutoField por defecto)
@@ -36,29 +98,63 @@ class Lesson(models.Model):
     curso = models.ForeignKey(
         Course,
         on_delete=models.CASCADE,
-        related_name="lessons"
+        related_name="lessons",
+        db_index=False,  # cubierto por lesson_curso_idx
     )
+    # tsvector de nombre_leccion, como Course.search_vector.
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = SearchableManager()
+
+    class Meta:
+        indexes = [
+            # Lecciones de un curso y LessonAdmin.ordering (curso, id)
+            models.Index(fields=["curso", "id"], name="lesson_curso_idx"),
+            models.Index(fields=["created_at", "id"], name="lesson_created_idx"),
+        ]
+
     def __str__(self):
         return f"{self.nombre_leccion} (Curso: {self.curso.title})"
 
 
 class Inscripcion(models.Model):
+    ROL_ESTUDIANTE = "estudiante"
+    ROL_INSTRUCTOR = "instructor"
+
     # id (AutoField por defecto)
     usuario = models.ForeignKey(
         Usuario,
         on_delete=models.CASCADE,
-        related_name="inscripciones"
+        related_name="inscripciones",
+        db_index=False,  # cubierto por inscripcion_usuario_curso_uniq
     )
     curso = models.ForeignKey(
         Course,
         on_delete=models.CASCADE,
-        related_name="inscripciones"
+        related_name="inscripciones",
+        db_index=False,  # cubierto por inscripcion_curso_rol_idx
     )
     fecha_inscripcion = models.DateField(auto_now_add=True)
     rol = models.CharField(max_length=50)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["usuario", "curso"], name="inscripcion_usuario_curso_uniq"),
+        ]
+        indexes = [
+            # Contadores por rol de un curso
+            models.Index(fields=["curso", "rol"], name="inscripcion_curso_rol_idx"),
+            # Paginación keyset e InscripcionAdmin.ordering (-fecha_inscripcion, -pk)
+            models.Index(fields=["fecha_inscripcion", "id"], name="inscripcion_fecha_idx"),
+            # list_filter rol=instructor: pocos instructores entre muchos estudiantes
+            models.Index(
+                fields=["fecha_inscripcion", "id"], condition=models.Q(rol="instructor"),
+                name="inscripcion_instructor_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.usuario.nombre} → {self.curso.title} ({self.rol})"
@@ -0,0 +1,282 @@
+"""
+Paginación del API del LMS.
+
+Por defecto se comporta como ``PageNumberPagination``. Si la petición trae
+el parámetro ``cursor`` (vacío para la primera página) se pasa a modo
+keyset: se filtra por los valores de la última fila vista en lugar de usar
+``OFFSET`` y sólo se ejecuta ``COUNT(*)`` si el cliente pide ``count=true``.
+"""
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+TRUE_VALUES = {"1", "true", "yes", "si", "sí"}
+
+
+class KeysetPagination(PageNumberPagination):
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    invalid_cursor_message = "Cursor inválido."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if self.keyset:
+            if not self.start_keyset(request):
+                return None
+            self.count = queryset.count() if self.wants_count(request) else None
+            queryset, cursor = self.keyset_queryset(queryset, request, view)
+            return self.keyset_page(list(self.page_rows(queryset[:self.page_size + 1], view)), cursor)
+
+        paginator = self.number_paginator(queryset, request)
+        if paginator is None:
+            return None
+        paginator.count = queryset.count()  # ``count`` es un cached_property
+        self.number_page(paginator, request)
+        self.page.object_list = list(self.page_rows(self.page.object_list, view))
+        return list(self.page)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` con el ORM asíncrono (``lms.async_views``)."""
+        self.keyset = self.cursor_query_param in request.query_params
+        if self.keyset:
+            if not self.start_keyset(request):
+                return None
+            self.count = await queryset.acount() if self.wants_count(request) else None
+            queryset, cursor = self.keyset_queryset(queryset, request, view)
+            return self.keyset_page(await _alist(self.page_rows(queryset[:self.page_size + 1], view)), cursor)
+
+        paginator = self.number_paginator(queryset, request)
+        if paginator is None:
+            return None
+        paginator.count = await queryset.acount()
+        self.number_page(paginator, request)
+        self.page.object_list = await _alist(self.page_rows(self.page.object_list, view))
+        return list(self.page)
+
+    def number_paginator(self, queryset, request):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        return self.django_paginator_class(queryset, page_size)
+
+    def number_page(self, paginator, request):
+        """Lo mismo que ``PageNumberPagination.paginate_queryset`` una vez contadas las filas."""
+        self.page = self.get_page(paginator, request)
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.request = request
+
+    def get_page(self, paginator, request):
+        page_number = self.get_page_number(request, paginator)
+        try:
+            return paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+
+    def page_rows(self, queryset, view):
+        """
+        Queryset que se lee para la página, ya contada y cortada: el de
+        ``view.page_rows`` si la vista lo define (``lms.values_serializer``).
+        """
+        page_rows = getattr(view, "page_rows", None)
+        if page_rows is None:
+            return queryset
+        queryset = page_rows(queryset)
+        if self.keyset and queryset._fields:
+            # Filas de values_list(): el cursor necesita sus columnas.
+            missing = [field.attname for field in self.fields if field.attname not in queryset._fields]
+            if missing:
+                queryset = queryset.values_list(*queryset._fields, *missing, named=True)
+        return queryset
+
+    def start_keyset(self, request):
+        self.request = request
+        self.base_url = remove_query_param(request.build_absolute_uri(), self.page_query_param)
+        self.page_size = self.get_page_size(request)
+        return bool(self.page_size)
+
+    def keyset_page(self, results, cursor):
+        """Recorta la fila de más y calcula los enlaces de la página ``results``."""
+        reverse = bool(cursor and cursor["r"])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.page_results = results
+        return results
+
+    def counts_rows(self, request):
+        """La respuesta lleva el total de filas (``count``)."""
+        if not self.get_page_size(request):
+            return False
+        return self.cursor_query_param not in request.query_params or self.wants_count(request)
+
+    def served_count(self):
+        """El ``count`` de la página ya servida."""
+        return self.count if self.keyset else self.page.paginator.count
+
+    def validator_queryset(self, queryset, request, view=None, count=None):
+        """
+        Filas de la página que se sirve, sin leerlas: la ventana keyset (con
+        la fila de más) o el corte ``OFFSET``/``LIMIT``, que necesita el total
+        ``count`` para ``page=last``. Sin paginación, todas.
+        """
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return queryset
+        if self.cursor_query_param in request.query_params:
+            return self.keyset_queryset(queryset, request, view)[0][:page_size + 1]
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = count
+        return self.get_page(paginator, request).object_list
+
+    def keyset_queryset(self, queryset, request, view=None):
+        """Queryset ordenado y filtrado tras el cursor de la petición, sin cortar."""
+        self.ordering = self.get_keyset_ordering(request, queryset, view)
+        self.fields = [self._get_field(queryset.model, term) for term in self.ordering]
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor["r"])
+        ordering = [_invert(term) for term in self.ordering] if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        names, defer = queryset.query.deferred_loading
+        if names and not defer:
+            # Con ?fields= el only() puede dejar fuera las columnas del cursor.
+            queryset = queryset.only(*names, *(field.name for field in self.fields))
+        if cursor:
+            queryset = queryset.filter(self._after(ordering, cursor["v"]))
+        return queryset, cursor
+
+    def get_keyset_ordering(self, request, queryset, view):
+        """Orden validado por ``OrderingFilter`` o el de keyset de la vista, con ``id`` de desempate."""
+        ordering = None
+        if view is not None and OrderingFilter in getattr(view, "filter_backends", ()):
+            if request.query_params.get(OrderingFilter.ordering_param):
+                ordering = OrderingFilter().get_ordering(request, queryset, view)
+        if not ordering:
+            ordering = getattr(view, "keyset_ordering", None) or ("id",)
+        terms = []
+        for term in ordering:
+            if term.lstrip("-") in ("pk", "id"):
+                # ``id`` es único: lo que venga detrás no cambia el orden.
+                return terms + [term.replace("pk", "id")]
+            terms.append(term)
+        return terms + ["-id" if terms and terms[-1].startswith("-") else "id"]
+
+    def _get_field(self, model, term):
+        name = term.lstrip("-")
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            field = None
+        if field is None or not field.concrete or field.null:
+            raise ValidationError({OrderingFilter.ordering_param: [
+                f"El orden «{name}» no es compatible con la paginación por cursor."
+            ]})
+        return field
+
+    def _after(self, ordering, values):
+        """Condición «fila posterior a ``values``» para un orden mixto asc/desc."""
+        condition = Q()
+        equal = Q()
+        for term, field, value in zip(ordering, self.fields, values):
+            lookup = "lt" if term.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{field.name}__{lookup}": value})
+            equal &= Q(**{field.name: value})
+        # Cota inclusiva en la primera columna para que el índice acote el rango.
+        first = ordering[0]
+        bound = Q(**{f"{self.fields[0].name}__{'lte' if first.startswith('-') else 'gte'}": values[0]})
+        return bound & condition
+
+    def wants_count(self, request):
+        return request.query_params.get(self.count_query_param, "").lower() in TRUE_VALUES
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            if data["o"] != self.ordering or len(data["v"]) != len(self.fields):
+                raise ValueError
+            values = [field.to_python(value) for field, value in zip(self.fields, data["v"])]
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError, binascii.Error, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return {"v": values, "r": bool(data.get("r"))}
+
+    def encode_cursor(self, instance, reverse):
+        values = [getattr(instance, field.attname) for field in self.fields]
+        payload = json.dumps({"o": self.ordering, "v": values, "r": reverse}, default=_encode_value)
+        encoded = base64.urlsafe_b64encode(payload.encode()).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next or not self.page_results:
+            return None
+        return self.encode_cursor(self.page_results[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if not self.has_previous or not self.page_results:
+            return None
+        return self.encode_cursor(self.page_results[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        body = {}
+        if self.count is not None:
+            body["count"] = self.count
+        body.update(next=self.get_next_link(), previous=self.get_previous_link(), results=data)
+        return Response(body)
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Cursor opaco de paginación keyset (vacío para la primera página).",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.count_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Incluye el total en modo cursor.",
+                "schema": {"type": "boolean"},
+            },
+        ]
+
+
+def _encode_value(value):
+    # isoformat completo: DjangoJSONEncoder trunca a milisegundos y el
+    # cursor tiene que reproducir el valor exacto de la columna.
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+async def _alist(queryset):
+    # Una página es pequeña: ``async for`` la trae (con sus prefetch) en un solo
+    # salto al hilo de la base de datos; aiterator() daría uno por bloque y otro por prefetch.
+    return [obj async for obj in queryset]
+
+
+def _invert(term):
+    return term[1:] if term.startswith("-") else "-" + term
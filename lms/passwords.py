@@ -0,0 +1,162 @@
+"""
+Hash de contraseñas de ``Usuario`` fuera del hilo de la petición.
+
+PBKDF2 con los parámetros por defecto de Django tarda cientos de
+milisegundos por contraseña y no libera el GIL, así que el trabajo se
+reparte entre procesos en lugar de hilos:
+
+* ``hash_many`` hashea lotes (comando ``import_lms``).
+* ``PasswordHasherPool`` atiende a ``UsuarioSerializer``: como mucho
+  ``LMS_PASSWORD_WORKERS`` hashes a la vez y ``LMS_PASSWORD_MAX_PENDING`` en
+  cola. Si no hay hueco en ``LMS_PASSWORD_WAIT`` segundos la petición
+  recibe un 503 con ``Retry-After`` en lugar de acaparar el servidor.
+
+Los procesos se crean con ``forkserver`` (``spawn`` donde no existe), no con
+``fork``: el pool arranca dentro de un worker de gunicorn con hilos y pools
+de conexiones, y un ``fork`` copiaría sus locks a medio tomar. Por eso el
+hijo no hereda los ajustes del padre: cada tarea lleva el hasher y su coste.
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, get_hasher, identify_hasher, make_password
+from django.utils.module_loading import import_string
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PasswordHashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Demasiadas altas de contraseña en curso; reintenta en unos segundos."
+    default_code = "password_hashing_busy"
+    wait = 1  # DRF lo devuelve como Retry-After
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2 con el coste de ``LMS_PBKDF2_ITERATIONS`` (por defecto, el de Django)."""
+
+    @property
+    def iterations(self):
+        return getattr(settings, "LMS_PBKDF2_ITERATIONS", None) or PBKDF2PasswordHasher.iterations
+
+
+def _setup_worker():
+    # Con spawn/forkserver el proceso hijo arranca sin Django configurado.
+    import django
+    django.setup()
+
+
+def hasher_spec():
+    """El hasher por defecto de este proceso y su coste, para enviarlo a los hijos del pool."""
+    hasher = get_hasher()
+    cls = type(hasher)
+    iterations = hasher.iterations if isinstance(hasher, PBKDF2PasswordHasher) else None
+    return f"{cls.__module__}.{cls.__qualname__}", iterations
+
+
+def encode_password(raw, spec=None):
+    """``make_password(raw)``; con ``spec`` (de ``hasher_spec``), con ese hasher y coste."""
+    if spec is None or not raw:
+        return make_password(raw)
+    path, iterations = spec
+    hasher = import_string(path)()
+    if iterations is None:
+        return hasher.encode(raw, hasher.salt())
+    return hasher.encode(raw, hasher.salt(), iterations)
+
+
+def hash_password(raw, spec=None):
+    """Hash de ``raw``; si ya viene con el formato de un hasher se deja tal cual."""
+    if not raw:
+        return make_password(None)
+    try:
+        identify_hasher(raw)
+    except ValueError:
+        return encode_password(raw, spec)
+    return raw
+
+
+def password_pool(workers=None):
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=context, initializer=_setup_worker)
+
+
+def hash_many(passwords, pool=None, chunksize=8):
+    """Hashea ``passwords`` conservando el orden; sin ``pool``, en este proceso."""
+    if pool is None:
+        return [hash_password(raw) for raw in passwords]
+    return list(pool.map(partial(hash_password, spec=hasher_spec()), passwords, chunksize=chunksize))
+
+
+class PasswordHasherPool:
+    """Pool de procesos acotado; ``workers=0`` hashea en el propio hilo."""
+
+    def __init__(self, workers=None, max_pending=32, wait=5.0):
+        self.workers = os.cpu_count() if workers is None else workers
+        self.wait = wait
+        self._slots = threading.BoundedSemaphore(max(self.workers, 1) + max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def make_password(self, raw):
+        if not self._slots.acquire(timeout=self.wait):
+            raise PasswordHashingBusy()
+        try:
+            if self.workers == 0:
+                return make_password(raw)
+            return self._get_executor().submit(encode_password, raw, hasher_spec()).result()
+        finally:
+            self._slots.release()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = password_pool(self.workers)
+            return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_password_hasher_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PasswordHasherPool(
+                workers=getattr(settings, "LMS_PASSWORD_WORKERS", None),
+                max_pending=getattr(settings, "LMS_PASSWORD_MAX_PENDING", 32),
+                wait=getattr(settings, "LMS_PASSWORD_WAIT", 5.0),
+            )
+        return _pool
+
+
+@receiver(setting_changed)
+def reset_password_hasher_pool(setting, **kwargs):
+    global _pool
+    # El hasher y su coste viajan con cada tarea: sólo el tamaño del pool obliga a recrearlo.
+    if setting in ("LMS_PASSWORD_WORKERS", "LMS_PASSWORD_MAX_PENDING", "LMS_PASSWORD_WAIT"):
+        with _pool_lock:
+            old, _pool = _pool, None
+        if old is not None:
+            old.shutdown()
+
+
+@atexit.register
+def _shutdown_on_exit():
+    if _pool is not None:
+        _pool.shutdown()
@@ -0,0 +1,49 @@
+"""
+Lecturas del API del LMS en réplicas (``project.db.router``).
+
+``GET`` / ``HEAD`` / ``OPTIONS`` se leen de una réplica, también las
+exportaciones en streaming, salvo si el cliente ha escrito hace poco: toda
+escritura con éxito lo fija al primario durante ``REPLICA_PIN_SECONDS``.
+Lo que se guarda en la caché de respuestas también se lee de la réplica,
+pero como mucho durante ``REPLICA_MAX_LAG`` segundos: una réplica retrasada
+puede dejar datos viejos cacheados con la versión nueva del espacio de
+nombres, y así no duran más que el retraso que se le tolera.
+"""
+from rest_framework.permissions import SAFE_METHODS
+
+from project.db.router import (
+    areads_during, is_pinned, pin_to_primary, reads_during, replica_cache_timeout, replica_reads, replicas,
+)
+
+
+class ReplicaReadsMixin:
+    def reads_from_replica(self, request):
+        return request.method in SAFE_METHODS and bool(replicas()) and not is_pinned(request)
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.reads_from_replica(request):
+            return self.pin_writer(request, super().dispatch(request, *args, **kwargs))
+        with replica_reads() as reads:
+            response = super().dispatch(request, *args, **kwargs)
+        return self.stream_from(reads, response)
+
+    async def adispatch(self, request, *args, **kwargs):
+        if not self.reads_from_replica(request):
+            return self.pin_writer(request, await super().adispatch(request, *args, **kwargs))
+        with replica_reads() as reads:
+            response = await super().adispatch(request, *args, **kwargs)
+        return self.stream_from(reads, response)
+
+    def pin_writer(self, request, response):
+        if request.method not in SAFE_METHODS and replicas() and response.status_code < 400:
+            pin_to_primary(response)
+        return response
+
+    def stream_from(self, reads, response):
+        if response.streaming:
+            wrap = areads_during if response.is_async else reads_during
+            response.streaming_content = wrap(reads, response.streaming_content)
+        return response
+
+    def response_cache_timeout(self):
+        return replica_cache_timeout(super().response_cache_timeout())
@@ -0,0 +1,170 @@
+"""
+Caché de respuestas GET del API del LMS con espacios de nombres versionados.
+
+Cada modelo tiene un número de versión en caché; la clave de una respuesta
+incluye las versiones de todos los modelos que embebe (derivados del plan
+de carga del serializer), la ruta, los parámetros, el renderer y las clases
+de permiso. ``bump_namespace`` (llamado desde ``lms.signals`` y
+``lms.counters``) invalida de golpe todas las respuestas que dependen de un
+modelo sin tener que enumerarlas.
+"""
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from rest_framework.renderers import BrowsableAPIRenderer
+
+NAMESPACE_KEY = "lms:ns:{label}"
+RESPONSE_KEY = "lms:response:{digest}"
+STATS_KEYS = {"hits": "lms:response:hits", "misses": "lms:response:misses"}
+STORED_HEADERS = ("ETag", "Last-Modified")
+
+
+def get_cache():
+    return caches[getattr(settings, "LMS_API_CACHE_ALIAS", "default")]
+
+
+def cache_timeout():
+    return getattr(settings, "LMS_API_CACHE_TIMEOUT", 300)
+
+
+def _namespace_key(model):
+    return NAMESPACE_KEY.format(label=model._meta.label_lower)
+
+
+def _new_version():
+    # Basada en el reloj: si la clave se pierde, la nueva versión nunca
+    # coincide con una anterior y no resucita respuestas viejas.
+    return time.time_ns()
+
+
+def key_versions(keys):
+    """Versión actual de cada clave de ``keys``, en orden; las que faltan se crean."""
+    cache = get_cache()
+    versions = cache.get_many(keys)
+    for key in set(keys) - versions.keys():
+        cache.add(key, _new_version(), None)
+        versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def namespace_versions(models):
+    return key_versions(sorted({_namespace_key(model) for model in models}))
+
+
+def _bump(keys):
+    cache = get_cache()
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_version(), None)
+
+
+def bump_keys(keys):
+    """Cambia la versión de ``keys``: lo guardado con las anteriores deja de leerse."""
+    keys = list(keys)
+    _bump(keys)
+    if transaction.get_connection().in_atomic_block:
+        # Otra vez al confirmar: una lectura concurrente podría haber
+        # guardado los datos previos al commit con la versión nueva.
+        transaction.on_commit(lambda: _bump(keys))
+
+
+def bump_namespace(model):
+    """Invalida las respuestas que dependen de ``model``."""
+    bump_keys([_namespace_key(model)])
+
+
+def _count(outcome):
+    cache = get_cache()
+    key = STATS_KEYS[outcome]
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def cache_stats():
+    values = get_cache().get_many(STATS_KEYS.values())
+    return {name: values.get(key, 0) for name, key in STATS_KEYS.items()}
+
+
+class CachedResponseMixin:
+    """Cachea el cuerpo ya renderizado de ``list`` y ``retrieve``."""
+
+    def response_cache_key(self, request):
+        renderer = request.accepted_renderer
+        parts = [
+            request.get_host(),
+            request.path,
+            sorted(request.query_params.lists()),
+            renderer.media_type,
+            request.accepted_media_type,
+            [f"{cls.__module__}.{cls.__qualname__}" for cls in self.permission_classes],
+            namespace_versions(self.query_plan().models()),
+        ]
+        digest = hashlib.sha256(repr(parts).encode()).hexdigest()
+        return RESPONSE_KEY.format(digest=digest)
+
+    def cacheable(self, request):
+        return (
+            cache_timeout() > 0
+            and request.method == "GET"
+            and not isinstance(request.accepted_renderer, BrowsableAPIRenderer)
+        )
+
+    def response_cache_timeout(self):
+        return cache_timeout()
+
+    def cached_response(self, request):
+        """Respuesta guardada para ``request``; si no hay, deja anotada la clave para guardarla."""
+        key = self.response_cache_key(request)
+        hit = get_cache().get(key)
+        if hit is not None:
+            _count("hits")
+            content, content_type, headers = hit
+            response = HttpResponse(content, content_type=content_type, headers=headers)
+            response["X-Cache"] = "HIT"
+            return response
+        _count("misses")
+        self._response_cache_key = key
+        return None
+
+    def cached_or(self, handler, request, *args, **kwargs):
+        if not self.cacheable(request):
+            return handler(request, *args, **kwargs)
+        return self.cached_response(request) or handler(request, *args, **kwargs)
+
+    async def acached_or(self, handler, request, *args, **kwargs):
+        if not self.cacheable(request):
+            return await handler(request, *args, **kwargs)
+        # Todas las operaciones de caché de la petición en un solo salto a un hilo.
+        return await sync_to_async(self.cached_response)(request) or await handler(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_or(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_or(super().retrieve, request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.acached_or(super().alist, request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.acached_or(super().aretrieve, request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        key = getattr(self, "_response_cache_key", None)
+        if key and response.status_code == 200:
+            response.render()
+            headers = {name: response[name] for name in STORED_HEADERS if response.has_header(name)}
+            get_cache().set(key, (response.content, response["Content-Type"], headers), self.response_cache_timeout())
+            response["X-Cache"] = "MISS"
+        return response
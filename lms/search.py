@@ -0,0 +1,85 @@
+"""
+Búsqueda de texto completo en PostgreSQL para cursos y lecciones.
+
+``Course.search_vector`` y ``Lesson.search_vector`` son ``tsvector``
+guardados que mantiene un trigger en cada INSERT o UPDATE de las columnas de
+texto (también con COPY, ``bulk_create`` y ``update()``), con un índice GIN
+(migración 0007). ``full_text_search`` filtra con ``websearch_to_tsquery``
+(admite ``"frase exacta"``, ``or`` y ``-palabra``) y ordena por ``ts_rank``.
+Si no hay ninguna coincidencia y el servidor tiene ``pg_trgm``, la misma
+consulta devuelve las filas parecidas al título por trigramas, que toleran
+erratas. El filtro no consulta la base de datos al construir el queryset
+(las vistas asíncronas lo llaman desde el bucle de eventos): si hay
+``pg_trgm`` se decide al compilar el SQL, ya en el hilo que lo ejecuta.
+
+Fuera de PostgreSQL (o en modelos sin ``search_vector``) se usa el
+``icontains`` de ``SearchFilter`` / ``search_fields`` de siempre.
+"""
+from functools import lru_cache
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connections
+from django.db.models import BooleanField, Case, Exists, ExpressionWrapper, F, Func, Q, Value, When
+from rest_framework.filters import SearchFilter
+
+SEARCH_CONFIG = "spanish"  # la de los triggers de la migración 0007
+RANK = "search_rank"
+
+# Columna que se compara por trigramas cuando el texto completo no encuentra nada.
+TRIGRAM_FIELDS = {
+    "lms.Course": "title",
+    "lms.Lesson": "nombre_leccion",
+}
+
+
+def uses_full_text(queryset):
+    return connections[queryset.db].vendor == "postgresql" and queryset.model._meta.label in TRIGRAM_FIELDS
+
+
+@lru_cache(maxsize=None)
+def has_trigram(alias):
+    """``pg_trgm`` instalado en la base de datos ``alias`` (se mira una vez por proceso)."""
+    with connections[alias].cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+class IfTrigram(Func):
+    """``expression`` si la base de datos de la consulta tiene ``pg_trgm``; si no, ``default``."""
+
+    def __init__(self, expression, default):
+        super().__init__(expression, default)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        expression, default = self.get_source_expressions()
+        return compiler.compile(expression if has_trigram(connection.alias) else default)
+
+
+def full_text_search(queryset, terms):
+    """
+    ``queryset`` filtrado por ``terms`` y ordenado por relevancia
+    (``search_rank``), con el orden previo como desempate. Una sola consulta.
+    """
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    query = SearchQuery(terms, config=SEARCH_CONFIG, search_type="websearch")
+    found = Q(search_vector=query)
+    field = TRIGRAM_FIELDS[queryset.model._meta.label]
+    # «<%» usa el índice GIN de trigramas (umbral pg_trgm.word_similarity_threshold); el EXISTS no
+    # depende de la fila, PostgreSQL lo evalúa una vez.
+    similar = Q(**{f"{field}__trigram_word_similar": terms}) & ~Exists(queryset.order_by().filter(found))
+    matches = queryset.filter(found | Q(IfTrigram(ExpressionWrapper(similar, BooleanField()), Value(False))))
+    rank = Case(
+        When(found, then=SearchRank(F("search_vector"), query)),
+        default=IfTrigram(TrigramWordSimilarity(terms, field), Value(0.0)),
+    )
+    return matches.annotate(**{RANK: rank}).order_by(f"-{RANK}", *ordering)
+
+
+class FullTextSearchFilter(SearchFilter):
+    """``SearchFilter`` que en PostgreSQL busca en ``search_vector`` en lugar de ``icontains``."""
+
+    def filter_queryset(self, request, queryset, view):
+        terms = request.query_params.get(self.search_param, "").replace("\x00", "").strip()
+        if not terms or not uses_full_text(queryset):
+            return super().filter_queryset(request, queryset, view)
+        return full_text_search(queryset, terms)
@@ -1,10 +1,13 @@
 from rest_framework import serializers
-from django.contrib.auth.hashers import make_password
+from .avatars import AvatarSourcesField
+from .bulk import BulkListSerializer, PreloadedPrimaryKeyRelatedField
 from .models import Usuario, Course, Lesson, Inscripcion
+from .passwords import get_password_hasher_pool
+from .sparse_fields import SparseFieldsMixin
 
 
 # ========= Usuario =========
-class UsuarioSerializer(serializers.ModelSerializer):
+class UsuarioSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     id_usuario = serializers.IntegerField(source='id', read_only=True)
 
     class Meta:
@@ -14,40 +17,54 @@ class UsuarioSerializer(serializers.ModelSerializer):
             'contrasena': {'write_only': True}
         }
 
-    def create(self, validated_data):
+    def _hash_password(self, validated_data):
+        # PBKDF2 se calcula en el pool de procesos acotado (lms/passwords.py).
         pwd = validated_data.get('contrasena')
         if pwd:
-            validated_data['contrasena'] = make_password(pwd)
+            validated_data['contrasena'] = get_password_hasher_pool().make_password(pwd)
+
+    def create(self, validated_data):
+        self._hash_password(validated_data)
         return super().create(validated_data)
 
+    def update(self, instance, validated_data):
+        self._hash_password(validated_data)
+        return super().update(instance, validated_data)
+
 
 # ========= Curso =========
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     id_curso = serializers.IntegerField(source='id', read_only=True)
     instructor_id = serializers.PrimaryKeyRelatedField(
         source='instructor', queryset=Usuario.objects.all(), write_only=True
     )
     instructor = UsuarioSerializer(read_only=True)
+    # {"src", "webp", "jpeg"} con los srcset de los derivados; null hasta que el pool los genera.
+    avatar_sources = AvatarSourcesField()
 
     class Meta:
         model = Course
         fields = [
             'id_curso', 'title', 'description',
             'instructor_id', 'instructor',
-            'avatar', 'created_at', 'updated_at'
+            'avatar', 'avatar_sources',
+            'lesson_count', 'enrollment_count', 'student_count', 'instructor_count',
+            'created_at', 'updated_at'
         ]
+        read_only_fields = ['lesson_count', 'enrollment_count', 'student_count', 'instructor_count']
 
 
 # ========= Lección =========
-class LessonSerializer(serializers.ModelSerializer):
+class LessonSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     id_leccion = serializers.IntegerField(source='id', read_only=True)
-    curso_id = serializers.PrimaryKeyRelatedField(
+    curso_id = PreloadedPrimaryKeyRelatedField(
         source='curso', queryset=Course.objects.all(), write_only=True
     )
     curso = CourseSerializer(read_only=True)
 
     class Meta:
         model = Lesson
+        list_serializer_class = BulkListSerializer
         fields = [
             'id_leccion', 'nombre_leccion',
             'curso_id', 'curso',
@@ -56,12 +73,12 @@ class LessonSerializer(serializers.ModelSerializer):
 
 
 # ========= Inscripción =========
-class InscripcionSerializer(serializers.ModelSerializer):
+class InscripcionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     id_inscripcion = serializers.IntegerField(source='id', read_only=True)
-    usuario_id = serializers.PrimaryKeyRelatedField(
+    usuario_id = PreloadedPrimaryKeyRelatedField(
         source='usuario', queryset=Usuario.objects.all(), write_only=True
     )
-    curso_id = serializers.PrimaryKeyRelatedField(
+    curso_id = PreloadedPrimaryKeyRelatedField(
         source='curso', queryset=Course.objects.all(), write_only=True
     )
     usuario = UsuarioSerializer(read_only=True)
@@ -69,9 +86,10 @@ class InscripcionSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Inscripcion
+        list_serializer_class = BulkListSerializer
         fields = [
             'id_inscripcion',
             'usuario_id', 'usuario',
             'curso_id', 'curso',
-            'fecha_inscripcion', 'rol'
+            'fecha_inscripcion', 'rol', 'updated_at'
         ]
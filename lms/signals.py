@@ -0,0 +1,136 @@
+"""Contadores de ``Course``, derivados de su avatar e invalidación de la caché de respuestas."""
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from .avatars import get_avatar_pool
+from .counters import apply_deltas, inscripcion_deltas
+from .dashboard import bump_dashboards
+from .models import Usuario, Course, Lesson, Inscripcion
+from .response_cache import bump_namespace
+
+
+_DEFERRED = object()
+
+
+def _remember(instance, *fields):
+    # Sólo lo ya cargado: leer un campo diferido lanzaría una consulta.
+    instance._counter_state = tuple(instance.__dict__.get(name) for name in fields)
+
+
+def _capture(instance, model, using, *fields):
+    # En pre_save, antes del UPDATE: lo que no se cargó (.only(), ?fields=) se
+    # lee ahora de la base de datos; en post_save ya sería el valor nuevo.
+    state = getattr(instance, "_counter_state", None)
+    if instance.pk is not None and (state is None or None in state):
+        state = model.objects.using(using).filter(pk=instance.pk).values_list(*fields).first()
+    instance._counter_state = state or (None,) * len(fields)
+
+
+@receiver(post_init, sender=Lesson)
+def remember_lesson(sender, instance, **kwargs):
+    _remember(instance, "curso_id")
+
+
+@receiver(pre_save, sender=Lesson)
+def capture_lesson(sender, instance, raw=False, using=None, **kwargs):
+    if not raw:
+        _capture(instance, Lesson, using, "curso_id")
+
+
+@receiver(post_save, sender=Lesson)
+def count_lesson(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        apply_deltas(instance.curso_id, {"lesson_count": 1})
+    else:
+        (old_curso,) = instance._counter_state
+        if old_curso != instance.curso_id:
+            apply_deltas(old_curso, {"lesson_count": -1})
+            apply_deltas(instance.curso_id, {"lesson_count": 1})
+    _remember(instance, "curso_id")
+
+
+@receiver(post_delete, sender=Lesson)
+def uncount_lesson(sender, instance, **kwargs):
+    apply_deltas(instance.curso_id, {"lesson_count": -1})
+
+
+@receiver(post_init, sender=Inscripcion)
+def remember_inscripcion(sender, instance, **kwargs):
+    _remember(instance, "curso_id", "rol")
+    instance._usuario_id = instance.__dict__.get("usuario_id")
+
+
+@receiver(pre_save, sender=Inscripcion)
+def capture_inscripcion(sender, instance, raw=False, using=None, **kwargs):
+    if not raw:
+        _capture(instance, Inscripcion, using, "curso_id", "rol")
+
+
+@receiver(post_save, sender=Inscripcion)
+def count_inscripcion(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        apply_deltas(instance.curso_id, inscripcion_deltas(instance.rol, 1))
+    else:
+        old_curso, old_rol = instance._counter_state
+        if (old_curso, old_rol) != (instance.curso_id, instance.rol):
+            if old_curso == instance.curso_id:
+                deltas = inscripcion_deltas(instance.rol, 1)
+                deltas.subtract(inscripcion_deltas(old_rol, 1))
+                apply_deltas(instance.curso_id, deltas)
+            else:
+                apply_deltas(old_curso, inscripcion_deltas(old_rol, -1))
+                apply_deltas(instance.curso_id, inscripcion_deltas(instance.rol, 1))
+    _remember(instance, "curso_id", "rol")
+    # Panel del usuario (y del anterior si la inscripción ha cambiado de usuario).
+    bump_dashboards({instance.usuario_id, instance._usuario_id})
+    instance._usuario_id = instance.usuario_id
+
+
+@receiver(post_delete, sender=Inscripcion)
+def uncount_inscripcion(sender, instance, **kwargs):
+    apply_deltas(instance.curso_id, inscripcion_deltas(instance.rol, -1))
+    bump_dashboards([instance.usuario_id])
+
+
+@receiver(post_save, sender=Usuario)
+def rename_dashboard(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_dashboards([instance.pk])
+
+
+@receiver(post_init, sender=Course)
+def remember_avatar(sender, instance, **kwargs):
+    # Nombre del fichero tal como se cargó; _DEFERRED si avatar no se leyó.
+    value = instance.__dict__.get("avatar", _DEFERRED)
+    instance._avatar_name = getattr(value, "name", value) or ""
+
+
+@receiver(post_save, sender=Course)
+def schedule_avatar(sender, instance, created, raw=False, update_fields=None, using=None, **kwargs):
+    if raw or (update_fields is not None and "avatar" not in update_fields):
+        return
+    name = instance.avatar.name or ""
+    previous = "" if created else instance._avatar_name
+    if name == previous:
+        return
+    if not created:
+        # Los derivados del avatar anterior dejan de valer ya; los nuevos llegan del pool.
+        Course.objects.using(using).filter(pk=instance.pk).update(avatar_derivatives={})
+    if name:
+        transaction.on_commit(partial(get_avatar_pool().submit, instance.pk), using=using)
+    instance._avatar_name = name
+
+
+@receiver([post_save, post_delete], sender=Usuario)
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=Lesson)
+@receiver([post_save, post_delete], sender=Inscripcion)
+def invalidate_responses(sender, **kwargs):
+    bump_namespace(sender)
@@ -0,0 +1,89 @@
+"""
+``?fields=`` y ``?expand=`` para los serializers del LMS.
+
+Las relaciones anidadas salen como el id del objeto salvo que se pidan con
+``?expand=curso`` (o ``curso.instructor`` para bajar otro nivel).
+``?fields=id_leccion,curso.title`` limita los campos de la respuesta en cada
+nivel; un campo con punto expande la relación. Los campos de sólo escritura
+no cambian.
+
+El serializer resultante es el que recorre ``build_query_plan``, así que
+``only()`` y ``select_related`` siguen a los campos pedidos.
+"""
+from rest_framework import serializers
+
+from .eager_loading import build_query_plan
+
+FIELDS_PARAM = "fields"
+EXPAND_PARAM = "expand"
+
+
+def _split(value):
+    return {name.strip() for name in (value or "").split(",") if name.strip()}
+
+
+def _children(paths, name):
+    prefix = name + "."
+    return frozenset(path[len(prefix):] for path in paths if path.startswith(prefix))
+
+
+def sparse_options(request):
+    """``(fields, expand)`` normalizados de la petición; tuplas vacías si no los trae."""
+    if request is None:
+        return (), ()
+    params = getattr(request, "query_params", request.GET)
+    return tuple(sorted(_split(params.get(FIELDS_PARAM)))), tuple(sorted(_split(params.get(EXPAND_PARAM))))
+
+
+class SparseFieldsMixin:
+    """``ModelSerializer`` con campos y expansiones elegidos por el cliente."""
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None and expand is None:
+            self._sparse = None
+        else:
+            self._sparse = tuple(sorted(fields or ())), tuple(sorted(expand or ()))
+
+    def sparse_options(self):
+        if self._sparse is None:
+            # El serializer raíz los toma de la petición; los anidados, de su padre.
+            self._sparse = sparse_options(self.context.get("request"))
+        return self._sparse
+
+    def query_plan(self):
+        return build_query_plan(type(self), *self.sparse_options())
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected, expand = self.sparse_options()
+        expandable = {
+            name for name, field in fields.items()
+            if isinstance(field, SparseFieldsMixin) and not field.write_only
+        }
+        # curso.instructor.nombre expande curso y curso.instructor.
+        expand = set(expand) | {path.rsplit(".", 1)[0] for path in selected if "." in path}
+        top_selected = {path.split(".", 1)[0] for path in selected}
+        top_expand = {path.split(".", 1)[0] for path in expand}
+        errors = {}
+        unknown = top_selected - {name for name, field in fields.items() if not field.write_only}
+        if unknown:
+            errors[FIELDS_PARAM] = [f"Campo desconocido: {name}" for name in sorted(unknown)]
+        if top_expand - expandable:
+            errors[EXPAND_PARAM] = [f"No se puede expandir: {name}" for name in sorted(top_expand - expandable)]
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        for name in expandable:
+            field = fields[name]
+            if name in top_expand:
+                fields[name] = type(field)(
+                    fields=_children(selected, name), expand=_children(expand, name), **field._kwargs
+                )
+            else:
+                fields[name] = serializers.PrimaryKeyRelatedField(read_only=True, source=field._kwargs.get("source"))
+        if top_selected:
+            for name in [name for name, field in fields.items() if not field.write_only]:
+                if name not in top_selected:
+                    del fields[name]
+        return fields
@@ -1,3 +1,2130 @@
-from django.test import TestCase
+import asyncio
+import csv
+import datetime
+import gzip
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+from unittest import mock, skipUnless
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib import admin
+from django.contrib.admin import site
+from django.contrib.auth.hashers import check_password
+from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchQuery
+from django.contrib.sessions.models import Session
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.middleware.csrf import _unmask_cipher_token
+from django.test import RequestFactory, override_settings
+from django.template.loader import render_to_string
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from PIL import Image
+from PIL.JpegImagePlugin import JpegImageFile
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.utils.serializer_helpers import ReturnDict
+from rest_framework.settings import api_settings
+from rest_framework.test import APIRequestFactory, APITestCase, APITransactionTestCase
+
+from project import gunicorn_conf
+from project.db import close_pools, router
+from project.renderers import ORJSONParser, ORJSONRenderer, msgpack
+from project.static import StaticFilesASGI, StaticFilesWSGI
+from project.testing import ExplainAssertionsMixin, QueryAuditMixin
+from .admin_performance import estimated_rows
+from .avatars import derived_name, generate_derivatives, get_avatar_pool
+from .catalogue import CSRF_PLACEHOLDER
+from .counters import rebuild_counters
+from .dashboard import bump_dashboards
+from .eager_loading import build_query_plan
+from .models import Usuario, Course, Lesson, Inscripcion
+from .passwords import get_password_hasher_pool
+from .response_cache import bump_namespace, cache_stats, get_cache
+from .search import SEARCH_CONFIG, full_text_search, has_trigram
+from .serializers import LessonSerializer, InscripcionSerializer
+from .values_serializer import compile_values_serializer
+from .views import UsuarioViewSet, CourseViewSet, LessonViewSet, InscripcionViewSet
+
+
+def seed(usuarios=60, cursos=25, lecciones=150, inscripciones=400, start=0):
+    """Carga un catálogo con volúmenes parecidos a los reales."""
+    usuarios = Usuario.objects.bulk_create(
+        Usuario(correo=f"u{i}@lms.test", nombre=f"Usuario {i}", contrasena="x")
+        for i in range(start, start + usuarios)
+    )
+    cursos = Course.objects.bulk_create(
+        Course(title=f"Curso {i}", description="Descripción", instructor=usuarios[i % len(usuarios)])
+        for i in range(cursos)
+    )
+    Lesson.objects.bulk_create(
+        Lesson(nombre_leccion=f"Lección {i}", curso=cursos[i % len(cursos)]) for i in range(lecciones)
+    )
+    # (usuario, curso) único mientras inscripciones <= usuarios * cursos
+    Inscripcion.objects.bulk_create(
+        Inscripcion(
+            usuario=usuarios[i % len(usuarios)], curso=cursos[(i // len(usuarios) + i) % len(cursos)],
+            rol="instructor" if i % 10 == 0 else "estudiante",
+        )
+        for i in range(inscripciones)
+    )
+    # bulk_create no dispara señales: se recalculan los contadores.
+    for _ in rebuild_counters():
+        pass
+
+
+@override_settings(LMS_API_CACHE_TIMEOUT=0)
+class EagerLoadingTests(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(User.objects.create_user("admin"))
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_plan_follows_nested_serializers(self):
+        plan = build_query_plan(InscripcionSerializer, expand=("curso.instructor", "usuario"))
+        self.assertEqual(plan.select_related, {"usuario", "curso", "curso__instructor"})
+        self.assertNotIn("usuario__contrasena", plan.only)
+        self.assertEqual(
+            build_query_plan(LessonSerializer, expand=("curso.instructor",)).select_related,
+            {"curso", "curso__instructor"},
+        )
+        # Sin expand sólo hacen falta las FK.
+        plan = build_query_plan(InscripcionSerializer)
+        self.assertEqual(plan.select_related, set())
+        self.assertTrue({"usuario", "curso"} <= plan.only)
+
+    def test_list_query_count_does_not_depend_on_page_size(self):
+        seed(usuarios=2, cursos=2, lecciones=2, inscripciones=2)
+        small = {url: self.count_queries(url) for url in ("/usuarios/", "/cursos/", "/lecciones/", "/inscripciones/")}
+        seed(usuarios=20, cursos=20, lecciones=20, inscripciones=20, start=2)
+        for url, expected in small.items():
+            self.assertEqual(self.count_queries(url), expected, url)
+
+    def test_detail_is_a_single_data_query(self):
+        seed(usuarios=1, cursos=1, lecciones=1, inscripciones=1)
+        for url in ("/cursos/%d/" % Course.objects.get().pk, "/lecciones/%d/" % Lesson.objects.get().pk,
+                    "/inscripciones/%d/" % Inscripcion.objects.get().pk):
+            with self.assertNumQueries(1):  # la ETag sale de la fila ya leída
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+
+def cols(table, *names):
+    return ", ".join(f"{table}.{name}" for name in names)
+
+
+USUARIO = cols("lms_usuario", "id", "correo", "nombre", "created_at", "updated_at")
+USUARIO_T4 = cols("T4", "id", "correo", "nombre", "created_at", "updated_at")
+USUARIO_FULL = cols("lms_usuario", "id", "correo", "contrasena", "nombre", "created_at", "updated_at")
+COURSE = cols(
+    "lms_course", "id", "title", "description", "instructor_id", "avatar", "avatar_derivatives",
+    "lesson_count", "enrollment_count", "student_count", "instructor_count", "created_at", "updated_at",
+)
+LESSON = cols("lms_lesson", "id", "nombre_leccion", "curso_id", "created_at", "updated_at")
+INSCRIPCION = cols("lms_inscripcion", "id", "usuario_id", "curso_id", "fecha_inscripcion", "rol", "updated_at")
+
+JOIN_INSTRUCTOR = "INNER JOIN lms_usuario ON (lms_course.instructor_id = lms_usuario.id)"
+SELECT_USUARIOS = f"SELECT {USUARIO} FROM lms_usuario"
+SELECT_COURSES = f"SELECT {COURSE}, {USUARIO} FROM lms_course {JOIN_INSTRUCTOR}"
+SELECT_LESSONS = (
+    f"SELECT {LESSON}, {COURSE}, {USUARIO} FROM lms_lesson "
+    f"INNER JOIN lms_course ON (lms_lesson.curso_id = lms_course.id) {JOIN_INSTRUCTOR}"
+)
+SELECT_INSCRIPCIONES = (
+    f"SELECT {INSCRIPCION}, {USUARIO}, {COURSE}, {USUARIO_T4} FROM lms_inscripcion "
+    "INNER JOIN lms_usuario ON (lms_inscripcion.usuario_id = lms_usuario.id) "
+    "INNER JOIN lms_course ON (lms_inscripcion.curso_id = lms_course.id) "
+    "INNER JOIN lms_usuario T4 ON (lms_course.instructor_id = T4.id)"
+)
+# Sin ?expand= las relaciones salen como ids: sin JOIN.
+SELECT_COURSES_FLAT = f"SELECT {COURSE} FROM lms_course"
+SELECT_LESSONS_FLAT = f"SELECT {LESSON} FROM lms_lesson"
+SELECT_INSCRIPCIONES_FLAT = f"SELECT {INSCRIPCION} FROM lms_inscripcion"
+# PUT/PATCH: el validador de (usuario, curso) lee ambas relaciones.
+SELECT_INSCRIPCION_UPDATE = (
+    f"SELECT {INSCRIPCION}, {USUARIO}, {COURSE} FROM lms_inscripcion "
+    "INNER JOIN lms_usuario ON (lms_inscripcion.usuario_id = lms_usuario.id) "
+    "INNER JOIN lms_course ON (lms_inscripcion.curso_id = lms_course.id)"
+)
+
+
+def values_cols(table, *names, prefix=""):
+    return ", ".join(f"{table}.{name} AS {prefix}{name}" for name in names)
+
+
+# Listados: values_list() con las columnas en el orden del serializer (lms/values_serializer.py).
+VALUES_USUARIO = ("id", "correo", "nombre", "created_at", "updated_at")
+VALUES_COURSE = (
+    "id", "title", "description", "instructor_id", "avatar", "avatar_derivatives",
+    "lesson_count", "enrollment_count", "student_count", "instructor_count", "created_at", "updated_at",
+)
+
+
+def course_values(id_column="lms_course.id", prefix="", instructor=None):
+    """Columnas de CourseSerializer; con ``instructor`` (tabla o alias), expandido."""
+    parts = [f"{id_column} AS {prefix}id", values_cols("lms_course", "title", "description", prefix=prefix)]
+    if instructor is None:
+        parts.append(values_cols("lms_course", "instructor_id", prefix=prefix))
+    else:
+        parts += [
+            f"lms_course.instructor_id AS {prefix}instructor__id",
+            values_cols(instructor, *VALUES_USUARIO[1:], prefix=prefix + "instructor__"),
+        ]
+    return ", ".join(parts + [values_cols("lms_course", *VALUES_COURSE[4:], prefix=prefix)])
+
+
+def from_clause(select):
+    return select.split(" FROM ", 1)[1]
+
+
+LIST_USUARIOS = f"SELECT {values_cols('lms_usuario', *VALUES_USUARIO)} FROM lms_usuario"
+LIST_COURSES = f"SELECT {course_values()} FROM lms_course"
+LIST_COURSES_EXPANDED = f"SELECT {course_values(instructor='lms_usuario')} FROM {from_clause(SELECT_COURSES)}"
+LIST_LESSONS = (
+    f"SELECT {values_cols('lms_lesson', 'id', 'nombre_leccion', 'curso_id', 'created_at', 'updated_at')} "
+    "FROM lms_lesson"
+)
+LIST_LESSONS_EXPANDED = (
+    f"SELECT {values_cols('lms_lesson', 'id', 'nombre_leccion')}, "
+    f"{course_values('lms_lesson.curso_id', 'curso__', 'lms_usuario')}, "
+    f"{values_cols('lms_lesson', 'created_at', 'updated_at')} FROM {from_clause(SELECT_LESSONS)}"
+)
+VALUES_INSCRIPCION = ("id", "usuario_id", "curso_id", "fecha_inscripcion", "rol", "updated_at")
+LIST_INSCRIPCIONES = f"SELECT {values_cols('lms_inscripcion', *VALUES_INSCRIPCION)} FROM lms_inscripcion"
+LIST_INSCRIPCIONES_EXPANDED = (
+    "SELECT lms_inscripcion.id AS id, lms_inscripcion.usuario_id AS usuario__id, "
+    f"{values_cols('lms_usuario', *VALUES_USUARIO[1:], prefix='usuario__')}, "
+    f"{course_values('lms_inscripcion.curso_id', 'curso__', 'T4')}, "
+    f"{values_cols('lms_inscripcion', *VALUES_INSCRIPCION[3:])} FROM {from_clause(SELECT_INSCRIPCIONES)}"
+)
+GET_USUARIO = f"SELECT {USUARIO_FULL} FROM lms_usuario WHERE lms_usuario.id = ? LIMIT ?"
+GET_COURSE = f"SELECT {COURSE} FROM lms_course WHERE lms_course.id = ? LIMIT ?"
+BY_ID = "WHERE {table}.id = ? LIMIT ?"
+BUMP_LESSONS = (
+    "UPDATE lms_course SET updated_at = ?, lesson_count = (lms_course.lesson_count + ?) WHERE lms_course.id = ?"
+)
+BUMP_STUDENTS = (
+    "UPDATE lms_course SET updated_at = ?, enrollment_count = (lms_course.enrollment_count + ?), "
+    "student_count = (lms_course.student_count + ?) WHERE lms_course.id = ?"
+)
+
+
+def count(table):
+    return f"SELECT COUNT(*) AS __count FROM {table}"
+
+
+def validators(table, *tables, where=""):
+    stamps = ", ".join(f"MAX({name}.updated_at) AS last_{i}" for i, name in enumerate((table,) + tables))
+    return f"SELECT COUNT({table}.id) AS row_count, SUM({table}.id) AS id_sum, {stamps} FROM {table}{where}"
+
+
+VALIDATE_USUARIOS = validators("lms_usuario")
+VALIDATE_COURSES = validators("lms_course", "lms_usuario", where=f" {JOIN_INSTRUCTOR}")
+VALIDATE_COURSES_FLAT = validators("lms_course")
+VALIDATE_LESSONS_FLAT = validators("lms_lesson")
+VALIDATE_INSCRIPCIONES_FLAT = validators("lms_inscripcion")
+VALIDATE_LESSONS = validators("lms_lesson", "lms_course", "lms_usuario", where=(
+    f" INNER JOIN lms_course ON (lms_lesson.curso_id = lms_course.id) {JOIN_INSTRUCTOR}"
+))
+VALIDATE_INSCRIPCIONES = validators("lms_inscripcion", "lms_course", "lms_usuario", "T4", where=(
+    " INNER JOIN lms_course ON (lms_inscripcion.curso_id = lms_course.id)"
+    f" {JOIN_INSTRUCTOR}"
+    " INNER JOIN lms_usuario T4 ON (lms_inscripcion.usuario_id = T4.id)"
+))
+
+
+
+def page_validators(table, *tables, where="", order):
+    """Los validadores de ``validators`` sobre la página servida (``LIMIT``), en una subconsulta."""
+    names = (table,) + tables
+    aggregates = ", ".join(["COUNT(__col1)", "SUM(__col1)"] + [f"MAX(__col{i})" for i in range(2, len(names) + 2)])
+    columns = ", ".join(
+        [f"{table}.id AS __col1"] + [f"{name}.updated_at AS __col{i}" for i, name in enumerate(names, 2)]
+    )
+    return f"SELECT {aggregates} FROM (SELECT {columns} FROM {table}{where} ORDER BY {order} LIMIT ?) subquery"
+
+
+BY_CREATED = "{table}.created_at ASC, {table}.id ASC"
+PAGE_VALIDATE_USUARIOS = page_validators("lms_usuario", order="lms_usuario.id ASC")
+PAGE_VALIDATE_COURSES = page_validators(
+    "lms_course", "lms_usuario", where=f" {JOIN_INSTRUCTOR}", order=BY_CREATED.format(table="lms_course"),
+)
+PAGE_VALIDATE_COURSES_FLAT = page_validators("lms_course", order=BY_CREATED.format(table="lms_course"))
+PAGE_VALIDATE_LESSONS_FLAT = page_validators("lms_lesson", order=BY_CREATED.format(table="lms_lesson"))
+BY_FECHA = "lms_inscripcion.fecha_inscripcion ASC, lms_inscripcion.id ASC"
+PAGE_VALIDATE_INSCRIPCIONES_FLAT = page_validators("lms_inscripcion", order=BY_FECHA)
+PAGE_VALIDATE_LESSONS = page_validators("lms_lesson", "lms_course", "lms_usuario", where=(
+    f" INNER JOIN lms_course ON (lms_lesson.curso_id = lms_course.id) {JOIN_INSTRUCTOR}"
+), order=BY_CREATED.format(table="lms_lesson"))
+PAGE_VALIDATE_INSCRIPCIONES = page_validators("lms_inscripcion", "lms_course", "lms_usuario", "T4", where=(
+    " INNER JOIN lms_course ON (lms_inscripcion.curso_id = lms_course.id)"
+    f" {JOIN_INSTRUCTOR}"
+    " INNER JOIN lms_usuario T4 ON (lms_inscripcion.usuario_id = T4.id)"
+), order=BY_FECHA)
+@override_settings(LMS_API_CACHE_TIMEOUT=0)
+class EndpointQueryRegressionTests(QueryAuditMixin, APITestCase):
+    """Número, forma y filas de las consultas de cada ruta del router."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed()
+        cls.user = User.objects.create_user("admin")
+        cls.usuario = Usuario.objects.order_by("id").first()
+        cls.curso = Course.objects.order_by("id").first()
+        cls.leccion = Lesson.objects.order_by("id").first()
+        cls.inscripcion = Inscripcion.objects.order_by("id").first()
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def check(self, method, url, status, expected, rows, **kwargs):
+        audit = self.audit(method, url, **kwargs)
+        self.assertEqual(audit.response.status_code, status, f"{method.upper()} {url}")
+        self.assertQueryShapes(audit, expected, rows, msg=f"{method.upper()} {url}")
+
+    def test_api_root(self):
+        self.check("get", "/", 200, [], {})
+
+    def test_usuarios(self):
+        self.check("get", "/usuarios/", 200, [
+            count("lms_usuario"),
+            f"{LIST_USUARIOS} ORDER BY ? ASC LIMIT ?",
+            PAGE_VALIDATE_USUARIOS,
+        ], {})
+        self.check("get", f"/usuarios/{self.usuario.pk}/", 200, [
+            f"{SELECT_USUARIOS} {BY_ID.format(table='lms_usuario')}",
+        ], {"Usuario": 1})
+        self.check("post", "/usuarios/", 201, [
+            "SELECT ? AS a FROM lms_usuario WHERE lms_usuario.correo = ? LIMIT ?",
+            "INSERT INTO lms_usuario (correo, contrasena, nombre, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?) RETURNING lms_usuario.id",
+        ], {"Usuario": 1}, data={"correo": "nuevo@lms.test", "nombre": "Nuevo", "contrasena": "secreta"})
+
+    def test_cursos(self):
+        self.check("get", "/cursos/", 200, [
+            count("lms_course"),
+            f"{LIST_COURSES} ORDER BY ? ASC, ? ASC LIMIT ?",
+            PAGE_VALIDATE_COURSES_FLAT,
+        ], {})
+        self.check("get", "/cursos/?expand=instructor", 200, [
+            count("lms_course"),
+            f"{LIST_COURSES_EXPANDED} ORDER BY ? ASC, ? ASC LIMIT ?",
+            PAGE_VALIDATE_COURSES,
+        ], {})
+        self.check("get", f"/cursos/{self.curso.pk}/", 200, [
+            f"{SELECT_COURSES_FLAT} {BY_ID.format(table='lms_course')}",
+        ], {"Course": 1})
+        self.check("get", f"/cursos/{self.curso.pk}/?expand=instructor", 200, [
+            f"{SELECT_COURSES} {BY_ID.format(table='lms_course')}",
+        ], {"Course": 1, "Usuario": 1})
+        self.check("post", "/cursos/", 201, [
+            GET_USUARIO,
+            "INSERT INTO lms_course (title, description, instructor_id, avatar, avatar_derivatives, lesson_count, "
+            "enrollment_count, student_count, instructor_count, search_vector, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, ?, ?) RETURNING lms_course.id",
+        ], {"Course": 1, "Usuario": 1}, data={"title": "Nuevo", "instructor_id": self.usuario.pk})
+        self.check("patch", f"/cursos/{self.curso.pk}/", 200, [
+            f"{SELECT_COURSES_FLAT} {BY_ID.format(table='lms_course')}",
+            "UPDATE lms_course SET title = ?, description = ?, instructor_id = ?, avatar = ?, "
+            "created_at = ?, updated_at = ? WHERE lms_course.id = ?",  # sin contadores
+        ], {"Course": 1}, data={"title": "Renombrado"})
+
+    def test_lecciones(self):
+        self.check("get", "/lecciones/", 200, [
+            count("lms_lesson"),
+            f"{LIST_LESSONS} ORDER BY ? ASC, ? ASC LIMIT ?",
+            PAGE_VALIDATE_LESSONS_FLAT,
+        ], {})
+        self.check("get", "/lecciones/?expand=curso.instructor", 200, [
+            count("lms_lesson"),
+            f"{LIST_LESSONS_EXPANDED} ORDER BY ? ASC, ? ASC LIMIT ?",
+            PAGE_VALIDATE_LESSONS,
+        ], {})
+        self.check("get", f"/lecciones/{self.leccion.pk}/?expand=curso.instructor", 200, [
+            f"{SELECT_LESSONS} {BY_ID.format(table='lms_lesson')}",
+        ], {"Lesson": 1, "Course": 1, "Usuario": 1})
+        self.check("post", "/lecciones/", 201, [
+            GET_COURSE,
+            "INSERT INTO lms_lesson (nombre_leccion, curso_id, search_vector, created_at, updated_at) "
+            "VALUES (?, ?, NULL, ?, ?) RETURNING lms_lesson.id",
+            BUMP_LESSONS,
+        ], {"Lesson": 1, "Course": 1}, data={"nombre_leccion": "Nueva", "curso_id": self.curso.pk})
+        self.check("post", "/lecciones/?expand=curso.instructor", 201, [
+            GET_COURSE,
+            "INSERT INTO lms_lesson (nombre_leccion, curso_id, search_vector, created_at, updated_at) "
+            "VALUES (?, ?, NULL, ?, ?) RETURNING lms_lesson.id",
+            BUMP_LESSONS,
+            GET_USUARIO,
+        ], {"Lesson": 1, "Course": 1, "Usuario": 1}, data={"nombre_leccion": "Nueva", "curso_id": self.curso.pk})
+        self.check("patch", f"/lecciones/{self.leccion.pk}/", 200, [
+            f"{SELECT_LESSONS_FLAT} {BY_ID.format(table='lms_lesson')}",
+            "UPDATE lms_lesson SET nombre_leccion = ?, curso_id = ?, created_at = ?, updated_at = ? "
+            "WHERE lms_lesson.id = ?",
+        ], {"Lesson": 1}, data={"nombre_leccion": "Renombrada"})
+        self.check("delete", f"/lecciones/{self.leccion.pk}/", 204, [
+            f"{SELECT_LESSONS_FLAT} {BY_ID.format(table='lms_lesson')}",
+            "DELETE FROM lms_lesson WHERE lms_lesson.id IN (...)",
+            BUMP_LESSONS,
+        ], {"Lesson": 1})
+
+    def test_inscripciones(self):
+        self.check("get", "/inscripciones/", 200, [
+            count("lms_inscripcion"),
+            f"{LIST_INSCRIPCIONES} ORDER BY ? ASC, ? ASC LIMIT ?",
+            PAGE_VALIDATE_INSCRIPCIONES_FLAT,
+        ], {})
+        self.check("get", "/inscripciones/?expand=usuario,curso.instructor", 200, [
+            count("lms_inscripcion"),
+            f"{LIST_INSCRIPCIONES_EXPANDED} ORDER BY ? ASC, ? ASC LIMIT ?",
+            PAGE_VALIDATE_INSCRIPCIONES,
+        ], {})
+        self.check("get", f"/inscripciones/{self.inscripcion.pk}/?expand=usuario,curso.instructor", 200, [
+            f"{SELECT_INSCRIPCIONES} {BY_ID.format(table='lms_inscripcion')}",
+        ], {"Inscripcion": 1, "Usuario": 2, "Course": 1})
+        nuevo = Usuario.objects.create(correo="nuevo@lms.test", nombre="Nuevo")
+        self.check("post", "/inscripciones/", 201, [
+            GET_USUARIO,
+            GET_COURSE,
+            "SELECT ? AS a FROM lms_inscripcion "
+            "WHERE (lms_inscripcion.curso_id = ? AND lms_inscripcion.usuario_id = ?) LIMIT ?",
+            "INSERT INTO lms_inscripcion (usuario_id, curso_id, fecha_inscripcion, rol, updated_at) "
+            "VALUES (?, ?, ?, ?, ?) RETURNING lms_inscripcion.id",
+            BUMP_STUDENTS,
+        ], {"Inscripcion": 1, "Usuario": 1, "Course": 1},
+            data={"usuario_id": nuevo.pk, "curso_id": self.curso.pk, "rol": "estudiante"})
+        self.check("patch", f"/inscripciones/{self.inscripcion.pk}/", 200, [
+            f"{SELECT_INSCRIPCION_UPDATE} {BY_ID.format(table='lms_inscripcion')}",
+            "UPDATE lms_inscripcion SET usuario_id = ?, curso_id = ?, fecha_inscripcion = ?, rol = ?, "
+            "updated_at = ? WHERE lms_inscripcion.id = ?",
+        ], {"Inscripcion": 1, "Usuario": 1, "Course": 1}, data={"rol": "instructor"})
+        self.check("delete", f"/inscripciones/{self.inscripcion.pk}/", 204, [
+            f"{SELECT_INSCRIPCIONES_FLAT} {BY_ID.format(table='lms_inscripcion')}",
+            "DELETE FROM lms_inscripcion WHERE lms_inscripcion.id IN (...)",
+            "UPDATE lms_course SET updated_at = ?, enrollment_count = (lms_course.enrollment_count + ?), "
+            "instructor_count = (lms_course.instructor_count + ?) WHERE lms_course.id = ?",
+        ], {"Inscripcion": 1})
+
+    def test_failure_message_shows_sql_diff(self):
+        audit = self.audit("get", "/cursos/?expand=instructor")
+        with self.assertRaisesMessage(AssertionError, "+    INNER JOIN lms_usuario"):
+            self.assertQueryShapes(audit, [count("lms_course"), f"SELECT {COURSE} FROM lms_course LIMIT ?"])
+
+
+@override_settings(LMS_API_CACHE_TIMEOUT=0)
+class KeysetPaginationTests(QueryAuditMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(usuarios=10, cursos=5, lecciones=45, inscripciones=50)
+        # Empates en created_at para forzar el desempate por id.
+        Lesson.objects.filter(id__lte=Lesson.objects.order_by("id")[30].id).update(
+            created_at=Lesson.objects.order_by("id").first().created_at
+        )
+        cls.user = User.objects.create_user("admin")
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url, link="next"):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row["id_leccion"] for row in response.data["results"])
+            url, pages = response.data[link], pages + 1
+        return ids, pages
+
+    def test_walks_every_row_once_in_keyset_order(self):
+        expected = list(Lesson.objects.order_by("created_at", "id").values_list("id", flat=True))
+        ids, pages = self.walk("/lecciones/?cursor=")
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 3)
+
+    def test_descending_ordering_filter(self):
+        expected = list(Lesson.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+        self.assertEqual(self.walk("/lecciones/?cursor=&ordering=-created_at")[0], expected)
+        expected = list(Lesson.objects.order_by("nombre_leccion", "id").values_list("id", flat=True))
+        self.assertEqual(self.walk("/lecciones/?cursor=&ordering=nombre_leccion")[0], expected)
+
+    def test_previous_link_returns_the_same_pages(self):
+        first = self.client.get("/lecciones/?cursor=").data
+        second = self.client.get(first["next"]).data
+        back = self.client.get(second["previous"]).data
+        self.assertEqual(back["results"], first["results"])
+        self.assertIsNone(first["previous"])
+
+    def test_no_count_or_offset_unless_requested(self):
+        audit = self.audit("get", "/inscripciones/?cursor=")
+        self.assertNotIn("count", audit.response.data)
+        self.assertEqual(len(audit.queries), 2)  # la página y sus validadores, acotados con LIMIT
+        for query in audit.queries:
+            self.assertNotIn("OFFSET", query)
+            self.assertIn("LIMIT", query)
+        audit = self.audit("get", self.client.get("/inscripciones/?cursor=").data["next"])
+        for query in audit.queries:
+            self.assertIn("lms_inscripcion.fecha_inscripcion >= ?", query)
+            self.assertNotIn("OFFSET", query)
+        response = self.client.get("/inscripciones/?cursor=&count=true")
+        self.assertEqual(response.data["count"], 50)
+
+    def test_page_number_mode_is_unchanged(self):
+        response = self.client.get("/lecciones/?page=2")
+        self.assertEqual(response.data["count"], 45)
+        self.assertEqual(len(response.data["results"]), 20)
+
+    def test_invalid_cursor_and_ordering(self):
+        self.assertEqual(self.client.get("/lecciones/?cursor=no-es-un-cursor").status_code, 404)
+        cursor = self.client.get("/cursos/?cursor=").data["next"]
+        self.assertIsNone(cursor)
+        cursor = self.client.get("/lecciones/?cursor=").data["next"]
+        self.assertEqual(self.client.get(cursor + "&ordering=-created_at").status_code, 404)
+        self.assertEqual(self.client.get("/cursos/?cursor=&ordering=avatar").status_code, 400)
+
+
+@override_settings(LMS_API_CACHE_TIMEOUT=0)
+class CourseCounterTests(APITestCase):
+    def setUp(self):
+        self.instructor = Usuario.objects.create(correo="i@lms.test", nombre="Instructor")
+        self.alumno = Usuario.objects.create(correo="a@lms.test", nombre="Alumno")
+        self.curso = Course.objects.create(title="Curso A", instructor=self.instructor)
+        self.otro = Course.objects.create(title="Curso B", instructor=self.instructor)
+
+    def counters(self, curso):
+        curso.refresh_from_db()
+        return [getattr(curso, name) for name in Course.COUNTER_FIELDS]
+
+    def test_lessons_created_moved_and_deleted(self):
+        leccion = Lesson.objects.create(nombre_leccion="L1", curso=self.curso)
+        Lesson.objects.create(nombre_leccion="L2", curso=self.curso)
+        self.assertEqual(self.counters(self.curso), [2, 0, 0, 0])
+        leccion.curso = self.otro
+        leccion.save()
+        self.assertEqual(self.counters(self.curso), [1, 0, 0, 0])
+        self.assertEqual(self.counters(self.otro), [1, 0, 0, 0])
+        Lesson.objects.filter(curso=self.curso).delete()
+        self.assertEqual(self.counters(self.curso), [0, 0, 0, 0])
+
+    def test_deferred_fields_are_read_before_saving(self):
+        Lesson.objects.create(nombre_leccion="L1", curso=self.curso)
+        leccion = Lesson.objects.only("id", "nombre_leccion").get()
+        leccion.curso = self.otro
+        leccion.save()
+        self.assertEqual(self.counters(self.curso), [0, 0, 0, 0])
+        self.assertEqual(self.counters(self.otro), [1, 0, 0, 0])
+        Inscripcion.objects.create(usuario=self.alumno, curso=self.curso, rol="estudiante")
+        inscripcion = Inscripcion.objects.only("id", "usuario").get()
+        inscripcion.rol = "instructor"
+        inscripcion.save()
+        self.assertEqual(self.counters(self.curso), [0, 1, 0, 1])
+
+    def test_inscripciones_per_rol(self):
+        inscripcion = Inscripcion.objects.create(usuario=self.alumno, curso=self.curso, rol="estudiante")
+        Inscripcion.objects.create(usuario=self.instructor, curso=self.curso, rol="instructor")
+        ayudante = Usuario.objects.create(correo="y@lms.test", nombre="Ayudante")
+        Inscripcion.objects.create(usuario=ayudante, curso=self.curso, rol="ayudante")
+        self.assertEqual(self.counters(self.curso), [0, 3, 1, 1])
+        inscripcion.rol = "instructor"
+        inscripcion.save()
+        self.assertEqual(self.counters(self.curso), [0, 3, 0, 2])
+        inscripcion = Inscripcion.objects.get(pk=inscripcion.pk)
+        inscripcion.curso = self.otro
+        inscripcion.save()
+        self.assertEqual(self.counters(self.curso), [0, 2, 0, 1])
+        self.assertEqual(self.counters(self.otro), [0, 1, 0, 1])
+        self.curso.delete()
+        self.assertEqual(self.counters(self.otro), [0, 1, 0, 1])
+
+    def test_course_save_does_not_overwrite_counters(self):
+        stale = Course.objects.get(pk=self.curso.pk)
+        Lesson.objects.create(nombre_leccion="L1", curso=self.curso)
+        stale.title = "Renombrado"
+        stale.save()
+        self.assertEqual(self.counters(self.curso), [1, 0, 0, 0])
+
+    def test_counters_are_read_only_in_the_api(self):
+        Lesson.objects.create(nombre_leccion="L1", curso=self.curso)
+        self.client.force_authenticate(User.objects.create_user("admin"))
+        response = self.client.patch(f"/cursos/{self.curso.pk}/", {"lesson_count": 99}, format="json")
+        self.assertEqual(response.data["lesson_count"], 1)
+        self.assertEqual(self.counters(self.curso), [1, 0, 0, 0])
+
+    def test_rebuild_command_repairs_drift(self):
+        Lesson.objects.bulk_create([Lesson(nombre_leccion="L", curso=self.curso) for _ in range(3)])
+        Course.objects.filter(pk=self.otro.pk).update(enrollment_count=7)
+        out = StringIO()
+        call_command("rebuild_course_counters", "--dry-run", stdout=out)
+        self.assertIn("2 descuadrados", out.getvalue())
+        self.assertEqual(self.counters(self.curso), [0, 0, 0, 0])
+        before = Course.objects.get(pk=self.curso.pk).updated_at
+        call_command("rebuild_course_counters", "--batch-size=1", stdout=StringIO())
+        self.assertEqual(self.counters(self.curso), [3, 0, 0, 0])
+        self.assertGreater(Course.objects.get(pk=self.curso.pk).updated_at, before)  # nuevo ETag y tarjeta
+        self.assertEqual(self.counters(self.otro), [0, 0, 0, 0])
+
+
+@skipUnless(connection.vendor == "postgresql", "EXPLAIN de PostgreSQL")
+class IndexUsageTests(ExplainAssertionsMixin, APITestCase):
+    """Ningún listado del API ni changelist del admin debe recorrer tablas grandes enteras."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(usuarios=5000, cursos=2000, lecciones=20000, inscripciones=50000)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE lms_usuario, lms_course, lms_lesson, lms_inscripcion")
+        cls.admin = User.objects.create_superuser("admin", "admin@lms.test", "x")
+
+    def viewset_querysets(self, viewset, **params):
+        request = Request(APIRequestFactory().get("/", params))
+        view = viewset(request=request, format_kwarg=None, action="list", kwargs={})
+        queryset = view.filter_queryset(view.get_queryset())
+        page_size = api_settings.PAGE_SIZE
+        # OFFSET profundo recorre la tabla por diseño: para eso está el modo cursor.
+        yield "primera página", queryset[:page_size]
+        paginator = view.paginator
+        paginator.paginate_queryset(queryset, Request(APIRequestFactory().get("/", {**params, "cursor": ""})), view)
+        cursor = parse_qs(urlparse(paginator.get_next_link()).query)["cursor"][0]
+        request = Request(APIRequestFactory().get("/", {**params, "cursor": cursor}))
+        yield "cursor", paginator.keyset_queryset(queryset, request, view)[0][:page_size + 1]
+
+    def test_viewsets(self):
+        for viewset in (UsuarioViewSet, CourseViewSet, LessonViewSet, InscripcionViewSet):
+            for mode, queryset in self.viewset_querysets(viewset):
+                self.assertNoSeqScan(queryset, f"{viewset.__name__} ({mode})")
+        for mode, queryset in self.viewset_querysets(CourseViewSet, ordering="-created_at"):
+            self.assertNoSeqScan(queryset, f"CourseViewSet ordering=-created_at ({mode})")
+
+    def changelist_queryset(self, model, **params):
+        request = RequestFactory().get("/", params)
+        request.user = self.admin
+        changelist = site._registry[model].get_changelist_instance(request)
+        return changelist.queryset[:changelist.list_per_page]
+
+    def test_admin_changelists(self):
+        curso = Course.objects.order_by("id")[500]
+        for model, params in (
+            (Usuario, {}), (Course, {}), (Lesson, {}), (Inscripcion, {}),
+            (Lesson, {"curso__id__exact": curso.pk}),
+            (Inscripcion, {"rol": "instructor"}),
+        ):
+            self.assertNoSeqScan(self.changelist_queryset(model, **params), f"admin {model.__name__} {params}")
+
+
+class ResponseCacheTests(QueryAuditMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(usuarios=5, cursos=3, lecciones=6, inscripciones=5)
+        cls.curso = Course.objects.order_by("id").first()
+
+    def setUp(self):
+        get_cache().clear()
+
+    def test_second_get_is_served_from_cache(self):
+        first = self.client.get("/cursos/")
+        self.assertEqual(first["X-Cache"], "MISS")
+        audit = self.audit("get", "/cursos/")
+        self.assertEqual(audit.response["X-Cache"], "HIT")
+        self.assertEqual(audit.queries, [])
+        self.assertEqual(audit.response.content, first.content)
+        self.assertEqual(self.client.get("/cursos/?ordering=title")["X-Cache"], "MISS")
+        self.assertEqual(cache_stats(), {"hits": 1, "misses": 2})
+
+    def test_renaming_the_instructor_invalidates_course_pages(self):
+        url = f"/cursos/{self.curso.pk}/?expand=instructor"
+        self.client.get(url)
+        instructor = self.curso.instructor
+        instructor.nombre = "Renombrado"
+        instructor.save()
+        response = self.client.get(url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()["instructor"]["nombre"], "Renombrado")
+        # /usuarios/ no embebe cursos ni /cursos/ sin expand al instructor.
+        self.client.get(f"/cursos/{self.curso.pk}/")
+        instructor.save()
+        self.assertEqual(self.client.get(f"/cursos/{self.curso.pk}/")["X-Cache"], "HIT")
+        self.client.get("/usuarios/")
+        self.client.get("/lecciones/")
+        Lesson.objects.create(nombre_leccion="Nueva", curso=self.curso)
+        self.assertEqual(self.client.get("/usuarios/")["X-Cache"], "HIT")
+        self.assertEqual(self.client.get("/lecciones/")["X-Cache"], "MISS")
+        self.assertEqual(self.client.get(url).json()["lesson_count"], self.curso.lesson_count + 1)
+
+    def test_invalidated_again_on_commit(self):
+        self.client.get("/cursos/")
+        with self.captureOnCommitCallbacks() as callbacks:
+            Course.objects.filter(pk=self.curso.pk).update(title="Sin señal")
+            bump_namespace(Course)
+            self.client.get("/cursos/")  # lectura concurrente antes del commit
+        self.assertEqual(self.client.get("/cursos/")["X-Cache"], "HIT")
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.client.get("/cursos/")["X-Cache"], "MISS")
+
+    def test_browsable_api_is_not_cached(self):
+        self.client.get("/cursos/", HTTP_ACCEPT="text/html")
+        self.assertNotIn("X-Cache", self.client.get("/cursos/", HTTP_ACCEPT="text/html"))
+
+    def test_file_based_backend(self):
+        with tempfile.TemporaryDirectory() as location, override_settings(CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": location},
+        }):
+            self.assertEqual(self.client.get("/lecciones/")["X-Cache"], "MISS")
+            self.assertEqual(self.client.get("/lecciones/")["X-Cache"], "HIT")
+            Lesson.objects.filter(curso=self.curso).first().delete()
+            self.assertEqual(self.client.get("/lecciones/")["X-Cache"], "MISS")
+
+
+@override_settings(LMS_API_CACHE_TIMEOUT=0)
+class ConditionalRequestTests(QueryAuditMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(usuarios=25, cursos=3, lecciones=6, inscripciones=5)
+        cls.curso = Course.objects.order_by("id").first()
+
+    def test_detail_not_modified_before_serializing(self):
+        url = f"/cursos/{self.curso.pk}/?expand=instructor"
+        first = self.client.get(url)
+        self.assertIn("Last-Modified", first)
+        audit = self.audit("get", url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(audit.response.status_code, 304)
+        self.assertEqual(audit.response["ETag"], first["ETag"])
+        self.assertQueryShapes(audit, [f"{VALIDATE_COURSES} WHERE lms_course.id = ?"], {})
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]).status_code, 304)
+
+        instructor = self.curso.instructor
+        instructor.nombre = "Renombrado"
+        instructor.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], first["ETag"])
+        self.assertEqual(self.client.get("/cursos/0/", HTTP_IF_NONE_MATCH="*").status_code, 404)
+
+    def test_list_etag_follows_deletes_and_query(self):
+        first = self.client.get("/lecciones/")
+        self.assertNotIn("Last-Modified", first)
+        self.assertEqual(self.client.get("/lecciones/", HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+        self.assertNotEqual(self.client.get("/lecciones/?ordering=-created_at")["ETag"], first["ETag"])
+        Lesson.objects.order_by("id").first().delete()
+        self.assertEqual(self.client.get("/lecciones/", HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 200)
+
+    def test_numbered_page_aggregates_only_its_rows_and_the_count(self):
+        url = "/usuarios/?page=last"
+        first = self.audit("get", url)
+        self.assertEqual(len(first.queries), 3)  # COUNT, la página y sus validadores
+        primero = Usuario.objects.order_by("id").first()
+        Usuario.objects.filter(pk=primero.pk).update(nombre="Otro", updated_at=timezone.now())
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first.response["ETag"]).status_code, 304)
+        first = self.client.get("/usuarios/")
+        Usuario.objects.create(correo="ultimo@lms.test", nombre="Último")  # fuera de la página, cambia count
+        self.assertEqual(self.client.get("/usuarios/", HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 200)
+        self.assertEqual(self.client.get("/usuarios/?page=99", HTTP_IF_NONE_MATCH="*").status_code, 404)
+
+    def test_detail_etag_without_columns_in_the_row(self):
+        url = f"/cursos/{self.curso.pk}/?fields=title"
+        first = self.audit("get", url)
+        self.assertEqual(len(first.queries), 2)  # ?fields= deja fuera updated_at: se agrega aparte
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first.response["ETag"]).status_code, 304)
+
+    def test_keyset_page_ignores_rows_outside_the_page(self):
+        first = self.client.get("/usuarios/?cursor=")
+        Usuario.objects.create(correo="ultimo@lms.test", nombre="Último")
+        self.assertEqual(self.client.get("/usuarios/?cursor=", HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+        Usuario.objects.order_by("created_at", "id")[3].delete()
+        self.assertEqual(self.client.get("/usuarios/?cursor=", HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 200)
+
+    def test_if_match_on_writes(self):
+        self.client.force_authenticate(User.objects.create_user("admin"))
+        url = f"/cursos/{self.curso.pk}/"
+        etag = self.client.get(url)["ETag"]
+        Course.objects.filter(pk=self.curso.pk).update(title="Cambiado por otro", updated_at=timezone.now())
+        audit = self.audit("patch", url, data={"title": "Mío"}, HTTP_IF_MATCH=etag)
+        self.assertEqual(audit.response.status_code, 412)
+        self.assertFalse(any(query.startswith("UPDATE") for query in audit.queries))
+        etag = self.client.get(url)["ETag"]
+        response = self.client.patch(url, {"title": "Mío"}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], self.client.get(url)["ETag"])
+        self.assertEqual(self.client.delete(url, HTTP_IF_MATCH=etag).status_code, 412)
+        self.assertEqual(self.client.delete(url, HTTP_IF_MATCH=response["ETag"]).status_code, 204)
+
+    @override_settings(LMS_API_CACHE_TIMEOUT=300)
+    def test_cached_responses_keep_their_validators(self):
+        get_cache().clear()
+        first = self.client.get("/cursos/")
+        audit = self.audit("get", "/cursos/")
+        self.assertEqual(audit.response["X-Cache"], "HIT")
+        self.assertEqual(audit.response["ETag"], first["ETag"])
+        self.assertEqual(audit.queries, [])
+
+
+@override_settings(LMS_API_CACHE_TIMEOUT=0)
+class BulkWriteTests(QueryAuditMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = Usuario.objects.create(correo="i@lms.test", nombre="Instructor")
+        cls.cursos = [Course.objects.create(title=f"Curso {i}", instructor=cls.instructor) for i in range(3)]
+        cls.alumnos = Usuario.objects.bulk_create(
+            Usuario(correo=f"alumno{i}@lms.test", nombre=f"Alumno {i}") for i in range(150)
+        )
+        cls.user = User.objects.create_user("admin")
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def enroll(self, alumnos, query="", **headers):
+        data = [
+            {"usuario_id": alumno.pk, "curso_id": self.cursos[i % 3].pk, "rol": "estudiante"}
+            for i, alumno in enumerate(alumnos)
+        ]
+        return self.audit("post", "/inscripciones/bulk/" + query, data=data, format="json", **headers)
+
+    def assertCountersConsistent(self):
+        self.assertEqual(list(rebuild_counters(dry_run=True))[-1], (3, 0))
+
+    def test_create_queries_do_not_depend_on_batch_size(self):
+        small = self.enroll(self.alumnos[:30])
+        self.assertEqual(small.response.status_code, 201, small.response.data)
+        large = self.enroll(self.alumnos[30:])
+        self.assertEqual(large.response.status_code, 201, large.response.data)
+        self.assertEqual(large.response.data["count"], 120)
+        self.assertEqual(len(large.queries), len(small.queries))
+        self.assertEqual(sum(query.startswith("INSERT") for query in large.queries), 1)
+        self.assertEqual(Inscripcion.objects.count(), 150)
+        self.assertEqual(set(large.response.data["ids"]), set(
+            Inscripcion.objects.filter(usuario__in=self.alumnos[30:]).values_list("pk", flat=True)
+        ))
+        self.assertCountersConsistent()
+        self.assertEqual(Course.objects.get(pk=self.cursos[0].pk).student_count, 50)
+
+    def test_errors_are_reported_per_item(self):
+        Inscripcion.objects.create(usuario=self.alumnos[0], curso=self.cursos[0], rol="estudiante")
+        response = self.client.post("/inscripciones/bulk/", [
+            {"usuario_id": self.alumnos[1].pk, "curso_id": self.cursos[0].pk, "rol": "estudiante"},
+            {"usuario_id": self.alumnos[2].pk, "curso_id": 0, "rol": "estudiante"},
+            {"usuario_id": self.alumnos[0].pk, "curso_id": self.cursos[0].pk, "rol": "estudiante"},
+            {"usuario_id": self.alumnos[1].pk, "curso_id": self.cursos[0].pk, "rol": "instructor"},
+            {"usuario_id": "x", "curso_id": self.cursos[1].pk},
+        ], format="json")
+        self.assertEqual(response.status_code, 400)
+        errors = response.data
+        self.assertEqual(errors[0], {})
+        self.assertEqual(errors[1]["curso_id"][0].code, "does_not_exist")
+        self.assertEqual(errors[2]["non_field_errors"][0].code, "unique")
+        self.assertEqual(errors[3]["non_field_errors"][0].code, "unique")
+        self.assertEqual(set(errors[4]), {"usuario_id", "rol"})
+        self.assertEqual(Inscripcion.objects.count(), 1)
+        self.assertEqual(self.client.post("/inscripciones/bulk/", {"rol": "x"}, format="json").status_code, 400)
+        with override_settings(LMS_BULK_MAX_ITEMS=2):
+            self.assertEqual(self.enroll(self.alumnos[:3]).response.status_code, 400)
+
+    def test_update_moves_lessons_and_keeps_counters(self):
+        lecciones = Lesson.objects.bulk_create(
+            Lesson(nombre_leccion=f"L{i}", curso=self.cursos[0]) for i in range(10)
+        )
+        list(rebuild_counters())
+        data = [{"id_leccion": leccion.pk, "curso_id": self.cursos[1].pk} for leccion in lecciones[:4]]
+        data.append({"id_leccion": lecciones[4].pk, "nombre_leccion": "Renombrada"})
+        audit = self.audit(
+            "patch", "/lecciones/bulk/?expand=curso", data=data, format="json", HTTP_PREFER="return=representation"
+        )
+        self.assertEqual(audit.response.status_code, 200, audit.response.data)
+        self.assertEqual(sum(query.startswith("UPDATE lms_lesson") for query in audit.queries), 1)
+        self.assertEqual([row["curso"]["id_curso"] for row in audit.response.data[:4]], [self.cursos[1].pk] * 4)
+        self.assertEqual(Lesson.objects.get(pk=lecciones[4].pk).nombre_leccion, "Renombrada")
+        self.assertGreater(Lesson.objects.get(pk=lecciones[0].pk).updated_at, lecciones[0].updated_at)
+        self.assertCountersConsistent()
+        self.assertEqual(Course.objects.get(pk=self.cursos[1].pk).lesson_count, 4)
+
+        response = self.client.patch("/lecciones/bulk/", [{"id_leccion": 0, "nombre_leccion": "?"}], format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("id_leccion", response.data[0])
+
+    def test_update_rejects_repeated_ids(self):
+        leccion = Lesson.objects.create(nombre_leccion="L", curso=self.cursos[0])
+        data = [{"id_leccion": leccion.pk, "curso_id": self.cursos[1].pk}] * 2
+        response = self.client.patch("/lecciones/bulk/", data, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn("id_leccion", response.data[1])
+        self.assertEqual(Lesson.objects.get(pk=leccion.pk).curso_id, self.cursos[0].pk)
+        self.assertCountersConsistent()
+
+    @override_settings(LMS_API_CACHE_TIMEOUT=300)
+    def test_invalidates_cached_responses(self):
+        get_cache().clear()
+        self.client.get("/cursos/")
+        created = self.enroll(
+            self.alumnos[:3], "?expand=curso.instructor", HTTP_PREFER="return=representation"
+        ).response
+        self.assertEqual(created.status_code, 201)
+        self.assertEqual(created.data[0]["curso"]["instructor"]["nombre"], "Instructor")
+        response = self.client.get("/cursos/")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["results"][0]["enrollment_count"], 1)
+
+
+class ExportTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(usuarios=10, cursos=4, lecciones=0, inscripciones=30)
+        cls.user = User.objects.create_user("admin")
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def export(self, url, **extra):
+        with override_settings(LMS_EXPORT_CHUNK_SIZE=7), CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, **extra)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.streaming)
+            body = b"".join(response.streaming_content).decode()
+        return response, ctx.captured_queries, body
+
+    def test_ndjson_is_flat_and_follows_list_ordering(self):
+        response, queries, body = self.export("/inscripciones/export/")
+        rows = [json.loads(line) for line in body.splitlines()]
+        expected = Inscripcion.objects.order_by("fecha_inscripcion", "id").select_related("usuario", "curso")
+        self.assertEqual([row["id"] for row in rows], [inscripcion.pk for inscripcion in expected])
+        first = expected[0]
+        self.assertEqual(rows[0]["usuario_correo"], first.usuario.correo)
+        self.assertEqual(rows[0]["curso_title"], first.curso.title)
+        self.assertEqual(rows[0]["fecha_inscripcion"], first.fecha_inscripcion.isoformat())
+        self.assertEqual(response["Content-Type"], "application/x-ndjson; charset=utf-8")
+        # Una sola consulta sea cual sea el número de filas o de bloques.
+        self.assertEqual(len(queries), 1)
+
+        _, _, body = self.export("/inscripciones/export/?ordering=-id")
+        ids = [json.loads(line)["id"] for line in body.splitlines()]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+
+    def test_csv(self):
+        response, _, body = self.export("/cursos/export/", HTTP_ACCEPT="text/csv")
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0][:6], ["id", "title", "description", "instructor_id", "instructor_correo",
+                                       "instructor_nombre"])
+        self.assertEqual(len(rows), 5)
+        self.assertIn('filename="cursos-', response["Content-Disposition"])
+        _, _, body = self.export("/usuarios/export/?format=csv")
+        self.assertNotIn("contrasena", body.splitlines()[0])
+        self.assertEqual(len(body.splitlines()), 11)
+
+    def test_permissions_still_apply(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get("/inscripciones/export/").status_code, 403)
+
+    async def test_asgi_streams_chunk_by_chunk(self):
+        produced = []
+        chunks = import_module("lms.export")._chunks
+
+        def counted(iterator, size):
+            for chunk in chunks(iterator, size):
+                produced.append(len(chunk))
+                yield chunk
+
+        await self.async_client.aforce_login(self.user)
+        with override_settings(LMS_EXPORT_CHUNK_SIZE=7, ROOT_URLCONF="lms.async_urls"), \
+                mock.patch("lms.export._chunks", counted):
+            response = await self.async_client.get("/inscripciones/export/")
+            self.assertTrue(response.is_async)
+            body = [await anext(response.streaming_content)]
+            # El primer bloque sale antes de leer el resto de filas.
+            self.assertEqual(produced, [7])
+            body += [chunk async for chunk in response.streaming_content]
+        self.assertEqual(produced, [7, 7, 7, 7, 2])
+        self.assertEqual(len(b"".join(body).splitlines()), 30)
+
+
+@skipUnless(connection.vendor == "postgresql", "COPY de PostgreSQL")
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class ImportCommandTests(APITestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def write(self, name, content):
+        path = f"{self.dir.name}/{name}"
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write(content)
+        return path
+
+    def run_import(self, **files):
+        out = StringIO()
+        call_command("import_lms", stdout=out, batch_size=2, workers=2, **files)
+        return out.getvalue()
+
+    def test_import_resolves_natural_keys_and_upserts(self):
+        existente = Usuario.objects.create(correo="ana@lms.test", nombre="Ana", contrasena="previa")
+        out = self.run_import(
+            usuarios=self.write("usuarios.csv", (
+                "correo,nombre,contrasena\n"
+                "ana@lms.test,Ana María,\n"
+                "luis@lms.test,Luis,secreta\n"
+                "eva@lms.test,Eva,otra\n"
+                "eva@lms.test,Eva Final,otra\n"
+            )),
+            cursos=self.write("cursos.ndjson", (
+                '{"title": "Python", "description": "Intro", "instructor_correo": "ana@lms.test"}\n'
+                '{"title": "Python", "instructor_correo": "luis@lms.test"}\n'
+                '{"title": "Huérfano", "instructor_correo": "nadie@lms.test"}\n'
+            )),
+            lecciones=self.write("lecciones.csv", (
+                "nombre_leccion,curso_title,instructor_correo\n"
+                "Variables,Python,ana@lms.test\n"
+                "Bucles,Python,ana@lms.test\n"
+                "Variables,Python,luis@lms.test\n"
+            )),
+            inscripciones=self.write("inscripciones.csv", (
+                "usuario_correo,curso_title,instructor_correo,rol,fecha_inscripcion\n"
+                "luis@lms.test,Python,ana@lms.test,,2024-03-01\n"
+                "eva@lms.test,Python,ana@lms.test,instructor,\n"
+                "eva@lms.test,Python,luis@lms.test,,\n"
+                "nadie@lms.test,Python,ana@lms.test,,\n"
+            )),
+        )
+        self.assertIn("usuarios: 2 nuevos, 1 existentes, 1 descartados", out)
+        self.assertIn("cursos: 2 nuevos, 0 existentes, 1 descartados", out)
+        self.assertIn("inscripciones: 3 nuevos, 0 existentes, 1 descartados", out)
+        self.assertIn("filas/s", out)
+
+        existente.refresh_from_db()
+        self.assertEqual((existente.nombre, existente.contrasena), ("Ana María", "previa"))
+        luis = Usuario.objects.get(correo="luis@lms.test")
+        self.assertTrue(luis.contrasena.startswith("md5$"))
+        self.assertEqual(Usuario.objects.get(correo="eva@lms.test").nombre, "Eva Final")
+
+        curso = Course.objects.get(title="Python", instructor=existente)
+        self.assertEqual(curso.description, "Intro")
+        self.assertEqual((curso.lesson_count, curso.student_count, curso.instructor_count), (2, 1, 1))
+        self.assertEqual(
+            str(Inscripcion.objects.get(usuario=luis, curso=curso).fecha_inscripcion), "2024-03-01"
+        )
+
+        # Reimportar no duplica: actualiza.
+        out = self.run_import(inscripciones=self.write("rol.csv", (
+            "usuario_correo,curso_title,instructor_correo,rol\n"
+            "luis@lms.test,Python,ana@lms.test,instructor\n"
+        )))
+        self.assertIn("inscripciones: 0 nuevos, 1 existentes, 0 descartados", out)
+        curso.refresh_from_db()
+        self.assertEqual((curso.enrollment_count, curso.student_count, curso.instructor_count), (2, 0, 2))
+
+    def test_missing_required_column(self):
+        with self.assertRaisesMessage(CommandError, "faltan instructor_correo"):
+            self.run_import(cursos=self.write("cursos.csv", "title\nPython\n"))
+
+
+@override_settings(
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"], LMS_PASSWORD_WORKERS=0,
+)
+class PasswordHashingTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("admin")
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_create_and_update_store_hashes(self):
+        response = self.client.post(
+            "/usuarios/", {"correo": "nuevo@lms.test", "nombre": "Nuevo", "contrasena": "secreta"}, format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        usuario = Usuario.objects.get(correo="nuevo@lms.test")
+        self.assertTrue(check_password("secreta", usuario.contrasena))
+
+        for method in (self.client.patch, self.client.put):
+            response = method(
+                f"/usuarios/{usuario.pk}/",
+                {"correo": usuario.correo, "nombre": "Nuevo", "contrasena": f"otra-{method.__name__}"},
+                format="json",
+            )
+            self.assertEqual(response.status_code, 200)
+            usuario.refresh_from_db()
+            self.assertTrue(check_password(f"otra-{method.__name__}", usuario.contrasena))
+
+        # Sin contraseña en el PATCH se conserva la anterior.
+        self.client.patch(f"/usuarios/{usuario.pk}/", {"nombre": "Renombrado"}, format="json")
+        usuario.refresh_from_db()
+        self.assertTrue(check_password("otra-put", usuario.contrasena))
+
+    def test_process_pool(self):
+        with override_settings(LMS_PASSWORD_WORKERS=1):
+            hashed = get_password_hasher_pool().make_password("secreta")
+        self.assertTrue(hashed.startswith("md5$"))
+        self.assertTrue(check_password("secreta", hashed))
+        # Los hijos no heredan los ajustes (forkserver): el coste viaja con cada tarea.
+        with override_settings(
+            LMS_PASSWORD_WORKERS=1, LMS_PBKDF2_ITERATIONS=1234,
+            PASSWORD_HASHERS=["lms.passwords.TunablePBKDF2PasswordHasher"],
+        ):
+            hashed = get_password_hasher_pool().make_password("secreta")
+            self.assertTrue(hashed.startswith("pbkdf2_sha256$1234$"))
+            self.assertTrue(check_password("secreta", hashed))
+
+    def test_saturated_pool_answers_503(self):
+        with override_settings(LMS_PASSWORD_MAX_PENDING=0, LMS_PASSWORD_WAIT=0.01):
+            pool = get_password_hasher_pool()
+            self.assertTrue(pool._slots.acquire(blocking=False))  # el único hueco, ocupado
+            try:
+                response = self.client.post(
+                    "/usuarios/", {"correo": "n@lms.test", "nombre": "N", "contrasena": "x"}, format="json",
+                )
+            finally:
+                pool._slots.release()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.data["detail"].code, "password_hashing_busy")
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertFalse(Usuario.objects.filter(correo="n@lms.test").exists())
+
+
+@override_settings(LMS_API_CACHE_TIMEOUT=0)
+class AsyncReadTests(QueryAuditMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(usuarios=30, cursos=25, lecciones=45, inscripciones=40)
+        cls.curso = Course.objects.order_by("id").first()
+
+    def audit_async(self, url, **extra):
+        with override_settings(ROOT_URLCONF="lms.async_urls"):
+            return self.audit("get", url, **extra)
+
+    def test_routes(self):
+        for name in ("cursos-list", "cursos-detail", "lecciones-list", "usuarios-detail"):
+            url = reverse(name, kwargs={"pk": 1} if name.endswith("detail") else {}, urlconf="lms.async_urls")
+            self.assertTrue(iscoroutinefunction(resolve(url, urlconf="lms.async_urls").func), name)
+        self.assertFalse(iscoroutinefunction(resolve("/inscripciones/", urlconf="lms.async_urls").func))
+        self.assertFalse(iscoroutinefunction(resolve("/cursos/export/", urlconf="lms.async_urls").func))
+
+    def test_same_responses_and_queries_as_the_sync_views(self):
+        urls = [
+            "/cursos/", "/cursos/?page=2", "/cursos/?page=9", "/lecciones/?ordering=-created_at",
+            "/usuarios/?cursor=", "/usuarios/?cursor=&count=true", f"/cursos/{self.curso.pk}/",
+            "/cursos/0/", "/cursos/abc/", "/usuarios/?cursor=basura", "/lecciones/?expand=curso.instructor",
+            "/cursos/?cursor=&fields=id_curso,title", f"/cursos/{self.curso.pk}/?expand=nada",
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                expected = self.audit("get", url)
+                audit = self.audit_async(url)
+                self.assertEqual(audit.response.status_code, expected.response.status_code)
+                self.assertEqual(audit.response.content, expected.response.content)
+                self.assertEqual(audit.response.get("ETag"), expected.response.get("ETag"))
+                self.assertEqual(audit.queries, expected.queries)
+
+        next_page = self.audit_async("/usuarios/?cursor=").response.json()["next"]
+        self.assertEqual(self.audit_async(next_page).response.content, self.client.get(next_page).content)
+
+    def test_conditional_get_and_cache(self):
+        url = f"/cursos/{self.curso.pk}/?expand=instructor"
+        first = self.audit_async(url).response
+        audit = self.audit_async(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(audit.response.status_code, 304)
+        self.assertQueryShapes(audit, [f"{VALIDATE_COURSES} WHERE lms_course.id = ?"], {})
+        with override_settings(LMS_API_CACHE_TIMEOUT=300):
+            get_cache().clear()
+            self.assertEqual(self.audit_async("/lecciones/").response["X-Cache"], "MISS")
+            audit = self.audit_async("/lecciones/")
+            self.assertEqual(audit.response["X-Cache"], "HIT")
+            self.assertEqual(audit.queries, [])
+            self.assertEqual(self.audit_async("/lecciones/", HTTP_IF_NONE_MATCH=audit.response["ETag"])
+                             .response.status_code, 304)
+
+    def test_session_user_and_writes(self):
+        self.client.force_login(User.objects.create_user("admin"))
+        with override_settings(ROOT_URLCONF="lms.async_urls"):
+            self.assertEqual(self.client.head("/cursos/").status_code, 200)
+            response = self.client.post("/lecciones/", {"nombre_leccion": "Nueva", "curso_id": self.curso.pk})
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(self.client.get(f"/lecciones/{response.data['id_leccion']}/").json()["nombre_leccion"],
+                             "Nueva")
+
+    async def test_asgi_client(self):
+        with override_settings(ROOT_URLCONF="lms.async_urls"):
+            response = await self.async_client.get("/cursos/?cursor=")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), api_settings.PAGE_SIZE)
+
+
+class ServingTests(APITestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        with open(f"{self.root.name}/app.css", "w") as handle:
+            handle.write("body { color: red; }\n" * 500)
+        with open(f"{self.root.name}/app.css.gz", "wb") as handle:
+            handle.write(gzip.compress(b"body { color: red; }\n" * 500))
+        settings_override = override_settings(
+            STATIC_ROOT=self.root.name, STATIC_URL="/static/", WHITENOISE_AUTOREFRESH=False,
+            WHITENOISE_USE_FINDERS=False,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def wsgi(self, path, **headers):
+        def application(environ, start_response):
+            start_response("200 OK", [("X-Django", "1")])
+            return [b"django"]
+
+        captured = {}
+
+        def start_response(status, response_headers):
+            captured.update(status=status, headers=dict(response_headers))
+
+        environ = RequestFactory().get(path, **headers).environ
+        body = b"".join(StaticFilesWSGI(application)(environ, start_response))
+        return captured["status"], captured["headers"], body
+
+    def asgi(self, path, **headers):
+        async def application(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": [(b"x-django", b"1")]})
+            await send({"type": "http.response.body", "body": b"django"})
+
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            "type": "http", "method": "GET", "path": path,
+            "headers": [(name.encode(), value.encode()) for name, value in headers.items()],
+        }
+        asyncio.run(StaticFilesASGI(application)(scope, None, send))
+        start, bodies = messages[0], messages[1:]
+        return start["status"], dict(start["headers"]), b"".join(message["body"] for message in bodies)
+
+    def test_wsgi(self):
+        status, headers, body = self.wsgi("/static/app.css")
+        self.assertEqual((status, len(body)), ("200 OK", 10500))
+        self.assertIn("max-age", headers["Cache-Control"])
+        status, headers, body = self.wsgi("/static/app.css", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        status, _, body = self.wsgi("/static/app.css", HTTP_IF_NONE_MATCH=headers["ETag"])
+        self.assertEqual((status, body), ("304 Not Modified", b""))
+        self.assertEqual(self.wsgi("/cursos/")[2], b"django")
+
+    def test_asgi(self):
+        with mock.patch("project.static.CHUNK_SIZE", 4096):
+            status, headers, body = self.asgi("/static/app.css")
+        self.assertEqual((status, body), (200, b"body { color: red; }\n" * 500))
+        status, headers, body = self.asgi("/static/app.css", **{"accept-encoding": "gzip"})
+        self.assertEqual(headers[b"content-encoding"], b"gzip")
+        self.assertEqual(gzip.decompress(body), b"body { color: red; }\n" * 500)
+        status, _, body = self.asgi("/static/app.css", range="bytes=7-11")
+        self.assertEqual((status, body), (206, b"color"))
+        self.assertEqual(self.asgi("/cursos/")[2], b"django")
+
+    def test_media_uploads(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        os.makedirs(f"{media.name}/course_avatars/derived")
+        for name in ("course_avatars/foto.jpg", "course_avatars/derived/0123abcd-128.webp"):
+            with open(f"{media.name}/{name}", "wb") as handle:
+                handle.write(b"imagen")
+        with override_settings(MEDIA_ROOT=media.name, MEDIA_URL="/media/"):
+            status, headers, body = self.wsgi("/media/course_avatars/foto.jpg")
+            self.assertEqual((status, body), ("200 OK", b"imagen"))
+            self.assertNotIn("immutable", headers["Cache-Control"])
+            status, headers, _ = self.wsgi("/media/course_avatars/derived/0123abcd-128.webp")
+            self.assertIn("immutable", headers["Cache-Control"])
+            self.assertEqual(self.wsgi("/media/../settings.py")[2], b"django")
+        with override_settings(MEDIA_ROOT=media.name, MEDIA_URL="https://cdn.lms.test/media/"):
+            self.assertEqual(self.wsgi("/media/course_avatars/foto.jpg")[2], b"django")
+
+    def test_serve_command_line(self):
+        out = StringIO()
+        call_command("serve", "--check", "--workers", "3", stdout=out, stderr=StringIO())
+        self.assertIn("project.wsgi:application", out.getvalue())
+        self.assertIn("--workers 3 --max-requests 2000", out.getvalue())
+        self.assertIn("--worker-class gthread", out.getvalue())
+        out = StringIO()
+        with mock.patch.dict(os.environ):
+            os.environ.pop("WEB_CONCURRENCY", None)
+            call_command("serve", "--check", "--asgi", stdout=out, stderr=StringIO())
+        self.assertIn("project.asgi:application", out.getvalue())
+        self.assertIn(f"--workers {gunicorn_conf.default_workers(asgi=True)} ", out.getvalue())
+        self.assertIn("uvicorn_worker.UvicornWorker", out.getvalue())
+        out = StringIO()
+        with mock.patch.dict(os.environ, {"WEB_CONCURRENCY": "5"}):
+            call_command("serve", "--check", "--asgi", stdout=out, stderr=StringIO())
+        self.assertIn("--workers 5 ", out.getvalue())
+
+    def test_serve_warns_about_per_process_caches(self):
+        err = StringIO()
+        call_command("serve", "--check", "--workers", "3", stdout=StringIO(), stderr=err)
+        self.assertIn("LocMemCache", err.getvalue())
+        with tempfile.TemporaryDirectory() as location, override_settings(CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": location},
+        }):
+            err = StringIO()
+            call_command("serve", "--check", "--workers", "3", stdout=StringIO(), stderr=err)
+        self.assertEqual(err.getvalue(), "")
+        err = StringIO()
+        call_command("serve", "--check", "--workers", "1", stdout=StringIO(), stderr=err)
+        self.assertEqual(err.getvalue(), "")
+
+
+@skipUnless(connection.settings_dict["ENGINE"] == "project.db", "backend project.db")
+class ConnectionMetricsTests(APITransactionTestCase):
+    def setUp(self):
+        user = User.objects.create_user("admin")
+        self.client.force_authenticate(user)
+        self.async_client.force_login(user)
+        # Cada petición tiene que pedir su conexión (fuera de la transacción del test).
+        connection.close()
+
+    def test_server_timing(self):
+        with self.assertLogs("project.db", "DEBUG") as logs:
+            response = self.client.get("/cursos/")
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response["Server-Timing"], r'^db-connect;dur=\d+\.\d;desc="1 conexiones"$')
+        self.assertIn("GET /cursos/: 1 conexiones en", logs.output[0])
+        self.assertNotIn("Server-Timing", self.client.get("/static/nada.css"))
+
+    async def test_server_timing_asgi(self):
+        for urlconf in ("lms.async_urls", "lms.urls"):
+            with self.subTest(urlconf=urlconf), override_settings(ROOT_URLCONF=urlconf):
+                response = await self.async_client.get("/cursos/?cursor=")
+                self.assertEqual(response.status_code, 200)
+                self.assertIn("db-connect;dur=", response["Server-Timing"])
+                # El cliente de test no cierra la conexión al acabar la petición.
+                await sync_to_async(connections.close_all)()
+
+    def test_pool_reuses_connections(self):
+        if connection.pool is None:
+            self.skipTest("sin OPTIONS['pool']")
+        close_pools()
+        for _ in range(5):
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.close()
+        stats = connection.pool.get_stats()
+        self.assertEqual(stats["requests_num"], 5)
+        self.assertLess(stats["connections_num"], 5)
+        close_pools()
+        self.assertFalse(connection.pool_opened)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        self.assertTrue(connection.pool_opened)
+
+    def test_pool_discards_connections_closed_by_the_server(self):
+        if connection.pool is None:
+            self.skipTest("sin OPTIONS['pool']")
+        close_pools()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        connection.close()
+        connection.pool.wait()
+        # Como tras un reinicio de PostgreSQL: el servidor cierra las conexiones ociosas del pool.
+        with connection.Database.connect(**connection.pool.kwargs) as admin:
+            admin.execute("SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+                          "WHERE datname = current_database() AND pid <> pg_backend_pid()")
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            self.assertEqual(cursor.fetchone(), (1,))
+        connection.close()
+        self.assertGreaterEqual(connection.pool.get_stats().get("connections_lost", 0), 1)
+        close_pools()
+
+
+class ReplicaRoutingTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(usuarios=10, cursos=5, lecciones=10, inscripciones=20)
+        cls.curso = Course.objects.order_by("id").first()
+
+    def setUp(self):
+        self.client.force_authenticate(User.objects.create_user("admin"))
+        # Las lecturas "de réplica" van a default: sólo se comprueba a dónde decide ir el router.
+        settings_override = override_settings(DATABASE_REPLICAS=["default"], LMS_API_CACHE_TIMEOUT=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.patcher = mock.patch("project.db.router.choose_replica", return_value="default")
+        self.choose_replica = self.patcher.start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_router(self):
+        lags = {"r1": 0.5, "r2": 30.0}
+        self.patcher.stop()
+        with override_settings(DATABASE_REPLICAS=["r1", "r2"]), self.assertLogs("project.db", "WARNING") as logs, \
+                mock.patch("project.db.router.replication_lag", side_effect=lags.get) as replication_lag:
+            self.assertIsNone(router.ReplicaRouter().db_for_read(Course))
+            with router.replica_reads():
+                self.assertEqual(router.ReplicaRouter().db_for_read(Course), "r1")
+                self.assertEqual(router.ReplicaRouter().db_for_read(Lesson), "r1")
+                # La autenticación de DRF lee del primario: el login no fija al cliente.
+                for model in (User, Session):
+                    self.assertEqual(router.ReplicaRouter().db_for_read(model), "default")
+            with router.replica_reads():
+                router.use_primary()
+                self.assertEqual(router.ReplicaRouter().db_for_read(Course), "default")
+            self.assertEqual(replication_lag.call_count, 2)
+            lags["r1"] = 10.0
+            with override_settings(REPLICA_CHECK_INTERVAL=0), router.replica_reads():
+                self.assertEqual(router.ReplicaRouter().db_for_read(Course), "default")
+            self.assertFalse(router.ReplicaRouter().allow_migrate("r1", "lms"))
+        self.assertIn("Réplica r2 descartada: 30.0 s de retraso", logs.output[0])
+
+    async def test_async_streaming_keeps_the_reads(self):
+        reads = mock.Mock()
+
+        async def chunks():
+            yield router.current_reads.get()
+            yield await sync_to_async(router.current_reads.get)()  # el hilo de la base de datos también
+
+        self.assertEqual([chunk async for chunk in router.areads_during(reads, chunks())], [reads, reads])
+        self.assertIsNone(router.current_reads.get())
+
+    @skipUnless(connection.vendor == "postgresql", "funciones de replicación de PostgreSQL")
+    def test_replication_lag_on_primary(self):
+        self.assertEqual(router.replication_lag("default"), 0.0)
+
+    def test_safe_requests_read_from_replicas(self):
+        for url in ("/cursos/", f"/cursos/{self.curso.pk}/", "/inscripciones/", "/lecciones/?cursor="):
+            self.choose_replica.reset_mock()
+            self.assertEqual(self.client.get(url).status_code, 200)
+            self.choose_replica.assert_called_once_with()
+
+        # Las filas de la exportación se leen al consumir la respuesta, ya fuera de dispatch().
+        response = self.client.get("/inscripciones/export/?format=ndjson")
+        routed = []
+        db_for_read = router.ReplicaRouter.db_for_read
+
+        def spy(self, model, **hints):
+            routed.append(db_for_read(self, model, **hints))
+            return routed[-1]
+
+        with mock.patch.object(router.ReplicaRouter, "db_for_read", spy):
+            self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 20)
+        self.assertEqual(set(routed), {"default"})
+        self.assertIsNone(router.current_reads.get())
+
+    def test_writers_are_pinned_to_the_primary(self):
+        response = self.client.post("/lecciones/", {"nombre_leccion": "Nueva", "curso_id": self.curso.pk})
+        self.assertEqual(response.status_code, 201)
+        until = response[router.PIN_HEADER]
+        self.assertEqual(response.cookies[router.PIN_COOKIE].value, until)
+        self.assertAlmostEqual(float(until), time.time() + router.pin_seconds(), delta=5)
+        self.choose_replica.reset_mock()
+        self.assertEqual(self.client.get("/lecciones/").status_code, 200)
+        self.choose_replica.assert_not_called()
+
+        # Sin cookie, con la cabecera; y una vez vencida, de nuevo a réplicas.
+        self.client.cookies.clear()
+        self.client.get("/lecciones/", HTTP_X_PRIMARY_UNTIL=until)
+        self.choose_replica.assert_not_called()
+        self.client.get("/lecciones/", HTTP_X_PRIMARY_UNTIL=str(time.time() - 1))
+        self.choose_replica.assert_called_once_with()
+        # Un valor que pin_to_primary no ha podido dar no fija al cliente para siempre.
+        for forged in ("1e12", "inf", "nan"):
+            self.choose_replica.reset_mock()
+            self.client.get("/lecciones/", HTTP_X_PRIMARY_UNTIL=forged)
+            self.choose_replica.assert_called_once_with()
+
+        self.assertNotIn(router.PIN_HEADER, self.client.post("/lecciones/", {}))
+        with override_settings(DATABASE_REPLICAS=[]):
+            response = self.client.post("/lecciones/", {"nombre_leccion": "Otra", "curso_id": self.curso.pk})
+        self.assertNotIn(router.PIN_HEADER, response)
+
+    def test_response_cache_from_replicas_lasts_the_max_lag(self):
+        cache = get_cache()
+        cache.clear()
+        with override_settings(LMS_API_CACHE_TIMEOUT=300, REPLICA_MAX_LAG=2.5), \
+                mock.patch.object(cache, "set", wraps=cache.set) as cache_set:
+            self.assertEqual(self.client.get("/cursos/")["X-Cache"], "MISS")
+            self.choose_replica.assert_called_once_with()
+            self.assertEqual(self.client.get("/cursos/")["X-Cache"], "HIT")
+            with override_settings(DATABASE_REPLICAS=["replica"]):  # choose_replica -> "default": sin réplica
+                self.assertEqual(self.client.get("/cursos/?page=1")["X-Cache"], "MISS")
+        timeouts = [call.args[2] for call in cache_set.call_args_list if call.args[0].startswith("lms:response:")]
+        self.assertEqual(timeouts, [3, 300])
+
+    async def test_async_reads(self):
+        with override_settings(ROOT_URLCONF="lms.async_urls"):
+            response = await self.async_client.get(f"/cursos/{self.curso.pk}/")
+        self.assertEqual(response.status_code, 200)
+        self.choose_replica.assert_called_once_with()
+
+
+@override_settings(LMS_API_CACHE_TIMEOUT=0)
+class SparseFieldsTests(QueryAuditMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(usuarios=5, cursos=3, lecciones=6, inscripciones=5)
+        cls.leccion = Lesson.objects.select_related("curso").order_by("created_at", "id").first()
+
+    def first(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return response.json()["results"][0]
+
+    def test_relations_are_ids_unless_expanded(self):
+        curso = self.leccion.curso
+        self.assertEqual(self.first("/lecciones/")["curso"], curso.pk)
+        expanded = self.first("/lecciones/?expand=curso")["curso"]
+        self.assertEqual((expanded["id_curso"], expanded["instructor"]), (curso.pk, curso.instructor_id))
+        nested = self.first("/lecciones/?expand=curso.instructor")["curso"]["instructor"]
+        self.assertEqual(nested["id_usuario"], curso.instructor_id)
+        self.assertNotIn("contrasena", nested)
+
+    def test_fields_limit_columns_and_joins(self):
+        self.assertEqual(self.first("/lecciones/?fields=id_leccion,nombre_leccion"), {
+            "id_leccion": self.leccion.pk, "nombre_leccion": self.leccion.nombre_leccion,
+        })
+        audit = self.audit("get", "/lecciones/?fields=id_leccion,curso.title")
+        self.assertEqual(audit.response.json()["results"][0], {
+            "id_leccion": self.leccion.pk, "curso": {"title": self.leccion.curso.title},
+        })
+        self.assertQueryShapes(audit, [
+            count("lms_lesson"),
+            "SELECT lms_lesson.id AS id, lms_lesson.curso_id AS curso__id, lms_course.title AS curso__title "
+            "FROM lms_lesson "
+            "INNER JOIN lms_course ON (lms_lesson.curso_id = lms_course.id) "
+            "ORDER BY lms_lesson.created_at ASC, ? ASC LIMIT ?",
+            page_validators("lms_lesson", "lms_course", where=(
+                " INNER JOIN lms_course ON (lms_lesson.curso_id = lms_course.id)"
+            ), order=BY_CREATED.format(table="lms_lesson")),
+        ], {})
+
+    def test_keyset_cursor_columns_are_always_loaded(self):
+        audit = self.audit("get", "/lecciones/?cursor=&fields=nombre_leccion")
+        self.assertEqual(len(audit.queries), 2)
+        self.assertIn("lms_lesson.created_at", audit.queries[0])
+        self.assertEqual(set(audit.response.json()["results"][0]), {"nombre_leccion"})
+
+    def test_unknown_fields_are_rejected(self):
+        for url in ("/lecciones/?fields=nada", "/lecciones/?expand=nombre_leccion",
+                    "/lecciones/?expand=curso.nada", "/usuarios/?fields=contrasena"):
+            self.assertEqual(self.client.get(url).status_code, 400, url)
+        self.assertEqual(self.client.get("/lecciones/?fields=curso.nada").json(), {
+            "fields": ["Campo desconocido: nada"],
+        })
+
+    @override_settings(LMS_API_CACHE_TIMEOUT=300)
+    def test_each_shape_has_its_own_etag_and_cache_entry(self):
+        get_cache().clear()
+        urls = ("/cursos/", "/cursos/?fields=title", "/cursos/?expand=instructor")
+        etags = {self.client.get(url)["ETag"] for url in urls}
+        self.assertEqual(len(etags), 3)
+        self.assertEqual(self.client.get("/cursos/?fields=title")["X-Cache"], "HIT")
+        self.assertEqual(set(self.first("/cursos/?fields=title")), {"title"})
+
+    def test_writes_keep_write_only_fields(self):
+        self.client.force_authenticate(User.objects.create_user("admin"))
+        response = self.client.post("/lecciones/?fields=id_leccion", {
+            "nombre_leccion": "Nueva", "curso_id": self.leccion.curso_id,
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(set(response.json()), {"id_leccion"})
+
+
+@override_settings(LMS_API_CACHE_TIMEOUT=0)
+class ValuesSerializerTests(QueryAuditMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(usuarios=30, cursos=12, lecciones=45, inscripciones=60)
+        Course.objects.filter(pk=Course.objects.order_by("id").first().pk).update(avatar="course_avatars/a.png")
+        cls.user = User.objects.create_user("admin")
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_lists_match_the_drf_serializers(self):
+        urls = [
+            "/usuarios/", "/usuarios/?page=2", "/cursos/", "/cursos/?expand=instructor&ordering=-title",
+            "/lecciones/?expand=curso.instructor", "/lecciones/?cursor=&fields=id_leccion,curso.title",
+            "/inscripciones/", "/inscripciones/?cursor=&expand=usuario,curso.instructor",
+            "/inscripciones/?fields=rol,curso.instructor.nombre&ordering=rol&page=3",
+        ]
+        for url in urls:
+            audit = self.audit("get", url)
+            self.assertEqual(audit.response.status_code, 200, url)
+            self.assertEqual(audit.rows, {}, url)  # ninguna instancia de modelo
+            with override_settings(LMS_VALUES_LISTS=False):
+                expected = self.client.get(url)
+            self.assertEqual(audit.response.content, expected.content, url)
+            next_page = audit.response.data.get("next")
+            if next_page:
+                with override_settings(LMS_VALUES_LISTS=False):
+                    expected = self.client.get(next_page)
+                self.assertEqual(self.client.get(next_page).content, expected.content, next_page)
+        avatar = self.client.get("/cursos/?fields=avatar").data["results"][0]["avatar"]
+        self.assertTrue(avatar.startswith("http://testserver/"), avatar)
+        self.assertTrue(avatar.endswith("course_avatars/a.png"), avatar)
+
+    def test_unsupported_fields_fall_back_to_drf(self):
+        class Resumen(LessonSerializer):
+            resumen = serializers.SerializerMethodField()
+
+            class Meta(LessonSerializer.Meta):
+                fields = LessonSerializer.Meta.fields + ["resumen"]
+
+            def get_resumen(self, leccion):
+                return leccion.nombre_leccion[:3]
+
+        self.assertIsNone(compile_values_serializer(Resumen))
+        self.assertIsNone(compile_values_serializer(Resumen, ("resumen",)))
+        self.assertIsNotNone(compile_values_serializer(Resumen, ("id_leccion",)))
+        with mock.patch.object(LessonViewSet, "serializer_class", Resumen):
+            response = self.client.get("/lecciones/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("resumen", response.data["results"][0])
+
+    def test_benchmark_compares_outputs(self):
+        # Sin umbral de tiempo (min_speedup=0): en CI el reloj no es fiable; el umbral lo aplica el comando.
+        out = StringIO()
+        call_command("benchmark_serializers", objects=500, repeat=1, min_speedup=0, stdout=out)
+        self.assertIn("inscripciones?expand=curso.instructor,usuario", out.getvalue())
+        with self.assertRaisesMessage(CommandError, "Por debajo de 1000×"):
+            call_command("benchmark_serializers", objects=200, repeat=1, min_speedup=1000, stdout=StringIO())
+
+
+class RendererTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(usuarios=5, cursos=3, lecciones=6, inscripciones=5)
+        cls.curso = Course.objects.order_by("id").first()
+
+    def test_orjson_renders_the_same_bytes_as_drf(self):
+        madrid = datetime.timezone(datetime.timedelta(hours=2))
+        data = ReturnDict({
+            "utc": datetime.datetime(2024, 5, 1, 10, 30, 5, 123456, tzinfo=datetime.timezone.utc),
+            "madrid": datetime.datetime(2024, 5, 1, 12, 30, tzinfo=madrid),
+            "naive": datetime.datetime(2024, 5, 1, 12, 30),
+            "dia": datetime.date(2024, 5, 1),
+            "hora": datetime.time(8, 15),
+            "duracion": datetime.timedelta(minutes=90),
+            "importe": Decimal("12.10"),
+            "uuid": uuid.UUID(int=42),
+            "texto": "línea\u2028párrafo\u2029fin ✓",
+            "enorme": 2 ** 70,
+            "claves": {1: "uno"},
+            "tupla": (1, 2.5, None, True),
+            "perezoso": gettext_lazy("hola"),
+        }, serializer=None)
+        for media_type in (None, "application/json; indent=2", "application/json; indent=4"):
+            self.assertEqual(
+                ORJSONRenderer().render(data, media_type), JSONRenderer().render(data, media_type), media_type
+            )
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+        aware_time = {"hora": datetime.time(8, 15, tzinfo=madrid)}
+        with self.assertRaisesMessage(ValueError, "timezone-aware times"):
+            ORJSONRenderer().render(aware_time)
+
+    def test_orjson_parser_accepts_what_drf_accepts(self):
+        for body in (b'{"a": [1, 2.5, null]}', b"123456789012345678901234567890", b'"\\ud800"', "\"ñ\"".encode()):
+            self.assertEqual(ORJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body)))
+        for body in (b"{", b"NaN", b'{"a": Infinity}'):
+            with self.assertRaises(ParseError):
+                ORJSONParser().parse(io.BytesIO(body))
+        latin1 = "\"año\"".encode("latin-1")
+        self.assertEqual(ORJSONParser().parse(io.BytesIO(latin1), parser_context={"encoding": "latin-1"}), "año")
+
+    def test_api_uses_orjson(self):
+        self.client.force_authenticate(User.objects.create_user("admin"))
+        response = self.client.get("/inscripciones/?expand=usuario,curso.instructor")
+        self.assertIsInstance(response.accepted_renderer, ORJSONRenderer)
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+        response = self.client.post(
+            "/lecciones/", json.dumps({"nombre_leccion": "Nueva", "curso_id": self.curso.pk}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.client.post("/lecciones/", "{", content_type="application/json").status_code, 400)
+
+    @skipUnless(msgpack, "requiere msgpack")
+    @override_settings(LMS_API_CACHE_TIMEOUT=300)
+    def test_messagepack(self):
+        get_cache().clear()
+        url = "/cursos/?expand=instructor"
+        expected = self.client.get(url).json()
+        response = self.client.get(url, HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(msgpack.unpackb(response.content), expected)
+        self.assertEqual(self.client.get(url, HTTP_ACCEPT="application/msgpack").content, response.content)
+
+        self.client.force_authenticate(User.objects.create_user("admin"))
+        body = msgpack.packb({"nombre_leccion": "Binaria", "curso_id": self.curso.pk})
+        response = self.client.post("/lecciones/", body, content_type="application/msgpack")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["nombre_leccion"], "Binaria")
+        response = self.client.post("/lecciones/", b"\xc1", content_type="application/msgpack")
+        self.assertEqual(response.status_code, 400)
+
+    def test_benchmark(self):
+        out = StringIO()
+        call_command("benchmark_renderers", objects=200, repeat=1, stdout=out)
+        self.assertIn("orjson", out.getvalue())
+
+
+class SearchTests(ExplainAssertionsMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        if connection.vendor == "postgresql":
+            # Triggers e índices de la migración 0007 (se puede repetir sin error).
+            with connection.schema_editor() as editor:
+                import_module("lms.migrations.0007_search_vector").install_search(None, editor)
+        instructor = Usuario.objects.create(correo="profe@lms.test", nombre="Profe")
+        cls.titulo = Course.objects.create(
+            title="Programación en Python", description="Desde cero", instructor=instructor,
+        )
+        cls.descripcion = Course.objects.create(
+            title="Ciencia de datos", description="Análisis con pandas y Python", instructor=instructor,
+        )
+        Course.objects.create(title="Guitarra", description="Acordes básicos", instructor=instructor)
+        cls.admin = User.objects.create_superuser("admin", "admin@lms.test", "x")
+
+    def search(self, url):
+        return [row["id_curso"] for row in self.client.get(url).json()["results"]]
+
+    @skipUnless(connection.vendor == "postgresql", "tsvector de PostgreSQL")
+    def test_triggers_maintain_search_vector(self):
+        query = SearchQuery("violín", config=SEARCH_CONFIG)
+        Course.objects.filter(pk=self.titulo.pk).update(description="Violín para principiantes")
+        Lesson.objects.bulk_create([Lesson(nombre_leccion="Afinar el violín", curso=self.titulo)])
+        matches = Course.objects.filter(search_vector=query).values_list("pk", flat=True)
+        self.assertEqual(list(matches), [self.titulo.pk])
+        self.assertEqual(Lesson.objects.filter(search_vector=query).count(), 1)
+
+    @skipUnless(connection.vendor == "postgresql", "tsvector de PostgreSQL")
+    def test_api_ranks_and_stems(self):
+        # Título (peso A) antes que descripción (B); «programar» encuentra «Programación».
+        self.assertEqual(self.search("/cursos/?search=python"), [self.titulo.pk, self.descripcion.pk])
+        self.assertEqual(self.search("/cursos/?search=programar"), [self.titulo.pk])
+        self.assertEqual(self.search("/cursos/?search=python -pandas"), [self.titulo.pk])
+        self.assertEqual(
+            self.search("/cursos/?search=python&ordering=-created_at"), [self.descripcion.pk, self.titulo.pk]
+        )
+        response = self.client.get("/cursos/?search=python&cursor=&count=true")
+        self.assertEqual(response.json()["count"], 2)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get("/lecciones/?search=python&expand=curso")
+        self.assertTrue(any("@@" in query["sql"] for query in ctx.captured_queries))
+
+    @skipUnless(connection.vendor == "postgresql", "EXPLAIN de PostgreSQL")
+    def test_search_uses_gin_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        self.assertNoSeqScan(full_text_search(Course.objects.all(), "python"), "búsqueda en cursos")
+        self.assertNoSeqScan(full_text_search(Lesson.objects.all(), "python"), "búsqueda en lecciones")
+
+    @skipUnless(connection.vendor == "postgresql", "pg_trgm")
+    def test_trigram_fallback_for_typos(self):
+        if not has_trigram(connection.alias):
+            self.skipTest("el servidor no tiene pg_trgm")
+        self.assertEqual(self.search("/cursos/?search=progamación"), [self.titulo.pk])
+
+    async def test_async_reads(self):
+        # Con LMS_ASYNC_READS el filtro se aplica en el bucle de eventos: no puede consultar la base de datos.
+        has_trigram.cache_clear()
+        with override_settings(ROOT_URLCONF="lms.async_urls"):
+            response = await self.async_client.get("/cursos/?search=python")
+            lessons = await self.async_client.get("/lecciones/?search=python&expand=curso")
+            detail = await self.async_client.get(f"/cursos/{self.titulo.pk}/?search=python")
+        self.assertEqual([row["id_curso"] for row in response.json()["results"]], [self.titulo.pk, self.descripcion.pk])
+        self.assertEqual(lessons.status_code, 200)
+        self.assertEqual(detail.status_code, 200)
+
+    def test_admin_search(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse("admin:lms_course_changelist"), {"q": "python"})
+        self.assertEqual(
+            sorted(course.pk for course in response.context["cl"].result_list), [self.titulo.pk, self.descripcion.pk]
+        )
+        response = self.client.get(reverse("admin:autocomplete"), {
+            "term": "python", "app_label": "lms", "model_name": "lesson", "field_name": "curso",
+        })
+        self.assertEqual(len(response.json()["results"]), 2)
+
+    @skipUnless(connection.vendor != "postgresql", "icontains fuera de PostgreSQL")
+    def test_icontains_outside_postgresql(self):
+        self.assertEqual(self.search("/cursos/?search=pytho"), [self.titulo.pk, self.descripcion.pk])
+
+    @skipUnless(connection.vendor == "postgresql", "tsvector de PostgreSQL")
+    def test_benchmark(self):
+        out = StringIO()
+        call_command("benchmark_search", seed=20, repeat=1, terms=["python"], stdout=out)
+        self.assertIn("CourseViewSet    python", out.getvalue())
+
+
+class AdminPerformanceTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(usuarios=30, cursos=12, lecciones=40, inscripciones=80)
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE lms_usuario, lms_course, lms_lesson, lms_inscripcion")
+        cls.admin = User.objects.create_superuser("admin", "admin@lms.test", "x")
+
+    def changelist(self, model, **params):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse(f"admin:lms_{model._meta.model_name}_changelist"), params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    @skipUnless(connection.vendor == "postgresql", "estadísticas de PostgreSQL")
+    def test_estimated_counts_above_limit(self):
+        with override_settings(LMS_ADMIN_EXACT_COUNT_LIMIT=10), CaptureQueriesContext(connection) as ctx:
+            changelist = self.changelist(Inscripcion).context["cl"]
+        self.assertTrue(changelist.paginator.estimated)
+        self.assertEqual(changelist.result_count, int(estimated_rows(Inscripcion.objects.all())))
+        self.assertIsNone(changelist.full_result_count)
+        self.assertFalse([query["sql"] for query in ctx.captured_queries if "COUNT(" in query["sql"]])
+
+        changelist = self.changelist(Inscripcion, rol="instructor").context["cl"]
+        self.assertFalse(changelist.paginator.estimated)
+        self.assertEqual((changelist.result_count, changelist.full_result_count), (8, 80))
+
+    def test_lesson_curso_filter_loads_only_the_selected_course(self):
+        curso = Course.objects.order_by("id").first()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.changelist(Lesson, curso__id__exact=curso.pk)
+        self.assertFalse([
+            query["sql"] for query in ctx.captured_queries
+            if 'FROM "lms_course"' in query["sql"] and "WHERE" not in query["sql"]
+        ])
+        self.assertEqual({lesson.curso_id for lesson in response.context["cl"].result_list}, {curso.pk})
+        self.assertContains(response, 'data-field-name="curso"')
+        self.assertContains(response, f'<option value="{curso.pk}" selected>{curso}</option>', html=True)
+        self.assertContains(response, "admin/js/autocomplete.js")
+
+    def test_rol_filter_has_fixed_choices(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.changelist(Inscripcion, rol="instructor")
+        self.assertEqual({i.rol for i in response.context["cl"].result_list}, {"instructor"})
+        self.assertFalse([query["sql"] for query in ctx.captured_queries if "DISTINCT" in query["sql"]])
+
+    def test_inscripcion_search_matches_django_search(self):
+        model_admin = site._registry[Inscripcion]
+        for term in ("u3@lms", "Curso 1", '"Curso 1"', "usuario curso 11", "nadie"):
+            expected, _ = admin.ModelAdmin.get_search_results(model_admin, None, Inscripcion.objects.all(), term)
+            changelist = self.changelist(Inscripcion, q=term, all="").context["cl"]
+            self.assertEqual({i.pk for i in changelist.result_list}, set(expected.values_list("pk", flat=True)), term)
+
+
+def image_upload(name, size, image_format="JPEG", mode="RGB", color=(200, 30, 30)):
+    output = io.BytesIO()
+    Image.new(mode, size, color).save(output, image_format)
+    return SimpleUploadedFile(name, output.getvalue(), content_type=f"image/{image_format.lower()}")
+
+
+@override_settings(LMS_API_CACHE_TIMEOUT=0, LMS_AVATAR_WORKERS=0, MEDIA_URL="/media/")
+class AvatarDerivativeTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(usuarios=3, cursos=2, lecciones=0, inscripciones=0)
+        cls.user = User.objects.create_user("admin")
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client.force_authenticate(self.user)
+        self.storage = Course._meta.get_field("avatar").storage
+
+    def upload(self, curso, avatar, execute=True):
+        with self.captureOnCommitCallbacks(execute=execute):
+            response = self.client.patch(f"/cursos/{curso.pk}/", {"avatar": avatar}, format="multipart")
+        self.assertEqual(response.status_code, 200)
+        curso.refresh_from_db()
+
+    def test_upload_generates_derivatives_after_commit(self):
+        curso = Course.objects.order_by("id").first()
+        self.upload(curso, image_upload("grande.jpg", (1200, 800)), execute=False)
+        self.assertEqual(curso.avatar_derivatives, {})  # nada en la petición
+        self.assertFalse(self.storage.exists("course_avatars/derived"))
+
+        self.upload(curso, image_upload("grande.jpg", (1200, 800)))
+        digest, widths = curso.avatar_derivatives["hash"], curso.avatar_derivatives["widths"]
+        self.assertEqual(widths, [128, 256, 512])
+        for width in widths:
+            for extension, image_format in (("webp", "WEBP"), ("jpg", "JPEG")):
+                with self.storage.open(derived_name(digest, width, extension)) as handle, Image.open(handle) as image:
+                    self.assertEqual((image.format, image.size), (image_format, (width, round(width * 2 / 3))))
+
+        sources = self.client.get(f"/cursos/{curso.pk}/").data["avatar_sources"]
+        self.assertEqual(sources["src"], f"http://testserver/media/course_avatars/derived/{digest}-128.jpg")
+        self.assertEqual(sources["webp"], ", ".join(
+            f"http://testserver/media/course_avatars/derived/{digest}-{width}.webp {width}w" for width in widths
+        ))
+        with override_settings(LMS_VALUES_LISTS=False):
+            expected = self.client.get("/cursos/").content
+        self.assertEqual(self.client.get("/cursos/").content, expected)
+
+    def test_derivatives_are_named_by_content(self):
+        first, second = Course.objects.order_by("id")
+        self.upload(first, image_upload("a.jpg", (600, 600)))
+        self.upload(second, image_upload("b.jpg", (600, 600)))
+        self.assertNotEqual(first.avatar.name, second.avatar.name)
+        self.assertEqual(first.avatar_derivatives, second.avatar_derivatives)
+
+        # Otro avatar: los derivados anteriores dejan de servirse en cuanto se guarda.
+        self.upload(first, image_upload("c.jpg", (600, 600), color=(0, 0, 255)), execute=False)
+        self.assertEqual(first.avatar_derivatives, {})
+        self.assertIsNone(self.client.get(f"/cursos/{first.pk}/").data["avatar_sources"])
+
+    def test_small_transparent_png_is_not_upscaled(self):
+        curso = Course.objects.order_by("id").first()
+        self.upload(curso, image_upload("logo.png", (200, 100), "PNG", "RGBA", (0, 0, 0, 0)))
+        digest = curso.avatar_derivatives["hash"]
+        self.assertEqual(curso.avatar_derivatives["widths"], [128, 200])
+        with self.storage.open(derived_name(digest, 200, "webp")) as handle, Image.open(handle) as image:
+            self.assertEqual(image.mode, "RGBA")
+        with self.storage.open(derived_name(digest, 200, "jpg")) as handle, Image.open(handle) as image:
+            self.assertEqual((image.mode, image.getpixel((0, 0))), ("RGB", (255, 255, 255)))
+
+    def test_jpeg_is_decoded_in_draft_mode(self):
+        name = self.storage.save("course_avatars/foto.jpg", image_upload("foto.jpg", (2400, 1600)))
+        with mock.patch.object(JpegImageFile, "draft", autospec=True, side_effect=JpegImageFile.draft) as draft:
+            derivatives = generate_derivatives(self.storage, name)
+        draft.assert_called_once_with(mock.ANY, "RGB", (512, 512))
+        self.assertEqual(derivatives["widths"], [128, 256, 512])
+
+    def test_backfill_command(self):
+        curso = Course.objects.order_by("id").first()
+        name = self.storage.save("course_avatars/viejo.jpg", image_upload("viejo.jpg", (300, 300)))
+        Course.objects.filter(pk=curso.pk).update(avatar=name)  # sin señales, como un import
+        out = StringIO()
+        call_command("backfill_course_avatars", "--workers", "0", stdout=out)
+        self.assertIn("Listo: 1 cursos, 0 con error.", out.getvalue())
+        curso.refresh_from_db()
+        self.assertEqual(curso.avatar_derivatives["widths"], [128, 256, 300])
+        out = StringIO()
+        call_command("backfill_course_avatars", "--workers", "0", stdout=out)
+        self.assertIn("Listo: 0 cursos", out.getvalue())
+
+    def test_pool_runs_outside_the_request_thread(self):
+        threads = []
+        with override_settings(LMS_AVATAR_WORKERS=1), mock.patch("lms.avatars.build_course_avatar") as build:
+            build.side_effect = lambda pk: threads.append(threading.current_thread())
+            get_avatar_pool().submit(7).result()
+        build.assert_called_once_with(7)
+        self.assertNotEqual(threads, [threading.current_thread()])
+
+    def test_course_card_template(self):
+        curso = Course.objects.order_by("id").first()
+        Course.objects.filter(pk=curso.pk).update(
+            avatar="course_avatars/a.jpg", avatar_derivatives={"hash": "abc", "widths": [128, 256]},
+        )
+        curso.refresh_from_db()
+        html = render_to_string(
+            "partials/course_card.html", {"course": curso, "card_timeout": 0, "cache_alias": "default"},
+        )
+        self.assertIn(
+            'srcset="/media/course_avatars/derived/abc-128.webp 128w, /media/course_avatars/derived/abc-256.webp 256w"',
+            html,
+        )
+        self.assertIn('src="/media/course_avatars/derived/abc-128.jpg"', html)
+
+
+def without_csrf_token(content):
+    return re.sub(rb'name="csrfmiddlewaretoken" value="[^"]+"', b"", content)
+
+
+@override_settings(LMS_CATALOGUE_CACHE_TIMEOUT=300, LMS_CATALOGUE_COURSES=10)
+class CatalogueTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(usuarios=10, cursos=12, lecciones=30, inscripciones=40)
+        cls.user = User.objects.create_user("alumno")
+
+    def setUp(self):
+        get_cache().clear()
+
+    def test_one_query_with_instructor_and_counters(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/catalogo/")
+        self.assertEqual(response["X-Cache"], "MISS")
+        courses = response.context["courses"]
+        self.assertEqual(len(courses), 10)
+        self.assertEqual(courses[0], Course.objects.order_by("-created_at", "-id").first())
+        curso = courses[0]
+        self.assertContains(response, curso.instructor.nombre)
+        self.assertContains(response, f"{curso.lesson_count} lecciones · {curso.student_count} estudiantes")
+
+    def test_anonymous_page_cache_is_invalidated_by_course_changes(self):
+        first = self.client.get("/catalogo/")
+        with self.assertNumQueries(0):
+            response = self.client.get("/catalogo/")
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(without_csrf_token(response.content), without_csrf_token(first.content))
+        curso = Course.objects.order_by("-created_at", "-id").first()
+        curso.title = "Renombrado"
+        curso.save()
+        response = self.client.get("/catalogo/")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertContains(response, "Renombrado")
+        Lesson.objects.create(nombre_leccion="Nueva", curso=curso)  # contadores: update() + bump
+        self.assertContains(self.client.get("/catalogo/"), f"{curso.lesson_count + 1} lecciones")
+
+    def test_cached_page_gets_the_visitors_csrf_token(self):
+        self.client.get("/catalogo/")
+        other = self.client_class()
+        response = other.get("/catalogo/")
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertNotIn(CSRF_PLACEHOLDER.encode(), response.content)
+        token = re.search(rb'name="csrfmiddlewaretoken" value="([^"]+)"', response.content)[1].decode()
+        self.assertEqual(_unmask_cipher_token(token), response.cookies["csrftoken"].value)
+
+    def test_cards_are_cached_per_course_for_authenticated_users(self):
+        self.client.force_login(self.user)
+        self.assertNotIn("X-Cache", self.client.get("/catalogo/"))
+        first, second = Course.objects.order_by("-created_at", "-id")[:2]
+        # Sin cambiar updated_at la tarjeta sigue en caché.
+        Course.objects.filter(pk__in=[first.pk, second.pk]).update(title="Sin señal")
+        second.title = "Guardado"
+        second.save()
+        response = self.client.get("/catalogo/")
+        self.assertNotContains(response, "Sin señal")
+        self.assertContains(response, "Guardado")
+        instructor = first.instructor
+        instructor.nombre = "Instructor renombrado"
+        instructor.save()
+        self.assertContains(self.client.get("/catalogo/"), "Instructor renombrado")
+
+    def test_cache_disabled(self):
+        with override_settings(LMS_CATALOGUE_CACHE_TIMEOUT=0):
+            self.client.get("/catalogo/")
+            Course.objects.update(title="Sin señal")
+            response = self.client.get("/catalogo/")
+        self.assertNotIn("X-Cache", response)
+        self.assertContains(response, "Sin señal")
+
+    def test_benchmark(self):
+        out = StringIO()
+        call_command("benchmark_catalogue", requests=3, stdout=out)
+        self.assertIn("página en caché (anónimo)", out.getvalue())
+
+
+@override_settings(LMS_DASHBOARD_CACHE_TIMEOUT=300)
+class DashboardTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alumno, cls.otro = Usuario.objects.bulk_create([
+            Usuario(correo="alumno@lms.test", nombre="Alumno", contrasena="x"),
+            Usuario(correo="otro@lms.test", nombre="Otro", contrasena="x"),
+        ])
+        cls.instructor = Usuario.objects.create(correo="profe@lms.test", nombre="Profe", contrasena="x")
+        cls.cursos = [Course.objects.create(title=f"Curso {i}", instructor=cls.instructor) for i in range(3)]
+        for i, curso in enumerate(cls.cursos):
+            for j in range(i + 1):
+                Lesson.objects.create(nombre_leccion=f"Lección {j}", curso=curso)
+        Inscripcion.objects.create(usuario=cls.alumno, curso=cls.cursos[0], rol="estudiante")
+        Inscripcion.objects.create(usuario=cls.alumno, curso=cls.cursos[1], rol="instructor")
+        Inscripcion.objects.create(usuario=cls.otro, curso=cls.cursos[0], rol="estudiante")
+
+    def setUp(self):
+        get_cache().clear()
+        self.client.force_authenticate(User.objects.create_user("lector"))
+
+    def dashboard(self, usuario):
+        return self.client.get(f"/usuarios/{usuario.pk}/dashboard/")
+
+    def test_one_query_then_cached(self):
+        with self.assertNumQueries(1):
+            response = self.dashboard(self.alumno)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Cache"], "MISS")
+        data = response.json()
+        self.assertEqual(data["nombre"], "Alumno")
+        self.assertEqual(
+            data["resumen"], {"cursos": 2, "como_estudiante": 1, "como_instructor": 1, "lecciones": 3},
+        )
+        cursos = {item["curso"]["id_curso"]: item for item in data["inscripciones"]}
+        self.assertEqual(set(cursos), {self.cursos[0].pk, self.cursos[1].pk})
+        self.assertEqual(cursos[self.cursos[1].pk]["rol"], "instructor")
+        self.assertEqual(cursos[self.cursos[1].pk]["curso"]["instructor"], "Profe")
+        self.assertEqual(cursos[self.cursos[0].pk]["curso"]["student_count"], 2)
+        with self.assertNumQueries(0):
+            cached = self.dashboard(self.alumno)
+        self.assertEqual(cached["X-Cache"], "HIT")
+        self.assertEqual(cached.json(), data)
+
+    def test_own_enrollment_changes_invalidate(self):
+        self.dashboard(self.alumno)
+        inscripcion = Inscripcion.objects.create(usuario=self.alumno, curso=self.cursos[2], rol="estudiante")
+        response = self.dashboard(self.alumno)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()["resumen"]["cursos"], 3)
+        inscripcion.rol = "instructor"
+        inscripcion.save()
+        self.assertEqual(self.dashboard(self.alumno).json()["resumen"]["como_instructor"], 2)
+        inscripcion.delete()
+        self.assertEqual(self.dashboard(self.alumno).json()["resumen"]["cursos"], 2)
+
+    def test_moving_an_enrollment_invalidates_both_users(self):
+        self.dashboard(self.alumno)
+        self.dashboard(self.otro)
+        inscripcion = Inscripcion.objects.get(usuario=self.otro)
+        inscripcion.usuario = self.alumno
+        inscripcion.curso = self.cursos[2]
+        inscripcion.save()
+        self.assertEqual(self.dashboard(self.alumno).json()["resumen"]["cursos"], 3)
+        self.assertEqual(self.dashboard(self.otro).json()["inscripciones"], [])
+
+    def test_other_users_changes_keep_the_cache(self):
+        self.dashboard(self.alumno)
+        Inscripcion.objects.create(usuario=self.otro, curso=self.cursos[1], rol="estudiante")
+        self.assertEqual(self.dashboard(self.alumno)["X-Cache"], "HIT")
+        self.assertEqual(self.dashboard(self.otro).json()["resumen"]["cursos"], 2)
+
+    def test_bulk_writes_and_imports_invalidate(self):
+        self.dashboard(self.alumno)
+        response = self.client.post("/inscripciones/bulk/", [
+            {"usuario_id": self.alumno.pk, "curso_id": self.cursos[2].pk, "rol": "estudiante"},
+        ], format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.dashboard(self.alumno).json()["resumen"]["cursos"], 3)
+        self.dashboard(self.otro)
+        bump_dashboards()  # lo que hace import_lms tras cargar inscripciones
+        self.assertEqual(self.dashboard(self.alumno)["X-Cache"], "MISS")
+        self.assertEqual(self.dashboard(self.otro)["X-Cache"], "MISS")
+
+    def test_user_without_enrollments(self):
+        data = self.dashboard(self.instructor).json()
+        self.assertEqual(data["inscripciones"], [])
+        self.assertEqual(data["resumen"], {"cursos": 0, "como_estudiante": 0, "como_instructor": 0, "lecciones": 0})
+
+    def test_not_found_and_authentication(self):
+        self.assertEqual(self.client.get("/usuarios/0/dashboard/").status_code, 404)
+        self.assertEqual(self.client.get("/usuarios/x/dashboard/").status_code, 404)
+        self.client.force_authenticate(None)
+        self.assertIn(self.dashboard(self.alumno).status_code, (401, 403))
+
+    def test_cached_from_replicas_for_the_max_lag(self):
+        cache = get_cache()
+        with override_settings(DATABASE_REPLICAS=["default"], REPLICA_MAX_LAG=2.5), \
+                mock.patch("project.db.router.choose_replica", return_value="default") as choose_replica, \
+                mock.patch.object(cache, "set", wraps=cache.set) as cache_set:
+            self.assertEqual(self.dashboard(self.alumno)["X-Cache"], "MISS")
+        choose_replica.assert_called_once_with()
+        self.assertEqual([call.args[2] for call in cache_set.call_args_list if "dashboard" in call.args[0]], [3])
+
+    def test_cache_disabled(self):
+        with override_settings(LMS_DASHBOARD_CACHE_TIMEOUT=0):
+            self.dashboard(self.alumno)
+            Inscripcion.objects.filter(usuario=self.alumno).update(rol="instructor")
+            response = self.dashboard(self.alumno)
+        self.assertNotIn("X-Cache", response)
+        self.assertEqual(response.json()["resumen"]["como_instructor"], 2)
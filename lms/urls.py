@@ -1,4 +1,6 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
+from .catalogue import catalogue
 from .views import (
     UsuarioViewSet,
     CourseViewSet,
@@ -12,4 +14,7 @@ router.register(r'cursos', CourseViewSet, basename='cursos')
 router.register(r'lecciones', LessonViewSet, basename='lecciones')
 router.register(r'inscripciones', InscripcionViewSet, basename='inscripciones')
 
-urlpatterns = router.urls
+urlpatterns = [
+    # Portada HTML del catálogo; la raíz "/" es la del API (DefaultRouter).
+    path('catalogo/', catalogue, name='catalogue'),
+] + router.urls
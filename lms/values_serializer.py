@@ -0,0 +1,260 @@
+"""
+Serialización de listados desde ``values_list()``.
+
+En un listado, un ``ModelSerializer`` construye una instancia de modelo por
+fila y, por cada campo, recorre ``get_attribute`` / ``to_representation``;
+con ``InscripcionSerializer`` expandido son tres niveles por fila.
+``compile_values_serializer`` recorre una vez el serializer (con sus
+``?fields=`` / ``?expand=``) y calcula qué columnas pedir a
+``values_list()`` y cómo pasar cada tupla al mismo diccionario que daría
+DRF: enteros y cadenas tal cual, el resto con el ``to_representation`` del
+campo ya construido, y los ficheros con la URL de su storage. Cada nivel
+se compila a una sola expresión ``lambda row: {...}`` y cada objeto anidado
+se construye una vez por respuesta, aunque aparezca en muchas filas.
+
+Si el serializer tiene un campo que no se puede leer de una columna
+(``SerializerMethodField``, propiedades, relaciones a muchos...),
+``compile_values_serializer`` devuelve ``None`` y la vista usa el serializer
+de siempre. ``ValuesListMixin`` aplica este camino a ``list`` (y ``alist``);
+se desactiva con ``LMS_VALUES_LISTS = False``.
+"""
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.settings import ISO_8601, api_settings
+
+from .sparse_fields import sparse_options
+
+
+def enabled():
+    return getattr(settings, "LMS_VALUES_LISTS", True)
+
+
+class Unsupported(Exception):
+    """El campo no sale directamente de una columna."""
+
+
+def _model_field(model, field):
+    attrs = field.source_attrs
+    if field.source == "*" or len(attrs) != 1:
+        raise Unsupported(field.field_name)
+    try:
+        return model._meta.get_field(attrs[0])
+    except FieldDoesNotExist:
+        raise Unsupported(field.field_name)
+
+
+def _is_identity(field, model_field):
+    # CharField.to_representation es str() e IntegerField int(): las columnas ya lo son.
+    if type(field).to_representation is serializers.CharField.to_representation:
+        return isinstance(model_field, (models.CharField, models.TextField))
+    if type(field).to_representation is serializers.IntegerField.to_representation:
+        return isinstance(model_field, (models.IntegerField, models.AutoField))
+    return False
+
+
+class _Level:
+    """Campos de un serializer (raíz o anidado): ``(nombre, tipo, índice, dato)``."""
+
+    def __init__(self, steps, key=None):
+        self.steps = steps
+        self.key = key  # índice del pk en los anidados
+
+    def bind(self, request):
+        """Función ``fila -> dict`` para esta petición, compilada como una sola expresión."""
+        namespace, items = {}, []
+        for position, (name, kind, index, data) in enumerate(self.steps):
+            if kind == "value":
+                items.append(f"{name!r}: row[{index}]")
+                continue
+            if kind == "convert":
+                namespace[f"get{position}"] = _converter(index, data)
+            elif kind == "datetime":
+                namespace[f"get{position}"] = _datetime_converter(index, data)
+            elif kind == "file":
+                namespace[f"get{position}"] = _file_converter(index, *data, request)
+            elif kind == "request":
+                namespace[f"get{position}"] = _converter(index, data.bind_request(request))
+            else:
+                namespace[f"get{position}"] = data.bind(request)
+            items.append(f"{name!r}: get{position}(row)")
+        build = eval("lambda row: {" + ", ".join(items) + "}", namespace)
+        if self.key is None:
+            return build
+        # Un mismo curso o usuario se repite en muchas filas de la página: se
+        # construye una vez por respuesta y las filas comparten el dict.
+        key, built = self.key, {}
+
+        def nested(row):
+            pk = row[key]
+            if pk is None:
+                return None
+            try:
+                return built[pk]
+            except KeyError:
+                value = built[pk] = build(row)
+                return value
+        return nested
+
+
+def _converter(index, convert):
+    def get(row):
+        value = row[index]
+        return None if value is None else convert(value)
+    return get
+
+
+def _datetime_converter(index, field):
+    # DateTimeField.to_representation de DRF con la zona horaria resuelta una vez
+    # por petición (default_timezone() consulta la zona activa en cada llamada).
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return _converter(index, field.to_representation)
+    field_timezone = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+
+    def get(row):
+        value = row[index]
+        if not value or isinstance(value, str):
+            return value or None
+        if field_timezone is None or value.utcoffset() is None:
+            value = field.enforce_timezone(value)
+        else:
+            value = value.astimezone(field_timezone)
+        value = value.isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+    return get
+
+
+def _file_converter(index, storage, use_url, request):
+    # FileField.to_representation de DRF sobre el nombre guardado en la columna.
+    def get(row):
+        name = row[index]
+        if not name:
+            return None
+        if not use_url:
+            return name
+        url = storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+    return get
+
+
+class ValuesSerializer:
+    """Columnas de ``values_list()`` y conversión de cada fila al dict de DRF."""
+
+    def __init__(self, paths, level):
+        self.paths = tuple(paths)
+        self.level = level
+
+    def queryset(self, queryset):
+        return queryset.values_list(*self.paths, named=True)
+
+    def serialize(self, rows, request=None):
+        build = self.level.bind(request)
+        return [build(row) for row in rows]
+
+    def __repr__(self):
+        return f"<ValuesSerializer {list(self.paths)}>"
+
+
+def _compile(serializer, model, prefix, paths, key=None):
+    def column(path):
+        if path not in paths:
+            paths.append(path)
+        return paths.index(path)
+
+    steps = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        model_field = _model_field(model, field)
+        if isinstance(field, serializers.BaseSerializer):
+            if not (isinstance(field, serializers.ModelSerializer) and model_field.many_to_one):
+                raise Unsupported(name)
+            related = model_field.related_model
+            path = prefix + model_field.name + "__"
+            nested_key = column(path + related._meta.pk.attname)
+            steps.append((name, "nested", None, _compile(field, related, path, paths, nested_key)))
+        elif model_field.is_relation:
+            is_pk = isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None
+            if not (is_pk and model_field.many_to_one):
+                raise Unsupported(name)
+            steps.append((name, "value", column(prefix + model_field.attname), None))
+        elif not model_field.concrete:
+            raise Unsupported(name)
+        elif hasattr(field, "bind_request"):
+            # Conversión que depende de la petición (URLs absolutas), preparada una vez por respuesta.
+            steps.append((name, "request", column(prefix + model_field.attname), field))
+        elif isinstance(field, serializers.FileField):
+            use_url = getattr(field, "use_url", api_settings.UPLOADED_FILES_USE_URL)
+            steps.append((name, "file", column(prefix + model_field.attname), (model_field.storage, use_url)))
+        elif isinstance(field, serializers.RelatedField):
+            raise Unsupported(name)
+        elif type(field).to_representation is serializers.DateTimeField.to_representation:
+            steps.append((name, "datetime", column(prefix + model_field.attname), field))
+        elif _is_identity(field, model_field):
+            steps.append((name, "value", column(prefix + model_field.attname), None))
+        else:
+            steps.append((name, "convert", column(prefix + model_field.attname), field.to_representation))
+    return _Level(steps, key)
+
+
+@lru_cache(maxsize=1024)
+def compile_values_serializer(serializer_class, fields=(), expand=()):
+    """
+    ``ValuesSerializer`` de un ``ModelSerializer`` (con ``fields`` /
+    ``expand``), o ``None`` si alguno de sus campos no sale de una columna.
+    """
+    serializer = serializer_class(fields=fields, expand=expand) if fields or expand else serializer_class()
+    paths = []
+    try:
+        level = _compile(serializer, serializer_class.Meta.model, "", paths)
+    except Unsupported:
+        return None
+    return ValuesSerializer(paths, level)
+
+
+class ValuesListMixin:
+    """``list`` / ``alist`` serializados desde ``values_list()`` cuando el serializer lo permite."""
+
+    values = None
+
+    def values_serializer(self):
+        if not enabled():
+            return None
+        return compile_values_serializer(self.get_serializer_class(), *sparse_options(self.request))
+
+    def page_rows(self, queryset):
+        """El paginador cuenta y corta el queryset de modelos; sólo la página se lee con values_list()."""
+        return queryset if self.values is None else self.values.queryset(queryset)
+
+    def list(self, request, *args, **kwargs):
+        self.values = self.values_serializer()
+        if self.values is None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.values.serialize(page, request))
+        return Response(self.values.serialize(self.page_rows(queryset), request))
+
+    async def alist(self, request, *args, **kwargs):
+        self.values = self.values_serializer()
+        if self.values is None:
+            return await super().alist(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            return await sync_to_async(self._values_page)(page)
+        rows = [row async for row in self.page_rows(queryset).aiterator(chunk_size=2000)]
+        return await sync_to_async(self._values_response)(rows)
+
+    def _values_page(self, page):
+        return self.get_paginated_response(self.values.serialize(page, self.request))
+
+    def _values_response(self, rows):
+        return Response(self.values.serialize(rows, self.request))
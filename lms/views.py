@@ -1,28 +1,90 @@
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
+from .async_views import AsyncReadMixin
+from .bulk import BulkMixin
+from .conditional import ConditionalMixin
+from .dashboard import DashboardMixin
+from .export import ExportMixin
+from .eager_loading import build_query_plan
 from .models import Usuario, Course, Lesson, Inscripcion
+from .replicas import ReplicaReadsMixin
+from .response_cache import CachedResponseMixin
+from .sparse_fields import sparse_options
 from .serializers import UsuarioSerializer, CourseSerializer, LessonSerializer, InscripcionSerializer
+from .values_serializer import ValuesListMixin
 
 
-class UsuarioViewSet(viewsets.ModelViewSet):
+class EagerLoadingMixin:
+    """Aplica al queryset el plan de carga derivado del serializer."""
+
+    def query_plan(self):
+        """Plan de la respuesta a esta petición (con sus ``?fields=`` / ``?expand=``)."""
+        return build_query_plan(self.get_serializer_class(), *sparse_options(getattr(self, "request", None)))
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = getattr(self, "request", None)
+        if request is None or request.method not in ("PUT", "PATCH"):
+            return self.query_plan().apply(queryset)
+        # Al modificar, los validadores de unicidad leen esas relaciones de la instancia.
+        fields, expand = sparse_options(request)
+        expand = tuple(sorted({*expand, *_unique_relations(queryset.model)}))
+        return build_query_plan(self.get_serializer_class(), fields, expand).apply(queryset)
+
+
+def _unique_relations(model):
+    names = {name for constraint in model._meta.total_unique_constraints for name in constraint.fields}
+    names.update(name for fields in model._meta.unique_together for name in fields)
+    return {name for name in names if model._meta.get_field(name).is_relation}
+
+
+class UsuarioViewSet(
+    ReplicaReadsMixin, ExportMixin, DashboardMixin, ConditionalMixin, CachedResponseMixin,
+    ValuesListMixin, AsyncReadMixin, EagerLoadingMixin, viewsets.ModelViewSet,
+):
     queryset = Usuario.objects.all().order_by('id')
     serializer_class = UsuarioSerializer
+    keyset_ordering = ('created_at', 'id')
+    export_fields = ('id', 'correo', 'nombre', 'created_at', 'updated_at')
     permission_classes = [IsAuthenticatedOrReadOnly]
 
 
-class CourseViewSet(viewsets.ModelViewSet):
-    queryset = Course.objects.all()
+class CourseViewSet(
+    ReplicaReadsMixin, ExportMixin, ConditionalMixin, CachedResponseMixin,
+    ValuesListMixin, AsyncReadMixin, EagerLoadingMixin, viewsets.ModelViewSet,
+):
+    queryset = Course.objects.all().order_by('created_at', 'id')
     serializer_class = CourseSerializer
+    keyset_ordering = ('created_at', 'id')
+    # ?search=: texto completo en PostgreSQL (lms.search); icontains en el resto.
+    search_fields = ('title', 'description')
+    export_fields = (
+        'id', 'title', 'description', 'instructor_id', 'instructor__correo', 'instructor__nombre', 'avatar',
+        'lesson_count', 'enrollment_count', 'student_count', 'instructor_count', 'created_at', 'updated_at',
+    )
     permission_classes = [IsAuthenticatedOrReadOnly]
 
 
-class LessonViewSet(viewsets.ModelViewSet):
-    queryset = Lesson.objects.all()
+class LessonViewSet(
+    ReplicaReadsMixin, BulkMixin, ConditionalMixin, CachedResponseMixin,
+    ValuesListMixin, AsyncReadMixin, EagerLoadingMixin, viewsets.ModelViewSet,
+):
+    queryset = Lesson.objects.all().order_by('created_at', 'id')
     serializer_class = LessonSerializer
+    keyset_ordering = ('created_at', 'id')
+    search_fields = ('nombre_leccion',)
     permission_classes = [IsAuthenticatedOrReadOnly]
 
 
-class InscripcionViewSet(viewsets.ModelViewSet):
-    queryset = Inscripcion.objects.all()
+class InscripcionViewSet(
+    ReplicaReadsMixin, ExportMixin, BulkMixin, ConditionalMixin, ValuesListMixin, EagerLoadingMixin,
+    viewsets.ModelViewSet,
+):
+    queryset = Inscripcion.objects.all().order_by('fecha_inscripcion', 'id')
     serializer_class = InscripcionSerializer
+    keyset_ordering = ('fecha_inscripcion', 'id')
+    export_fields = (
+        'id', 'usuario_id', 'usuario__correo', 'usuario__nombre', 'curso_id', 'curso__title',
+        'fecha_inscripcion', 'rol', 'updated_at',
+    )
     permission_classes = [IsAuthenticated]  # cambia a IsAuthenticatedOrReadOnly si quieres demo abierta
@@ -0,0 +1,70 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from polls.models import Question, Choice
+from polls.votes import get_vote_buffer
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide votos por segundo sostenidos contra polls:vote con muchos clientes "
+        "concurrentes. Escribe en la base de datos configurada (crea y borra una encuesta)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=32)
+        parser.add_argument("--duration", type=float, default=10.0, help="Segundos de carga.")
+        parser.add_argument("--choices", type=int, default=4)
+        parser.add_argument(
+            "--mode", choices=("buffered", "direct"), default="buffered",
+            help="direct escribe cada voto en la petición (POLLS_VOTE_FLUSH_INTERVAL=0).",
+        )
+
+    def handle(self, *args, clients, duration, choices, mode, **options):
+        question = Question.objects.create(question_text="benchmark_votes", pub_date=timezone.now())
+        opciones = Choice.objects.bulk_create(
+            Choice(question=question, choice_text=f"Opción {i}") for i in range(choices)
+        )
+        url = reverse("polls:vote", args=(question.pk,))
+        sent = [0] * clients
+        deadline = time.perf_counter() + duration
+
+        def client(index):
+            http = Client(HTTP_HOST="localhost")
+            try:
+                while time.perf_counter() < deadline:
+                    choice = opciones[(index + sent[index]) % len(opciones)]
+                    response = http.post(url, {"choice": choice.pk})
+                    if response.status_code == 302:
+                        sent[index] += 1
+            finally:
+                connection.close()
+
+        interval = 0 if mode == "direct" else get_vote_buffer().flush_interval
+        try:
+            with override_settings(POLLS_VOTE_FLUSH_INTERVAL=interval):
+                threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+                started = time.perf_counter()
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                elapsed = time.perf_counter() - started
+                get_vote_buffer().stop()
+            stored = sum(Choice.objects.filter(question=question).values_list("votes", flat=True))
+        finally:
+            question.delete()
+
+        total = sum(sent)
+        self.stdout.write(
+            f"{mode}: {clients} clientes, {total} votos en {elapsed:.1f}s "
+            f"-> {total / elapsed:,.0f} votos/s; guardados {stored}"
+        )
+        if stored != total:
+            self.stderr.write(self.style.ERROR(f"Se perdieron {total - stored} votos"))
@@ -0,0 +1,106 @@
+"""
+Resultados de encuestas servidos desde caché.
+
+Por pregunta se guarda en la caché de Django un bloque ``meta`` (texto de
+la pregunta y de sus opciones, instante de cálculo) y un contador por
+opción. El buffer de votos incrementa esos contadores con ``cache.incr`` al
+volcar, así que leer resultados no toca la tabla ``Choice``. Pasados
+``POLLS_RESULTS_MAX_AGE`` segundos el agregado se recalcula desde la base de
+datos (un solo proceso a la vez; el resto sigue sirviendo el anterior).
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import Http404
+
+from .models import Question, Choice
+
+META_KEY = "polls:results:{question_id}"
+LOCK_KEY = "polls:results:{question_id}:lock"
+VOTES_KEY = "polls:votes:{choice_id}"
+
+
+def max_age():
+    return getattr(settings, "POLLS_RESULTS_MAX_AGE", 30)
+
+
+def rebuild(question_id):
+    """Recalcula el agregado desde la base de datos y lo deja en caché."""
+    question = Question.objects.filter(pk=question_id).values_list("question_text", flat=True).first()
+    if question is None:
+        raise Http404("Question does not exist")
+    choices = list(
+        Choice.objects.filter(question_id=question_id).order_by("id").values_list("id", "choice_text", "votes")
+    )
+    meta = {"question_text": question, "choices": [(pk, text) for pk, text, _ in choices], "at": time.time()}
+    # Sin caducidad en caché: la antigüedad la controla ``at``, así un
+    # agregado vencido se puede seguir sirviendo mientras otro lo recalcula.
+    cache.set_many({VOTES_KEY.format(choice_id=pk): votes for pk, _, votes in choices}, None)
+    cache.set(META_KEY.format(question_id=question_id), meta, None)
+    return meta, {pk: votes for pk, _, votes in choices}
+
+
+def _cached(question_id):
+    meta = cache.get(META_KEY.format(question_id=question_id))
+    if meta is None:
+        return None, None
+    keys = {VOTES_KEY.format(choice_id=pk): pk for pk, _ in meta["choices"]}
+    found = cache.get_many(keys)
+    if len(found) != len(keys):
+        return None, None
+    return meta, {keys[key]: votes for key, votes in found.items()}
+
+
+def get_results(question_id):
+    meta, votes = _cached(question_id)
+    if meta is None:
+        meta, votes = rebuild(question_id)
+    elif time.time() - meta["at"] > max_age():
+        lock = LOCK_KEY.format(question_id=question_id)
+        if cache.add(lock, True, timeout=max(max_age(), 1)):
+            try:
+                meta, votes = rebuild(question_id)
+            finally:
+                cache.delete(lock)
+
+    total = sum(votes.values())
+    return {
+        "id": question_id,
+        "question_text": meta["question_text"],
+        "total_votes": total,
+        "choices": [
+            {
+                "id": pk,
+                "choice_text": text,
+                "votes": votes[pk],
+                "percentage": round(votes[pk] * 100 / total, 1) if total else 0.0,
+            }
+            for pk, text in meta["choices"]
+        ],
+    }
+
+
+def record_votes(batch):
+    """Suma a los contadores en caché los votos ya escritos en la base de datos."""
+    for choice_id, votes in batch.items():
+        try:
+            cache.incr(VOTES_KEY.format(choice_id=choice_id), votes)
+        except ValueError:
+            pass  # No está en caché: la próxima lectura lo recalcula.
+
+
+def invalidate(question_id):
+    cache.delete(META_KEY.format(question_id=question_id))
+
+
+@receiver([post_save, post_delete], sender=Question)
+def invalidate_question(sender, instance, **kwargs):
+    invalidate(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Choice)
+def invalidate_choice(sender, instance, **kwargs):
+    invalidate(instance.question_id)
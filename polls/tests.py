@@ -1,3 +1,186 @@
-from django.test import TestCase
+import datetime
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from project.testing import QueryAuditMixin
+from .models import Question, Choice
+from .votes import VoteBuffer
+
+
+def seed(questions=30, choices=4):
+    now = timezone.now()
+    preguntas = Question.objects.bulk_create(
+        Question(question_text=f"Pregunta {i}", pub_date=now - datetime.timedelta(hours=i))
+        for i in range(questions)
+    )
+    Choice.objects.bulk_create(
+        Choice(question=q, choice_text=f"Opción {j}", votes=j) for q in preguntas for j in range(choices)
+    )
+    return preguntas
+
+
+QUESTION = "polls_question.id, polls_question.question_text, polls_question.pub_date"
+CHOICE = "polls_choice.id, polls_choice.question_id, polls_choice.choice_text, polls_choice.votes"
+
+
+class ViewQueryRegressionTests(QueryAuditMixin, TestCase):
+    """Número, forma y filas de las consultas de cada vista de ``polls``."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.question = seed()[0]
+
+    def setUp(self):
+        cache.clear()
+
+    def check(self, url, status, expected, rows, method="get", **kwargs):
+        audit = self.audit(method, url, **kwargs)
+        self.assertEqual(audit.response.status_code, status, url)
+        self.assertQueryShapes(audit, expected, rows, msg=url)
+
+    def test_index(self):
+        self.check("/polls/", 200, [
+            f"SELECT {QUESTION} FROM polls_question ORDER BY polls_question.pub_date DESC LIMIT ?",
+        ], {"Question": 5})
+
+    def test_detail(self):
+        self.check(f"/polls/{self.question.pk}/", 200, [
+            f"SELECT {QUESTION} FROM polls_question WHERE polls_question.id = ? LIMIT ?",
+            f"SELECT {CHOICE} FROM polls_choice WHERE polls_choice.question_id = ?",
+        ], {"Question": 1, "Choice": 4})
+
+    def test_detail_missing_question(self):
+        self.check("/polls/0/", 404, [
+            f"SELECT {QUESTION} FROM polls_question WHERE polls_question.id = ? LIMIT ?",
+        ], {})
+
+    def test_results(self):
+        self.check(f"/polls/{self.question.pk}/results/", 200, [
+            "SELECT polls_question.question_text AS question_text FROM polls_question "
+            "WHERE polls_question.id = ? ORDER BY polls_question.id ASC LIMIT ?",
+            "SELECT polls_choice.id AS id, polls_choice.choice_text AS choice_text, polls_choice.votes AS votes "
+            "FROM polls_choice WHERE polls_choice.question_id = ? ORDER BY ? ASC",
+        ], {})
+        self.check(f"/polls/{self.question.pk}/results/", 200, [], {})
+        self.check(f"/polls/{self.question.pk}/results.json", 200, [], {})
+
+    @override_settings(POLLS_VOTE_FLUSH_INTERVAL=0)
+    def test_vote(self):
+        choice = self.question.choice_set.first()
+        self.check(f"/polls/{self.question.pk}/vote/", 302, [
+            "SELECT ? AS a FROM polls_choice WHERE (polls_choice.id = ? AND polls_choice.question_id = ?) LIMIT ?",
+            "SAVEPOINT ?",
+            "UPDATE polls_choice SET votes = (polls_choice.votes + ?) WHERE polls_choice.id = ?",
+            "RELEASE SAVEPOINT ?",
+        ], {}, method="post", data={"choice": choice.pk})
+
+    @override_settings(POLLS_VOTE_FLUSH_INTERVAL=60)
+    def test_buffered_vote_does_not_write(self):
+        choice = self.question.choice_set.first()
+        self.check(f"/polls/{self.question.pk}/vote/", 302, [
+            "SELECT ? AS a FROM polls_choice WHERE (polls_choice.id = ? AND polls_choice.question_id = ?) LIMIT ?",
+        ], {}, method="post", data={"choice": choice.pk})
+
+
+class VoteBufferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.question = seed(questions=2, choices=3)[0]
+        cls.choices = list(cls.question.choice_set.order_by("id"))
+
+    def votes(self):
+        return [c.votes for c in Choice.objects.filter(question=self.question).order_by("id")]
+
+    def test_coalesces_one_update_per_choice(self):
+        buffer = VoteBuffer(flush_interval=3600, flush_size=10_000)
+        for i in range(300):
+            buffer.add(self.choices[i % 2].pk)
+        self.assertEqual(self.votes(), [0, 1, 2])
+        with self.assertNumQueries(4):  # SAVEPOINT, 2 UPDATE, RELEASE
+            self.assertEqual(buffer.flush(), 300)
+        self.assertEqual(self.votes(), [150, 151, 2])
+        self.assertEqual(buffer.flush(), 0)
+        buffer.stop()
+
+    def test_concurrent_adds_are_not_lost(self):
+        buffer = VoteBuffer(flush_interval=3600, flush_size=10_000)
+
+        def voter():
+            for _ in range(1000):
+                buffer.add(self.choices[2].pk)
+
+        threads = [threading.Thread(target=voter) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(buffer.pending_total, 8000)
+        buffer.flush()
+        self.assertEqual(self.votes(), [0, 1, 8002])
+        buffer.stop()
+
+    def test_size_limit_applies_back_pressure(self):
+        buffer = VoteBuffer(flush_interval=3600, flush_size=5)
+        buffer._thread = threading.current_thread()  # sin volcador en segundo plano
+        for _ in range(10):
+            buffer.add(self.choices[0].pk)
+        self.assertEqual(buffer.pending_total, 0)
+        self.assertEqual(self.votes(), [10, 1, 2])
+        buffer._thread = None
+
+    def test_vote_view_validates_choice(self):
+        other = Question.objects.exclude(pk=self.question.pk).get().choice_set.first()
+        response = self.client.post(f"/polls/{self.question.pk}/vote/", {"choice": other.pk})
+        self.assertContains(response, "You didn&#x27;t select a choice.")
+        self.assertEqual(self.client.post("/polls/0/vote/", {"choice": other.pk}).status_code, 404)
+        self.assertEqual(self.client.get(f"/polls/{self.question.pk}/vote/").status_code, 405)
+
+
+class ResultsCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.question = seed(questions=1, choices=3)[0]
+        cls.choices = list(cls.question.choice_set.order_by("id"))
+
+    def setUp(self):
+        cache.clear()
+
+    def totals(self):
+        return [c["votes"] for c in self.client.get(f"/polls/{self.question.pk}/results.json").json()["choices"]]
+
+    def test_json_payload(self):
+        data = self.client.get(f"/polls/{self.question.pk}/results.json").json()
+        self.assertEqual(data["total_votes"], 3)
+        self.assertEqual(
+            [(c["choice_text"], c["votes"], c["percentage"]) for c in data["choices"]],
+            [("Opción 0", 0, 0.0), ("Opción 1", 1, 33.3), ("Opción 2", 2, 66.7)],
+        )
+        self.assertEqual(self.client.get("/polls/0/results.json").status_code, 404)
+
+    def test_flushed_votes_update_the_cached_aggregate(self):
+        self.assertEqual(self.totals(), [0, 1, 2])
+        buffer = VoteBuffer(flush_interval=3600)
+        buffer.add(self.choices[0].pk, 5)
+        buffer.add(self.choices[2].pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            buffer.flush()
+        buffer.stop()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.totals(), [5, 1, 3])
+
+    @override_settings(POLLS_RESULTS_MAX_AGE=10)
+    def test_stale_aggregate_is_rebuilt(self):
+        self.assertEqual(self.totals(), [0, 1, 2])
+        Choice.objects.filter(pk=self.choices[0].pk).update(votes=40)
+        self.assertEqual(self.totals(), [0, 1, 2])
+        with mock.patch("polls.results.time.time", return_value=__import__("time").time() + 11):
+            self.assertEqual(self.totals(), [40, 1, 2])
+
+    def test_choice_changes_invalidate(self):
+        self.assertEqual(self.totals(), [0, 1, 2])
+        Choice.objects.create(question=self.question, choice_text="Nueva", votes=7)
+        self.assertEqual(self.totals(), [0, 1, 2, 7])
@@ -7,5 +7,6 @@ urlpatterns = [
     path("", views.index, name="index"),
     path("<int:question_id>/", views.detail, name="detail"),
     path("<int:question_id>/results/", views.results, name="results"),
+    path("<int:question_id>/results.json", views.results_json, name="results_json"),
     path("<int:question_id>/vote/", views.vote, name="vote"),
 ]
@@ -1,9 +1,13 @@
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
 from django.template import loader
 from django.http import Http404
 from django.shortcuts import render
+from django.urls import reverse
+from django.views.decorators.http import require_POST
 
-from .models import Question
+from .models import Question, Choice
+from .results import get_results
+from .votes import get_vote_buffer
 
 
 def index(request):
@@ -22,9 +26,26 @@ def detail(request, question_id):
 
 
 def results(request, question_id):
-    response = "You're looking at the results of question %s."
-    return HttpResponse(response % question_id)
+    return render(request, "polls/results.html", {"results": get_results(question_id)})
 
 
+def results_json(request, question_id):
+    return JsonResponse(get_results(question_id))
+
+
+@require_POST
 def vote(request, question_id):
-    return HttpResponse("You're voting on question %s." % question_id)
+    choice_id = request.POST.get("choice", "")
+    # Una sola consulta ligera: el voto en sí se escribe en diferido.
+    valid = choice_id.isdigit() and Choice.objects.filter(pk=choice_id, question_id=question_id).exists()
+    if not valid:
+        try:
+            question = Question.objects.get(pk=question_id)
+        except Question.DoesNotExist:
+            raise Http404("Question does not exist")
+        return render(request, "polls/detail.html", {
+            "question": question,
+            "error_message": "You didn't select a choice.",
+        })
+    get_vote_buffer().add(int(choice_id))
+    return HttpResponseRedirect(reverse("polls:results", args=(question_id,)))
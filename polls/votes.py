@@ -0,0 +1,143 @@
+"""
+Buffer de escritura diferida para los votos de ``polls``.
+
+Los votos se acumulan en memoria por ``Choice`` y se vuelcan con un
+``UPDATE ... SET votes = votes + n`` por opción, cada
+``POLLS_VOTE_FLUSH_INTERVAL`` segundos o en cuanto hay
+``POLLS_VOTE_FLUSH_SIZE`` votos pendientes. Si el proceso muere se pierde
+como mucho esa ventana. Con ``POLLS_VOTE_FLUSH_INTERVAL = 0`` cada voto se
+escribe dentro de la petición.
+"""
+import atexit
+import logging
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.dispatch import receiver
+
+from .models import Choice
+from .results import record_votes
+
+logger = logging.getLogger(__name__)
+
+
+class VoteBuffer:
+    def __init__(self, flush_interval=1.0, flush_size=500):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.pending = Counter()
+        self.pending_total = 0
+        self.flushed_total = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def add(self, choice_id, votes=1):
+        if self.flush_interval <= 0:
+            self._write({choice_id: votes})
+            return
+        with self._lock:
+            self.pending[choice_id] += votes
+            self.pending_total += votes
+            full = self.pending_total >= self.flush_size
+            if self._thread is None:
+                self._start()
+        if full:
+            if self.pending_total >= self.flush_size * 2:
+                # El volcador no da abasto: la petición espera (contrapresión).
+                self.flush()
+            else:
+                self._wakeup.set()
+
+    def take(self):
+        with self._lock:
+            batch, self.pending = self.pending, Counter()
+            self.pending_total = 0
+        return batch
+
+    def flush(self):
+        """Vuelca lo pendiente; devuelve el número de votos escritos."""
+        with self._flush_lock:
+            batch = self.take()
+            if not batch:
+                return 0
+            try:
+                self._write(batch)
+            except Exception:
+                logger.exception("No se pudieron volcar %d votos; se reintentará", sum(batch.values()))
+                with self._lock:
+                    self.pending.update(batch)
+                    self.pending_total += sum(batch.values())
+                return 0
+            written = sum(batch.values())
+            self.flushed_total += written
+            return written
+
+    def _write(self, batch):
+        # Orden fijo de filas para que dos procesos no se bloqueen mutuamente.
+        with transaction.atomic():
+            for choice_id in sorted(batch):
+                Choice.objects.filter(pk=choice_id).update(votes=F("votes") + batch[choice_id])
+            transaction.on_commit(lambda: record_votes(batch))
+
+    def _start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="polls-vote-flusher", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            while True:
+                self._wakeup.wait(self.flush_interval)
+                self._wakeup.clear()
+                if self._stopped.is_set():
+                    break  # stop() hace el último volcado desde su hilo
+                close_old_connections()
+                self.flush()
+        finally:
+            connection.close()
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_vote_buffer():
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = VoteBuffer(
+                flush_interval=getattr(settings, "POLLS_VOTE_FLUSH_INTERVAL", 1.0),
+                flush_size=getattr(settings, "POLLS_VOTE_FLUSH_SIZE", 500),
+            )
+        return _buffer
+
+
+@receiver(setting_changed)
+def reset_vote_buffer(setting, **kwargs):
+    global _buffer
+    if setting in ("POLLS_VOTE_FLUSH_INTERVAL", "POLLS_VOTE_FLUSH_SIZE"):
+        with _buffer_lock:
+            old, _buffer = _buffer, None
+        if old is not None:
+            old.stop()
+
+
+@atexit.register
+def _flush_on_exit():
+    if _buffer is not None:
+        _buffer.stop()
@@ -12,5 +12,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings')
+# Lecturas del API del LMS con vistas asíncronas (lms/async_views.py).
+os.environ.setdefault('LMS_ASYNC_READS', '1')
 
-application = get_asgi_application()
+from project.static import StaticFilesASGI  # noqa: E402
+
+application = StaticFilesASGI(get_asgi_application())
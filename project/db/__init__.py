@@ -0,0 +1,17 @@
+"""
+Backend de PostgreSQL para ``DATABASES['default']`` (``ENGINE = 'project.db'``).
+
+Es el de Django con una medida más: cuánto tarda cada conexión en estar
+lista, ya sea abrirla (conexión TCP y autenticación) o sacarla del pool de
+psycopg 3 (``OPTIONS['pool']``). ``project.db.middleware`` la devuelve por
+petición en la cabecera ``Server-Timing``.
+"""
+from django.db import connections
+
+
+def close_pools():
+    """Cierra los pools abiertos en este proceso (p. ej. antes de un fork)."""
+    for connection in connections.all(initialized_only=True):
+        connection.close()
+        if getattr(connection, "pool_opened", False):
+            connection.close_pool()
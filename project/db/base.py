@@ -0,0 +1,34 @@
+import time
+from contextvars import ContextVar
+
+from django.db.backends.postgresql import base
+
+
+class Checkouts:
+    """Conexiones pedidas en una petición y segundos hasta tenerlas."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+# Lo activa project.db.middleware. Es una variable de contexto y no un
+# atributo de la conexión porque con ASGI el middleware y la vista corren en
+# hilos distintos, cada uno con su DatabaseWrapper.
+current_checkouts = ContextVar("project.db.checkouts", default=None)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    @property
+    def pool_opened(self):
+        return self.alias in self._connection_pools
+
+    def get_new_connection(self, conn_params):
+        started = time.perf_counter()
+        try:
+            return super().get_new_connection(conn_params)
+        finally:
+            checkouts = current_checkouts.get()
+            if checkouts is not None:
+                checkouts.count += 1
+                checkouts.seconds += time.perf_counter() - started
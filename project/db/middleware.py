@@ -0,0 +1,64 @@
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+
+from .base import Checkouts, current_checkouts
+
+logger = logging.getLogger("project.db")
+
+
+class ConnectionMetricsMiddleware:
+    """
+    Tiempo de la petición esperando conexión a la base de datos ``default``,
+    en ``Server-Timing: db-connect;dur=<ms>;desc="<n> conexiones"`` y en el
+    logger ``project.db`` (DEBUG, con el estado del pool). Sólo con el
+    backend ``project.db``; si la petición no pide conexión no añade nada.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        checkouts = Checkouts()
+        token = current_checkouts.set(checkouts)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_checkouts.reset(token)
+        return self.record(request, checkouts, response)
+
+    async def __acall__(self, request):
+        checkouts = Checkouts()
+        token = current_checkouts.set(checkouts)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_checkouts.reset(token)
+        return self.record(request, checkouts, response)
+
+    def record(self, request, checkouts, response):
+        if not checkouts.count:
+            return response
+        elapsed = checkouts.seconds * 1000
+        response.headers["Server-Timing"] = ", ".join(filter(None, [
+            response.headers.get("Server-Timing"),
+            f'db-connect;dur={elapsed:.1f};desc="{checkouts.count} conexiones"',
+        ]))
+        if logger.isEnabledFor(logging.DEBUG):
+            pool = connections["default"].pool
+            stats = pool.get_stats() if pool is not None else {}
+            logger.debug(
+                "%s %s: %d conexiones en %.1f ms (pool: %s de %s libres, %s en espera)",
+                request.method, request.path, checkouts.count, elapsed,
+                stats.get("pool_available", "-"), stats.get("pool_size", "-"),
+                stats.get("requests_waiting", 0),
+            )
+        return response
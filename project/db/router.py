@@ -0,0 +1,242 @@
+"""
+Lecturas en réplicas (``DATABASE_REPLICAS``) con lectura de lo escrito.
+
+``ReplicaRouter`` sólo manda consultas a una réplica dentro de
+``replica_reads()``, que abren las vistas que lo piden (en el LMS,
+``lms.replicas.ReplicaReadsMixin``); todo lo demás va a ``default``, y
+también, dentro de ellas, las tablas de ``REPLICA_PRIMARY_APPS`` (usuarios,
+sesiones y tokens): quien acaba de iniciar sesión o de recibir un token no
+pasa por las vistas que fijan al primario y no debe recibir un 401 porque la
+réplica aún no tiene su sesión. Cada
+petición usa una sola réplica, elegida al hacer la primera lectura entre las
+que tienen un retraso de replicación por debajo de ``REPLICA_MAX_LAG``
+segundos. El retraso de cada réplica se consulta como mucho cada
+``REPLICA_CHECK_INTERVAL`` segundos por proceso; una réplica que no responde
+cuenta como retrasada. Sin réplicas sanas se lee de ``default``.
+
+Tras una escritura, ``pin_to_primary`` deja al cliente leyendo de
+``default`` durante ``REPLICA_PIN_SECONDS`` con una cookie y la cabecera
+``X-Primary-Until``, que los clientes sin cookies pueden reenviar.
+"""
+import logging
+import math
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.dispatch import receiver
+
+logger = logging.getLogger("project.db")
+
+PIN_COOKIE = "primary_until"
+PIN_HEADER = "X-Primary-Until"
+
+# 0 si la réplica ya ha aplicado todo lo recibido: si no, un primario sin
+# escrituras haría parecer retrasada a una réplica al día.
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+def replicas():
+    return list(getattr(settings, "DATABASE_REPLICAS", []))
+
+
+def max_lag():
+    return getattr(settings, "REPLICA_MAX_LAG", 5.0)
+
+
+def check_interval():
+    return getattr(settings, "REPLICA_CHECK_INTERVAL", 5.0)
+
+
+def pin_seconds():
+    return getattr(settings, "REPLICA_PIN_SECONDS", 10)
+
+
+def primary_apps():
+    return getattr(settings, "REPLICA_PRIMARY_APPS", ("auth", "sessions", "authtoken"))
+
+
+class ReplicaReads:
+    """Base de datos de las lecturas de una petición; se decide en la primera."""
+
+    def __init__(self):
+        self.alias = None
+
+    def use_primary(self):
+        self.alias = DEFAULT_DB_ALIAS
+
+
+current_reads = ContextVar("project.db.replica_reads", default=None)
+
+
+@contextmanager
+def replica_reads():
+    reads = ReplicaReads()
+    token = current_reads.set(reads)
+    try:
+        yield reads
+    finally:
+        current_reads.reset(token)
+
+
+def reads_during(reads, iterator):
+    """Itera ``iterator`` leyendo de ``reads`` (respuestas en streaming)."""
+    iterator = iter(iterator)
+    while True:
+        # Sin yield dentro del contexto: la variable no debe salir del generador.
+        token = current_reads.set(reads)
+        try:
+            chunk = next(iterator, StopIteration)
+        finally:
+            current_reads.reset(token)
+        if chunk is StopIteration:
+            return
+        yield chunk
+
+
+async def areads_during(reads, iterator):
+    """``reads_during`` para iteradores asíncronos (respuestas en streaming bajo ASGI)."""
+    iterator = aiter(iterator)
+    while True:
+        token = current_reads.set(reads)
+        try:
+            chunk = await anext(iterator, StopIteration)
+        finally:
+            current_reads.reset(token)
+        if chunk is StopIteration:
+            return
+        yield chunk
+
+
+def use_primary():
+    """Lo que queda de la petición en curso se lee de ``default``."""
+    reads = current_reads.get()
+    if reads is not None:
+        reads.use_primary()
+
+
+def replica_cache_timeout(timeout):
+    """
+    ``timeout`` para guardar en caché lo leído en la petición en curso.
+
+    Si se ha leído de una réplica se limita a ``REPLICA_MAX_LAG`` segundos:
+    lo que le faltara a la réplica no se sirve desde la caché más allá de eso.
+    """
+    reads = current_reads.get()
+    if not timeout or reads is None or reads.alias not in replicas():
+        return timeout
+    return min(timeout, max(1, math.ceil(max_lag())))
+
+
+_lag_lock = threading.Lock()
+_lags = {}  # alias -> (comprobado en, segundos de retraso)
+
+
+def replication_lag(alias):
+    """Segundos de retraso de ``alias`` (infinito si no responde)."""
+    connection = connections[alias]
+    if connection.vendor != "postgresql":
+        return 0.0
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            return float(cursor.fetchone()[0])
+    except DatabaseError:
+        logger.warning("Réplica %s sin respuesta", alias, exc_info=True)
+        connection.close()
+        return float("inf")
+
+
+def current_lag(alias):
+    now = time.monotonic()
+    checked = _lags.get(alias)
+    if checked is None or now - checked[0] >= check_interval():
+        lag = replication_lag(alias)
+        if lag > max_lag():
+            logger.warning("Réplica %s descartada: %.1f s de retraso", alias, lag)
+        with _lag_lock:
+            _lags[alias] = checked = (now, lag)
+    return checked[1]
+
+
+def choose_replica():
+    healthy = [alias for alias in replicas() if current_lag(alias) <= max_lag()]
+    return random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+
+
+def pinned_until(request):
+    """
+    Hasta cuándo lee el cliente del primario, según su cookie o su cabecera.
+
+    Los valores los manda el cliente: uno más allá de ``REPLICA_PIN_SECONDS``
+    desde ahora no lo ha dado ``pin_to_primary`` y se ignora.
+    """
+    cap = time.time() + pin_seconds()
+    pins = [0.0]
+    for value in (request.COOKIES.get(PIN_COOKIE), request.headers.get(PIN_HEADER)):
+        try:
+            until = float(value)
+        except (TypeError, ValueError):
+            continue
+        if until <= cap:
+            pins.append(until)
+    return max(pins)
+
+
+def is_pinned(request):
+    return pinned_until(request) > time.time()
+
+
+def pin_to_primary(response):
+    """Las lecturas de este cliente van a ``default`` durante ``REPLICA_PIN_SECONDS``."""
+    until = f"{time.time() + pin_seconds():.3f}"
+    response.set_cookie(PIN_COOKIE, until, max_age=pin_seconds(), httponly=True, samesite="Lax")
+    response[PIN_HEADER] = until
+    return response
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        reads = current_reads.get()
+        if reads is None or not replicas():
+            return None
+        if model._meta.app_label in primary_apps():
+            return DEFAULT_DB_ALIAS
+        if reads.alias is None:
+            reads.alias = choose_replica()
+        return reads.alias
+
+    def db_for_write(self, model, **hints):
+        # Un objeto leído de una réplica se guarda en el primario.
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db in replicas():
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replicas():
+            return False
+        return None
+
+
+@receiver(setting_changed)
+def reset_replication_lags(setting, **kwargs):
+    if setting in ("DATABASE_REPLICAS", "REPLICA_MAX_LAG", "REPLICA_CHECK_INTERVAL"):
+        with _lag_lock:
+            _lags.clear()
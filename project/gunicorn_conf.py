@@ -0,0 +1,69 @@
+"""
+Configuración de gunicorn para ``manage.py serve``.
+
+También sirve directamente:
+``gunicorn -c python:project.gunicorn_conf project.wsgi`` (o ``project.asgi``
+con ``-k uvicorn_worker.UvicornWorker``). Lo que se pase por línea de
+comandos tiene prioridad.
+"""
+import os
+
+
+def available_cpus():
+    """CPUs que puede usar este proceso: afinidad y cuota de cgroups v2 (contenedores)."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as handle:
+            quota, period = handle.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def default_workers(asgi):
+    # WSGI: 2×CPU + 1 procesos con hilos para las esperas a la base de datos.
+    # ASGI: un bucle de eventos por CPU y uno de reserva.
+    cpus = available_cpus()
+    return cpus + 1 if asgi else 2 * cpus + 1
+
+
+def configured_workers(asgi):
+    """``WEB_CONCURRENCY`` si está definida; si no, ``default_workers``."""
+    return int(os.environ.get("WEB_CONCURRENCY") or default_workers(asgi))
+
+
+DEFAULT_THREADS = 4
+
+bind = "0.0.0.0:8500"
+workers = configured_workers(asgi=False)
+worker_class = "gthread"
+threads = DEFAULT_THREADS
+
+# La aplicación se importa en el maestro antes de hacer fork: los workers
+# arrancan ya cargados y comparten memoria (copy-on-write).
+preload_app = True
+
+# Reciclado: cada worker se reinicia tras max_requests ± jitter peticiones
+# para acotar el crecimiento de memoria, sin reiniciarse todos a la vez.
+max_requests = 2000
+max_requests_jitter = 200
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+accesslog = "-"
+
+# El latido de los workers en memoria, no en el overlay del contenedor.
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+
+def pre_fork(server, worker):
+    # Nada de conexiones ni pools heredados: cada worker abre los suyos.
+    from project.db import close_pools
+    close_pools()
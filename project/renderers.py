@@ -0,0 +1,100 @@
+"""
+Renderers y parsers del API: JSON con orjson y MessagePack opcional.
+
+``ORJSONRenderer`` produce los mismos bytes que el ``JSONRenderer`` de DRF:
+fechas, horas, ``Decimal``, ``UUID`` y el resto de tipos que no son JSON
+pasan por ``rest_framework.utils.encoders.JSONEncoder.default``; se
+escapan ``\\u2028`` / ``\\u2029`` e ``indent=2`` sale igual. Lo que orjson
+no admite (otra sangría, ``UNICODE_JSON`` / ``COMPACT_JSON`` desactivados,
+enteros de más de 64 bits, claves que no son cadenas...) se delega en el
+renderer de DRF. Única diferencia: orjson escribe ``NaN`` e ``Infinity``
+como ``null`` en lugar de fallar.
+
+``ORJSONParser`` acepta exactamente lo mismo que ``JSONParser``: lo que
+orjson rechaza se vuelve a intentar con el parser de DRF, que da el error.
+Un cuerpo con números de 19 cifras o más va directamente a DRF (orjson
+convertiría en float los enteros de más de 64 bits).
+
+``MessagePackRenderer`` / ``MessagePackParser`` (``application/msgpack``)
+necesitan el paquete ``msgpack``; los tipos que no son de MessagePack se
+convierten igual que en JSON.
+"""
+import io
+import re
+
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import msgpack
+except ImportError:  # dependencia opcional
+    msgpack = None
+
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+UTF8 = ("utf-8", "utf8")
+LONG_NUMBER = re.compile(rb"\d{19}")
+
+# Conversión de DRF para lo que no es JSON (datetime -> ISO 8601 con «Z», Decimal -> float...).
+encode_default = JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent not in (None, 2):
+            return super().render(data, accepted_media_type, renderer_context)
+        options = ORJSON_OPTIONS | orjson.OPT_INDENT_2 if indent == 2 else ORJSON_OPTIONS
+        try:
+            content = orjson.dumps(data, default=encode_default, option=options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if b"\xe2\x80\xa8" in content or b"\xe2\x80\xa9" in content:
+            content = content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return content
+
+
+class ORJSONParser(JSONParser):
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", settings.DEFAULT_CHARSET)
+        if encoding.lower() not in UTF8:
+            return super().parse(stream, media_type, parser_context)
+        content = stream.read()
+        if not LONG_NUMBER.search(content):
+            try:
+                return orjson.loads(content)
+            except orjson.JSONDecodeError:
+                pass
+        return super().parse(io.BytesIO(content), media_type, parser_context)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=encode_default, use_bin_type=True, datetime=False)
+
+
+class MessagePackParser(BaseParser):
+    media_type = "application/msgpack"
+    renderer_class = MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, TypeError, msgpack.UnpackException) as exc:
+            raise ParseError(f"MessagePack parse error - {exc}")
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -39,6 +41,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'django_filters',
     'drf_yasg',
@@ -50,6 +53,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'project.db.middleware.ConnectionMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -66,13 +70,20 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         "DIRS": [BASE_DIR / "lms/templates/"],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Plantillas compiladas una vez por proceso. Con DEBUG se recargan
+            # igual al cambiar un fichero (el autoreloader vacía la caché).
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -83,16 +94,59 @@ WSGI_APPLICATION = 'project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# project.db es el backend de PostgreSQL de Django midiendo el tiempo de
+# conexión (cabecera Server-Timing). Con DB_POOL=1 (por defecto) cada
+# proceso mantiene un pool de psycopg 3 entre MIN_SIZE y MAX_SIZE conexiones
+# ya abiertas; una petición espera hasta TIMEOUT segundos a que quede una
+# libre. Con gunicorn: workers × MAX_SIZE < max_connections de PostgreSQL.
+# Con pool, CONN_HEALTH_CHECKS hace que Django le pase 'check' =
+# ConnectionPool.check_connection: el pool comprueba cada conexión al
+# entregarla y no da a una petición una que el servidor cerró (reinicio,
+# failover). No se pone 'check' en OPTIONS['pool']: Django 5.2 ya lo pasa y
+# fallaría por argumento repetido. Con DB_POOL=0 se reutiliza una conexión por
+# hilo (CONN_MAX_AGE), sólo para WSGI, y CONN_HEALTH_CHECKS la comprueba
+# antes de reutilizarla.
+DB_POOL = os.environ.get('DB_POOL', '1') == '1'
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'project.db',
         'NAME': 'mydatabase',
         'USER': 'user',
         'PASSWORD': 'password',
         'HOST': 'db',
+        'CONN_MAX_AGE': 0 if DB_POOL else 60,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'pool': {
+                'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+                'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 8)),
+                'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+                # Se renuevan las conexiones ociosas o con muchas horas.
+                'max_idle': 300,
+                'max_lifetime': 3600,
+            },
+        } if DB_POOL else {},
     }
 }
 
+# Réplicas de lectura (project/db/router.py): DB_REPLICA_HOSTS=host1,host2
+# crea los alias replica1, replica2... con las credenciales de default. Las
+# lecturas del API del LMS van a una réplica con menos de REPLICA_MAX_LAG
+# segundos de retraso (se mira cada REPLICA_CHECK_INTERVAL segundos); quien
+# acaba de escribir lee del primario durante REPLICA_PIN_SECONDS. Usuarios,
+# sesiones y tokens (REPLICA_PRIMARY_APPS) se leen siempre del primario.
+DATABASE_REPLICAS = []
+for index, host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    DATABASES[f'replica{index}'] = {**DATABASES['default'], 'HOST': host.strip(), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica{index}')
+
+DATABASE_ROUTERS = ['project.db.router.ReplicaRouter']
+REPLICA_MAX_LAG = 5.0
+REPLICA_CHECK_INTERVAL = 5.0
+REPLICA_PIN_SECONDS = 10
+REPLICA_PRIMARY_APPS = ('auth', 'sessions', 'authtoken')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -129,6 +183,21 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+# collectstatic deja aquí los ficheros (con variantes gzip/brotli) que
+# project/static.py sirve delante de Django (manage.py serve).
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedStaticFilesStorage'},
+}
+WHITENOISE_MAX_AGE = 24 * 60 * 60
+# Subidas (Course.avatar). project/static.py también las sirve delante de
+# Django; los derivados de course_avatars/derived/ con caché permanente.
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+# Siempre desde STATIC_ROOT con el índice de arranque, también con DEBUG.
+WHITENOISE_AUTOREFRESH = False
+WHITENOISE_USE_FINDERS = False
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -144,15 +213,107 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # PageNumberPagination con modo keyset opcional (?cursor=)
+    'DEFAULT_PAGINATION_CLASS': 'lms.pagination.KeysetPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
-        'rest_framework.filters.SearchFilter',
+        # ?search= con tsvector + GIN en PostgreSQL (lms/search.py)
+        'lms.search.FullTextSearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    # JSON con orjson: los mismos bytes que el JSONRenderer de DRF (project/renderers.py).
+    'DEFAULT_RENDERER_CLASSES': [
+        'project.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'project.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+# MessagePack (Accept / Content-Type: application/msgpack) si está instalado msgpack.
+if find_spec('msgpack'):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('project.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].append('project.renderers.MessagePackParser')
+
+# Caché de Django. LocMemCache es de cada proceso: con varios workers
+# (manage.py serve) una escritura sólo invalidaría la caché del worker que la
+# atiende y el resto serviría datos viejos. CACHE_DIR la comparte entre los
+# procesos de una máquina (FileBasedCache); REDIS_URL, entre máquinas
+# (RedisCache, necesita el paquete redis).
+if os.environ.get('REDIS_URL'):
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': os.environ['REDIS_URL'],
+    }}
+elif os.environ.get('CACHE_DIR'):
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': os.environ['CACHE_DIR'],
+    }}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# Caché de respuestas GET del API del LMS (lms/response_cache.py). Tiene que
+# ser compartida entre workers (ver CACHES); TIMEOUT = 0 la desactiva.
+LMS_API_CACHE_ALIAS = 'default'
+LMS_API_CACHE_TIMEOUT = 300
+
+# Portada del catálogo /catalogo/ (lms/catalogue.py): cursos que muestra y
+# vida en la caché de LMS_API_CACHE_ALIAS de cada tarjeta y de la página
+# entera para anónimos. TIMEOUT = 0 la desactiva.
+LMS_CATALOGUE_COURSES = 48
+LMS_CATALOGUE_CACHE_TIMEOUT = 300
+
+# Panel «Mi aprendizaje» /usuarios/{id}/dashboard/ (lms/dashboard.py): vida
+# en la caché de LMS_API_CACHE_ALIAS del panel de cada usuario. 0 la desactiva.
+LMS_DASHBOARD_CACHE_TIMEOUT = 300
+
+# Máximo de elementos por petición en las rutas <recurso>/bulk/ (lms/bulk.py).
+LMS_BULK_MAX_ITEMS = 5000
+
+# Filas por bloque en las exportaciones <recurso>/export/ (lms/export.py).
+LMS_EXPORT_CHUNK_SIZE = 2000
+
+# Changelists del admin (lms/admin_performance.py): por encima de este número
+# de filas estimadas por PostgreSQL se pagina con la estimación en lugar de
+# COUNT(*) y no se muestra el total sin filtrar. None = contar siempre.
+LMS_ADMIN_EXACT_COUNT_LIMIT = 100000
+
+# Listados del API serializados desde values_list() sin instancias de modelo
+# (lms/values_serializer.py); False vuelve a los ModelSerializer de DRF.
+LMS_VALUES_LISTS = True
+
+# list/retrieve de usuarios, cursos y lecciones con vistas asíncronas
+# (lms/async_views.py). project/asgi.py lo activa; con WSGI no aporta nada.
+LMS_ASYNC_READS = os.environ.get('LMS_ASYNC_READS') == '1'
+
+# Hash de contraseñas de Usuario en un pool de procesos (lms/passwords.py).
+# WORKERS None = un proceso por CPU, 0 = en el hilo de la petición. Con más
+# de WORKERS + MAX_PENDING altas a la vez, las siguientes esperan hasta WAIT
+# segundos y después reciben 503. Para elegir el coste de PBKDF2 y el número
+# de procesos: manage.py benchmark_passwords (ver README).
+LMS_PASSWORD_WORKERS = None
+LMS_PASSWORD_MAX_PENDING = 32
+LMS_PASSWORD_WAIT = 5.0
+LMS_PBKDF2_ITERATIONS = None  # None = el valor por defecto de Django
+
+# Derivados WebP/JPEG de Course.avatar (lms/avatars.py): anchos en píxeles e
+# hilos del pool que los genera después de cada subida (0 = al confirmar la
+# transacción, en el hilo de la petición). Los avatares que ya existían se
+# procesan con manage.py backfill_course_avatars.
+LMS_AVATAR_WIDTHS = (128, 256, 512)
+LMS_AVATAR_WORKERS = 2
+
+PASSWORD_HASHERS = [
+    'lms.passwords.TunablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 # Swagger settings (drf-yasg)
 SWAGGER_SETTINGS = {
     'SECURITY_DEFINITIONS': {
@@ -187,6 +348,14 @@ SWAGGER_SETTINGS = {
 # drf-yasg settings
 SWAGGER_SCHEMA_URL = 'http://localhost:8500'
 
+# polls: volcado diferido de votos (polls/votes.py). Un fallo del proceso
+# pierde como mucho POLLS_VOTE_FLUSH_INTERVAL segundos o
+# POLLS_VOTE_FLUSH_SIZE votos; 0 segundos = escribir en cada petición.
+POLLS_VOTE_FLUSH_INTERVAL = 1.0
+POLLS_VOTE_FLUSH_SIZE = 500
+# Antigüedad máxima (s) del agregado de resultados en caché (polls/results.py)
+POLLS_RESULTS_MAX_AGE = 30
+
 LOGIN_REDIRECT_URL = "/"
 
 # Required by django.contrib.sites
@@ -0,0 +1,88 @@
+"""
+Ficheros estáticos servidos antes de llegar a Django.
+
+``collectstatic`` deja en ``STATIC_ROOT`` cada fichero y sus variantes gzip
+y brotli. ``StaticFilesWSGI`` y ``StaticFilesASGI`` envuelven la aplicación
+y responden a ``STATIC_URL`` con el índice que WhiteNoise construye al
+arrancar: cabeceras precalculadas (ETag, Last-Modified, Cache-Control,
+Vary) y la variante comprimida que acepte el cliente, sin middlewares,
+URLconf ni vistas. Con WSGI el fichero sale por ``wsgi.file_wrapper``
+(sendfile en gunicorn). Se configura con los ajustes ``WHITENOISE_*``.
+
+Las subidas de ``MEDIA_ROOT`` también se sirven aquí (si ``MEDIA_URL`` es
+una ruta local), buscándolas en disco en cada petición porque aparecen con
+el servidor en marcha. Los derivados de avatares (lms/avatars.py) llevan el
+hash del contenido en el nombre y salen con caché permanente (``immutable``).
+"""
+import asyncio
+import re
+
+from django.conf import settings
+from whitenoise.base import WhiteNoise
+from whitenoise.middleware import WhiteNoiseMiddleware
+from whitenoise.string_utils import decode_path_info
+
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE_MEDIA = re.compile(r"/course_avatars/derived/[0-9a-f]+-\d+\.\w+$")
+
+
+class StaticFiles:
+    def __init__(self, application):
+        self.application = application
+        # Lee STATIC_ROOT, STATIC_URL y WHITENOISE_*; con DEBUG busca también con los finders.
+        self.index = WhiteNoiseMiddleware()
+        self.media = None
+        media_url = settings.MEDIA_URL
+        if settings.MEDIA_ROOT and media_url and "://" not in media_url and not media_url.startswith("//"):
+            self.media = WhiteNoise(
+                None, autorefresh=True, max_age=self.index.max_age,
+                immutable_file_test=lambda path, url: bool(IMMUTABLE_MEDIA.search(url)),
+            )
+            self.media.add_files(settings.MEDIA_ROOT, "/" + media_url.lstrip("/"))
+
+    def find(self, path):
+        if self.index.autorefresh:
+            static_file = self.index.find_file(path)
+        else:
+            static_file = self.index.files.get(path)
+        if static_file is None and self.media is not None:
+            static_file = self.media.find_file(path)
+        return static_file
+
+
+class StaticFilesWSGI(StaticFiles):
+    def __call__(self, environ, start_response):
+        static_file = self.find(decode_path_info(environ.get("PATH_INFO", "")))
+        if static_file is None:
+            return self.application(environ, start_response)
+        return WhiteNoise.serve(static_file, environ, start_response)
+
+
+class StaticFilesASGI(StaticFiles):
+    async def __call__(self, scope, receive, send):
+        static_file = self.find(scope["path"]) if scope["type"] == "http" else None
+        if static_file is None:
+            return await self.application(scope, receive, send)
+        # WhiteNoise lee las cabeceras de la petición con los nombres de WSGI.
+        headers = {
+            "HTTP_" + name.decode("latin1").upper().replace("-", "_"): value.decode("latin1")
+            for name, value in scope["headers"]
+        }
+        response = static_file.get_response(scope["method"], headers)
+        await send({
+            "type": "http.response.start",
+            "status": int(response.status),
+            "headers": [(name.lower().encode("latin1"), value.encode("latin1")) for name, value in response.headers],
+        })
+        if response.file is None:
+            return await send({"type": "http.response.body", "body": b""})
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                chunk = await loop.run_in_executor(None, response.file.read, CHUNK_SIZE)
+                more = len(chunk) == CHUNK_SIZE
+                await send({"type": "http.response.body", "body": chunk, "more_body": more})
+                if not more:
+                    break
+        finally:
+            response.file.close()
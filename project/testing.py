@@ -0,0 +1,107 @@
+"""
+Utilidades de test compartidas: auditoría de consultas SQL por petición.
+
+``QueryAuditMixin.audit()`` ejecuta una petición con el cliente de test y
+devuelve la respuesta junto con el SQL normalizado que se ejecutó y el
+número de instancias de modelo materializadas (filas traídas) por modelo.
+``assertQueryShapes()`` compara contra la forma esperada e imprime un diff
+legible cuando cambia.
+"""
+import difflib
+import json
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+
+from django.db import connection
+from django.db.models.signals import post_init
+from django.test.utils import CaptureQueriesContext
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_CAST = re.compile(r"::[a-z_]+")
+_SAVEPOINT = re.compile(r"SAVEPOINT \w+")
+_IN_LIST = re.compile(r"IN \((?:\?, )*\?\)")
+_SPACES = re.compile(r"\s+")
+_CLAUSES = re.compile(r" (?=FROM |INNER JOIN |LEFT OUTER JOIN |WHERE |GROUP BY |HAVING |ORDER BY |LIMIT |RETURNING |VALUES |SET )")
+
+
+def normalize_sql(sql):
+    """Reduce una sentencia a su forma: sin comillas, literales, casts ni listas IN."""
+    sql = sql.replace('"', "").replace("`", "")
+    sql = _CAST.sub("", sql)
+    sql = _SAVEPOINT.sub("SAVEPOINT ?", sql)
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+
+def _diff_lines(queries):
+    lines = []
+    for number, sql in enumerate(queries, 1):
+        lines.append(f"-- consulta {number}")
+        lines.extend("    " + clause for clause in _CLAUSES.split(sql))
+    return lines
+
+
+@dataclass
+class QueryAudit:
+    response: object
+    queries: list = field(default_factory=list)
+    rows: Counter = field(default_factory=Counter)
+
+
+class QueryAuditMixin:
+    """Mixin para ``TestCase`` que audita las consultas de cada petición."""
+
+    def audit(self, method, url, **kwargs):
+        rows = Counter()
+
+        def count_instance(sender, **_):
+            rows[sender.__name__] += 1
+
+        post_init.connect(count_instance, weak=False)
+        try:
+            with CaptureQueriesContext(connection) as ctx:
+                response = getattr(self.client, method.lower())(url, **kwargs)
+        finally:
+            post_init.disconnect(count_instance)
+        queries = [normalize_sql(q["sql"]) for q in ctx.captured_queries]
+        return QueryAudit(response, queries, rows)
+
+    def assertQueryShapes(self, audit, expected, rows=None, msg=None):
+        if audit.queries != list(expected):
+            diff = "\n".join(difflib.unified_diff(
+                _diff_lines(expected), _diff_lines(audit.queries), "esperado", "obtenido", lineterm="",
+            ))
+            self.fail(
+                f"{msg or 'Consultas SQL distintas'} "
+                f"({len(expected)} esperadas, {len(audit.queries)} ejecutadas):\n{diff}"
+            )
+        if rows is not None:
+            self.assertEqual(dict(audit.rows), rows, msg or "Filas traídas por modelo")
+
+
+def seq_scans(queryset):
+    """Tablas que PostgreSQL recorre con ``Seq Scan`` en el plan del queryset."""
+    plan = json.loads(queryset.explain(format="json"))[0]["Plan"]
+    found, pending = [], [plan]
+    while pending:
+        node = pending.pop()
+        if node["Node Type"] == "Seq Scan":
+            found.append(node["Relation Name"])
+        pending.extend(node.get("Plans", ()))
+    return found
+
+
+class ExplainAssertionsMixin:
+    """Comprobaciones sobre el plan de PostgreSQL (requiere datos y ANALYZE)."""
+
+    def assertNoSeqScan(self, queryset, msg=None):
+        tables = seq_scans(queryset)
+        if tables:
+            self.fail(
+                f"{msg or 'Seq Scan inesperado'} en {', '.join(sorted(set(tables)))}:\n"
+                f"{queryset.explain()}\n{queryset.query}"
+            )
@@ -14,6 +14,7 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path, re_path
 from rest_framework import permissions
@@ -37,7 +38,9 @@ schema_view = get_schema_view(
 )
 
 urlpatterns = [
-    path('', include('lms.urls')),
+    # Con ASGI (project/asgi.py) list/retrieve del LMS se sirven de forma asíncrona.
+    path('', include('lms.async_urls' if settings.LMS_ASYNC_READS else 'lms.urls')),
+    path('polls/', include('polls.urls')),
     path('admin/', admin.site.urls),
     # DRF browsable API login
     path('api-auth/', include('rest_framework.urls')),
@@ -13,4 +13,6 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings')
 
-application = get_wsgi_application()
+from project.static import StaticFilesWSGI  # noqa: E402
+
+application = StaticFilesWSGI(get_wsgi_application())